@@ -1,16 +1,16 @@
 # auth/routes/auth_router.py
-import datetime
-from time import timezone
 from fastapi import APIRouter, Depends, HTTPException, Response, status
 import jwt
 from pydantic import BaseModel, EmailStr, Field
 from core.database import get_db
-from auth.services.auth_service import authenticate_user, create_access_token, get_current_user, oauth2_scheme
+from auth.services.auth_service import authenticate_user, create_access_token, get_current_user, oauth2_scheme, saturado_exc
+from auth.services.revocation import revocar_token
 import user
 from user.models.user import User
 from user.schemas.user import UserCreate, UserSchema
 from core.config import get_settings
-from user.services.user_service import create_user
+from user.services.user_service import bump_token_version, create_user
+from user.services.password_pool import HashingSaturado
 from typing import Any
 from fastapi.security import OAuth2PasswordRequestForm
 
@@ -40,7 +40,8 @@ async def login(payload: LoginRequest, db=Depends(get_db)) -> dict[str, Any]:
         raise HTTPException(
             status_code=status.HTTP_401_UNAUTHORIZED, detail="Credenciales inválidas")
 
-    token = create_access_token(user.id)  # preferimos id, no email
+    # preferimos id, no email
+    token = create_access_token(user.id, token_version=getattr(user, "token_version", 0))
     return {
         "access_token": token,
         "token_type": "bearer",
@@ -57,6 +58,8 @@ async def register(payload: UserCreate, db=Depends(get_db)):
     except ValueError as ex:
         raise HTTPException(
             status_code=status.HTTP_400_BAD_REQUEST, detail=str(ex))
+    except HashingSaturado:
+        raise saturado_exc()
 
 
 async def login_token(form: OAuth2PasswordRequestForm = Depends(), db=Depends(get_db)):
@@ -84,8 +87,14 @@ async def logout(token: str = Depends(oauth2_scheme), db=Depends(get_db)):
     if not jti or not exp:
         return Response(status_code=204)
 
-    exp_dt = datetime.fromtimestamp(int(exp), tz=timezone.utc)
-    await db["revoked_tokens"].update_one({"jti": jti}, {"$set": {"jti": jti, "exp": exp_dt}}, upsert=True)
+    await revocar_token(db, jti, exp)
+    return Response(status_code=204)
+
+
+@auth_router.post("/logout-all", status_code=204)
+async def logout_all(current_user: User = Depends(get_current_user), db=Depends(get_db)):
+    # sube token_version: todos los tokens del usuario (incluido este) dejan de valer
+    await bump_token_version(db, current_user.id)
     return Response(status_code=204)
 
 
@@ -4,24 +4,41 @@ import uuid
 import jwt
 from core.config import get_settings
 from user.models.user import User
-from user.services.user_service import verify_password
 from fastapi import Depends, HTTPException, status
 from fastapi.security import OAuth2PasswordBearer
 from core.database import get_db
+from auth.services.principal_cache import get_principal, put_principal, sync_principales
+from auth.services.revocation import esta_revocado, sync_revocados
 
-from user.services.user_service import get_user_by_email, get_user_by_id, verify_password
+from user.services.user_service import get_user_by_email, get_user_by_id, verify_and_update_password
+from user.services.password_pool import HashingSaturado
 
 
 oauth2_scheme = OAuth2PasswordBearer(tokenUrl="/api/auth/token")
 
 
+def saturado_exc() -> HTTPException:
+    return HTTPException(status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+                         detail="Servidor ocupado, reintente en unos segundos",
+                         headers={"Retry-After": "1"})
+
+
 async def authenticate_user(db, email: str, password: str):
     from user.services.user_service import get_user_by_email
     user = await get_user_by_email(db, email)
     if not user:
         return None
-    if not verify_password(password, user.password_hash):
+    try:
+        ok, nuevo_hash = await verify_and_update_password(password, user.password_hash)
+    except HashingSaturado:
+        raise saturado_exc()
+    if not ok:
         return None
+    if nuevo_hash:
+        # cambió PWD_BCRYPT_ROUNDS: se re-hashea con el costo nuevo (best-effort)
+        await db["users"].update_one({"email": email, "password_hash": user.password_hash},
+                                     {"$set": {"password_hash": nuevo_hash}})
+        user.password_hash = nuevo_hash
     return user
 
 
@@ -44,11 +61,20 @@ async def get_current_user(
         if sub is None or jti is None:
             raise credentials_exc
 
-        # 1) ¿Token revocado?
-        if await db["revoked_tokens"].find_one({"jti": jti}):
+        # revocaciones y versión de usuarios: a Mongo como mucho cada AUTH_SYNC_S
+        await sync_revocados(db)
+        await sync_principales(db)
+
+        # 1) ¿Token revocado? (set en memoria)
+        if esta_revocado(jti):
             raise credentials_exc
 
-        # 2) ¿Usuario existe y versión vigente?
+        # 2) Cache caliente: cero consultas
+        user = get_principal(sub, v)
+        if user is not None:
+            return user
+
+        # 3) ¿Usuario existe y versión vigente?
         user = await get_user_by_id(db, sub) or await get_user_by_email(db, sub)
         if user is None or not user.is_active:
             raise credentials_exc
@@ -56,6 +82,7 @@ async def get_current_user(
             # versión cambió -> tokens viejos quedan inválidos
             raise credentials_exc
 
+        put_principal(sub, v, user)
         return user
     except jwt.ExpiredSignatureError:
         raise HTTPException(status_code=401, detail="Token expired", headers={
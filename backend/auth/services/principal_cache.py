@@ -0,0 +1,61 @@
+# auth/services/principal_cache.py
+# Cache por worker del usuario autenticado, por (sub, token_version) y con TTL corto.
+#
+# Invalidación:
+#   - token_version: un token con otra versión no pega en la misma clave.
+#   - cambios del usuario (roles, baja, logout-all): invalidar_principal() borra las
+#     entradas locales y sube meta.auth.version; los demás workers ven el cambio de
+#     versión en ≤ AUTH_SYNC_S y vacían su cache.
+#   - AUTH_CACHE_TTL_S acota cualquier otro cambio hecho por fuera del servicio.
+import time
+from collections import OrderedDict
+from typing import Optional, Tuple
+
+from core.config import AUTH_CACHE_MAX, AUTH_CACHE_TTL_S, AUTH_SYNC_S
+from user.models.user import User
+
+_cache: "OrderedDict[Tuple[str, int], Tuple[float, User]]" = OrderedDict()
+_version: int = -1
+_checked_at: float = 0.0
+
+
+async def sync_principales(db) -> None:
+    global _version, _checked_at
+    now = time.monotonic()
+    if now - _checked_at < AUTH_SYNC_S and _version >= 0:
+        return
+    _checked_at = now
+    meta = await db["meta"].find_one({"_id": "auth"}, projection={"version": 1}) or {}
+    v = int(meta.get("version", 0))
+    if v != _version:
+        _cache.clear()
+        _version = v
+
+
+def get_principal(sub: str, v: int) -> Optional[User]:
+    hit = _cache.get((sub, v))
+    if hit is None:
+        return None
+    vence, user = hit
+    if vence <= time.monotonic():
+        del _cache[(sub, v)]
+        return None
+    _cache.move_to_end((sub, v))
+    return user
+
+
+def put_principal(sub: str, v: int, user: User) -> None:
+    if AUTH_CACHE_TTL_S <= 0:
+        return
+    _cache[(sub, v)] = (time.monotonic() + AUTH_CACHE_TTL_S, user)
+    _cache.move_to_end((sub, v))
+    while len(_cache) > AUTH_CACHE_MAX:
+        _cache.popitem(last=False)
+
+
+async def invalidar_principal(db, *subs: str) -> None:
+    """El usuario cambió: fuera del cache de este worker y aviso a los demás."""
+    claves = set(subs)
+    for k in [k for k in _cache if k[0] in claves]:
+        del _cache[k]
+    await db["meta"].update_one({"_id": "auth"}, {"$inc": {"version": 1}}, upsert=True)
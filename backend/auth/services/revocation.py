@@ -0,0 +1,71 @@
+# auth/services/revocation.py
+# Tokens revocados (logout) en memoria del worker, hidratados desde 'revoked_tokens':
+#
+#   revoked_tokens: {jti, exp: <datetime>, revoked_at: <datetime>}
+#
+# Primer uso: carga todos los no vencidos. Después, como mucho cada AUTH_SYNC_S,
+# trae solo los revocados desde el último visto (revoked_at > marca). Así un logout
+# hecho en otro worker se ve en ≤ AUTH_SYNC_S, y la consulta por request es un `in`.
+#
+# Índices (core/startup): jti único y TTL sobre exp, así la colección (y este set, que
+# se purga con el mismo exp) solo contiene tokens que todavía no vencieron.
+import time
+from datetime import datetime, timedelta, timezone
+from typing import Dict, Optional
+
+from core.config import AUTH_SYNC_S
+
+_revocados: Dict[str, float] = {}     # jti → exp (epoch)
+_marca: Optional[datetime] = None      # mayor revoked_at visto
+_checked_at: float = 0.0
+
+# margen para revocaciones cuyo revoked_at (reloj de otro worker) quedó apenas atrás
+_SOLAPE = timedelta(seconds=5)
+
+
+def _epoch(x) -> float:
+    if isinstance(x, datetime):
+        return (x if x.tzinfo else x.replace(tzinfo=timezone.utc)).timestamp()
+    return float(x or 0)
+
+
+def _purgar(now: float) -> None:
+    for jti in [j for j, exp in _revocados.items() if exp <= now]:
+        del _revocados[jti]
+
+
+async def sync_revocados(db) -> None:
+    global _marca, _checked_at
+    now = time.monotonic()
+    if now - _checked_at < AUTH_SYNC_S and _marca is not None:
+        return
+    _checked_at = now
+    ahora = datetime.now(timezone.utc)
+    if _marca is None:
+        q = {"exp": {"$gt": ahora}}
+    else:
+        q = {"revoked_at": {"$gt": _marca - _SOLAPE}}
+    marca = _marca or ahora - _SOLAPE
+    async for d in db["revoked_tokens"].find(q, projection={"_id": 0, "jti": 1, "exp": 1, "revoked_at": 1}):
+        _revocados[d["jti"]] = _epoch(d.get("exp"))
+        ra = d.get("revoked_at")
+        if isinstance(ra, datetime):
+            ra = ra if ra.tzinfo else ra.replace(tzinfo=timezone.utc)
+            marca = max(marca, ra)
+    _marca = marca
+    _purgar(time.time())
+
+
+def esta_revocado(jti: str) -> bool:
+    return jti in _revocados
+
+
+async def revocar_token(db, jti: str, exp: int) -> None:
+    """Logout: persiste la revocación y la aplica ya en este worker."""
+    exp_dt = datetime.fromtimestamp(int(exp), tz=timezone.utc)
+    await db["revoked_tokens"].update_one(
+        {"jti": jti},
+        {"$set": {"jti": jti, "exp": exp_dt, "revoked_at": datetime.now(timezone.utc)}},
+        upsert=True,
+    )
+    _revocados[jti] = float(exp)
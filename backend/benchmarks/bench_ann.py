@@ -0,0 +1,70 @@
+# benchmarks/bench_ann.py
+# Recall@K y latencia del índice IVF (core/ann_index) contra el scorer exacto
+# (matmul completa sobre el snapshot), para distintos valores de nprobe.
+# Corpus sintético con estructura de clusters (parecido a embeddings reales).
+#   python -m benchmarks.bench_ann [--n 100000] [--dim 256] [--k 200] [--queries 50]
+import argparse
+import tempfile
+import time
+
+import numpy as np
+
+from core.embedding_store import EmbeddingStore
+from core.ann_index import IvfIndex
+
+
+def _corpus(n: int, dim: int, centers: int = 64, seed: int = 0) -> np.ndarray:
+    rng = np.random.default_rng(seed)
+    C = rng.standard_normal((centers, dim)).astype(np.float32)
+    X = C[rng.integers(0, centers, size=n)] + 0.6 * rng.standard_normal((n, dim)).astype(np.float32)
+    return X
+
+
+def run(n: int = 100_000, dim: int = 256, k: int = 200, queries: int = 50,
+        nprobes=(1, 2, 4, 8, 16, 32)) -> dict:
+    X = _corpus(n, dim)
+    Q = _corpus(queries, dim, seed=1)
+    with tempfile.TemporaryDirectory() as d:
+        store = EmbeddingStore(d)
+        store.extend([f"cv{i}" for i in range(n)], X)
+        ann = IvfIndex(store)
+        t0 = time.perf_counter()
+        nlist = ann.train()
+        train_s = time.perf_counter() - t0
+
+        # referencia exacta
+        exact, t_exact = [], 0.0
+        for q in Q:
+            t0 = time.perf_counter()
+            ids, scores = store.cosines(q)
+            top = np.argpartition(-scores, k - 1)[:k]
+            t_exact += time.perf_counter() - t0
+            exact.append({ids[i] for i in top})
+
+        out = {"nlist": nlist, "train_s": train_s,
+               "exact_ms": t_exact * 1000 / queries, "ann": {}}
+        for nprobe in nprobes:
+            hits, t_ann = 0, 0.0
+            for q, ref in zip(Q, exact):
+                t0 = time.perf_counter()
+                ids, _ = ann.search(q, k, nprobe=nprobe)
+                t_ann += time.perf_counter() - t0
+                hits += len(ref.intersection(ids))
+            out["ann"][nprobe] = {"recall": hits / (k * queries),
+                                  "ms": t_ann * 1000 / queries}
+    return out
+
+
+if __name__ == "__main__":
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--n", type=int, default=100_000)
+    ap.add_argument("--dim", type=int, default=256)
+    ap.add_argument("--k", type=int, default=200)
+    ap.add_argument("--queries", type=int, default=50)
+    args = ap.parse_args()
+    res = run(args.n, args.dim, args.k, args.queries)
+    print(f"nlist={res['nlist']}  entrenamiento {res['train_s']:.1f} s  "
+          f"exacto {res['exact_ms']:.2f} ms/consulta")
+    for nprobe, r in res["ann"].items():
+        print(f"nprobe={nprobe:3d}  recall@{args.k}={r['recall']:.3f}  {r['ms']:.2f} ms/consulta  "
+              f"(x{res['exact_ms'] / r['ms']:.1f})")
@@ -0,0 +1,38 @@
+# benchmarks/bench_bm25.py
+# Latencia de consultas BM25 (índice invertido en memoria) sobre un pool sintético.
+#   python -m benchmarks.bench_bm25 [--n 100000] [--terms 150] [--vocab 20000]
+import argparse
+import time
+
+import numpy as np
+
+from cv.services.bm25_index import Bm25Index
+
+
+def run(n: int = 100_000, terms: int = 150, vocab: int = 20_000, queries: int = 50) -> dict:
+    rng = np.random.default_rng(0)
+    # frecuencias tipo Zipf: pocos términos muy comunes, cola larga de raros
+    words = [f"t{i}" for i in range(vocab)]
+    p = 1.0 / np.arange(1, vocab + 1)
+    p /= p.sum()
+    idx = Bm25Index()
+    t0 = time.perf_counter()
+    for i in range(n):
+        toks, cnt = np.unique(rng.choice(vocab, size=terms, p=p), return_counts=True)
+        idx._agregar(f"cv{i}", int(cnt.sum()), [words[t] for t in toks], cnt.tolist())
+    build_s = time.perf_counter() - t0
+    qs = [" ".join(words[t] for t in rng.choice(vocab, size=4, p=p)) for _ in range(queries)]
+    t0 = time.perf_counter()
+    for q in qs:
+        idx.top_k(q, 20)
+    return {"build_s": build_s, "ms": (time.perf_counter() - t0) * 1000 / queries}
+
+
+if __name__ == "__main__":
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--n", type=int, default=100_000)
+    ap.add_argument("--terms", type=int, default=150)
+    ap.add_argument("--vocab", type=int, default=20_000)
+    args = ap.parse_args()
+    r = run(args.n, args.terms, args.vocab)
+    print(f"armado (incluye generar el corpus) {r['build_s']:.1f} s  consulta {r['ms']:.2f} ms (top-20, 4 términos)")
@@ -0,0 +1,64 @@
+# benchmarks/bench_login.py
+# Tormenta de logins (bcrypt) y latencia de requests que no autentican, en el mismo loop.
+#   modo "inline": bcrypt dentro de la corrutina (como antes)
+#   modo "pool":   bcrypt en el pool acotado de user/services/password_pool
+#   python -m benchmarks.bench_login [--logins 64] [--rounds 12]
+import argparse
+import asyncio
+import time
+
+import numpy as np
+from passlib.context import CryptContext
+
+from user.services.password_pool import HashingSaturado, ejecutar
+
+
+async def _ping(stop: asyncio.Event, lat: list) -> None:
+    # request "liviano": cede el loop cada 5 ms y mide cuánto tarda en volver
+    while not stop.is_set():
+        t0 = time.perf_counter()
+        await asyncio.sleep(0.005)
+        lat.append((time.perf_counter() - t0 - 0.005) * 1000)
+
+
+async def _tormenta(modo: str, ctx: CryptContext, h: str, logins: int) -> dict:
+    stop, lat = asyncio.Event(), []
+    pinger = asyncio.create_task(_ping(stop, lat))
+    await asyncio.sleep(0.05)
+    rechazados = 0
+
+    async def login():
+        nonlocal rechazados
+        if modo == "inline":
+            ctx.verify("secreto", h)
+            return
+        try:
+            await ejecutar(ctx.verify, "secreto", h)
+        except HashingSaturado:
+            rechazados += 1
+
+    t0 = time.perf_counter()
+    await asyncio.gather(*(login() for _ in range(logins)))
+    total = time.perf_counter() - t0
+    stop.set()
+    await pinger
+    lat = np.asarray(lat or [0.0])
+    return {"logins_s": (logins - rechazados) / total, "rechazados": rechazados,
+            "p50": float(np.percentile(lat, 50)), "p99": float(np.percentile(lat, 99)),
+            "max": float(lat.max())}
+
+
+def run(logins: int = 64, rounds: int = 12) -> dict:
+    ctx = CryptContext(schemes=["bcrypt"], bcrypt__rounds=rounds)
+    h = ctx.hash("secreto")
+    return {m: asyncio.run(_tormenta(m, ctx, h, logins)) for m in ("inline", "pool")}
+
+
+if __name__ == "__main__":
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--logins", type=int, default=64)
+    ap.add_argument("--rounds", type=int, default=12)
+    args = ap.parse_args()
+    for modo, r in run(args.logins, args.rounds).items():
+        print(f"{modo:6s}  {r['logins_s']:6.1f} logins/s  rechazados {r['rechazados']:3d}  "
+              f"retraso de otros requests p50 {r['p50']:7.1f} ms  p99 {r['p99']:7.1f} ms  máx {r['max']:7.1f} ms")
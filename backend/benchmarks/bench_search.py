@@ -0,0 +1,53 @@
+# benchmarks/bench_search.py
+# Latencia de la búsqueda de CVs sobre el snapshot (filtro + matmul + top-K),
+# sin contar el embedding de la consulta (cacheado) ni la lectura final de Mongo.
+#   python -m benchmarks.bench_search [--n 100000] [--dim 1536] [--k 20]
+import argparse
+import tempfile
+import time
+
+import numpy as np
+
+from core.embedding_store import EmbeddingStore
+from cv.services.search_service import top_k_snapshot
+
+_CIUDADES = ["cordoba", "rosario", "buenos aires", "mendoza", "salta", "neuquen"]
+
+
+def run(n: int = 100_000, dim: int = 1536, k: int = 20, queries: int = 20) -> dict:
+    rng = np.random.default_rng(0)
+    now = time.time()
+    with tempfile.TemporaryDirectory() as d:
+        store = EmbeddingStore(d)
+        for s in range(0, n, 20_000):
+            m = min(20_000, n - s)
+            attrs = [{"ciudad": _CIUDADES[i % len(_CIUDADES)], "edad": int(18 + i % 45),
+                      "ts": now - float(i % 365) * 86400} for i in range(s, s + m)]
+            store.extend([f"cv{i}" for i in range(s, s + m)],
+                         rng.standard_normal((m, dim)).astype(np.float32), attrs)
+        store.refresh()
+        casos = {
+            "sin filtros": ({}, {}),
+            "ciudad": ({}, {"ciudad": "cordoba"}),
+            "ciudad+edad+fecha": ({"edad": (25, 40), "ts": (now - 90 * 86400, None)},
+                                  {"ciudad": "rosario"}),
+        }
+        out = {}
+        Q = rng.standard_normal((queries, dim)).astype(np.float32)
+        for nombre, (rangos, iguales) in casos.items():
+            top_k_snapshot(store, Q[0], k, rangos, iguales)  # calentar páginas del mmap
+            t0 = time.perf_counter()
+            for q in Q:
+                top_k_snapshot(store, q, k, rangos, iguales)
+            out[nombre] = (time.perf_counter() - t0) * 1000 / queries
+    return out
+
+
+if __name__ == "__main__":
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--n", type=int, default=100_000)
+    ap.add_argument("--dim", type=int, default=1536)
+    ap.add_argument("--k", type=int, default=20)
+    args = ap.parse_args()
+    for nombre, ms in run(args.n, args.dim, args.k).items():
+        print(f"{nombre:20s} {ms:7.2f} ms/consulta")
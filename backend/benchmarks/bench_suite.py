@@ -0,0 +1,234 @@
+# benchmarks/bench_suite.py
+# Suite reproducible sobre el corpus sintético (benchmarks/corpus.py), con el embedder
+# fake. Resultados en JSON (commit, parámetros, métricas) para comparar entre commits.
+#
+#   python -m benchmarks.bench_suite [--n 2000] [--mongo-uri mongodb://localhost:27017]
+#                                    [--out bench.json] [--comparar base.json]
+#
+# Sin --mongo-uri corre contra mongomock_motor (en memoria): sirve para medir el costo
+# Python (tokens, scoring, dependencias), no el de Mongo; GridFS se omite. Con un
+# mongod local se usa una base temporal bench_<pid> que se borra al terminar.
+import os
+
+# antes de importar el backend: embedder local y settings mínimas
+os.environ.setdefault("EMBED_PROVIDER", "fake")
+os.environ.setdefault("EMBED_DIM", "256")
+os.environ.setdefault("JWT_SECRET_KEY", "bench-" + "0" * 32)
+os.environ.setdefault("JWT_ALGORITHM", "HS256")
+os.environ.setdefault("MONGO_DATABASE", "bench")
+os.environ.setdefault("TRACE_ENABLED", "0")
+
+import argparse
+import asyncio
+import json
+import platform
+import subprocess
+import sys
+import time
+from datetime import datetime, timezone
+from typing import Any, Callable, Dict
+
+import numpy as np
+
+from benchmarks.corpus import cargar_corpus, crear_perfil_activo
+
+
+def _commit() -> str:
+    try:
+        return subprocess.run(["git", "rev-parse", "--short", "HEAD"], capture_output=True,
+                              text=True, check=True).stdout.strip()
+    except Exception:
+        return "desconocido"
+
+
+def _db(uri: str | None):
+    if uri:
+        from motor.motor_asyncio import AsyncIOMotorClient
+        return AsyncIOMotorClient(uri)[f"bench_{os.getpid()}"], "mongod"
+    try:
+        from mongomock_motor import AsyncMongoMockClient
+    except ImportError:
+        sys.exit("Sin --mongo-uri hace falta mongomock-motor (pip install mongomock-motor)")
+    return AsyncMongoMockClient()["bench"], "mongomock"
+
+
+def _lat(xs) -> Dict[str, float]:
+    a = np.asarray(xs) * 1000
+    return {"p50_ms": float(np.percentile(a, 50)), "p99_ms": float(np.percentile(a, 99)),
+            "media_ms": float(a.mean())}
+
+
+async def _tiempos(fn: Callable, n: int):
+    out = []
+    for _ in range(n):
+        t0 = time.perf_counter()
+        await fn()
+        out.append(time.perf_counter() - t0)
+    return out
+
+
+def _tokens(db_docs) -> Dict[str, Any]:
+    from utils.text_normalizer import soft_jaccard, tokens_norm
+    listas = [d[c] for d in db_docs for c in ("tokens_habilidades", "tokens_experiencia",
+                                                 "tokens_formacion", "tokens_idiomas")]
+    t0 = time.perf_counter()
+    sets = [tokens_norm(x) for x in listas]
+    t_norm = time.perf_counter() - t0
+
+    perfil = sets[0]
+    t0 = time.perf_counter()
+    for s in sets:
+        soft_jaccard(perfil, s, thr=87)
+    t_sj = time.perf_counter() - t0
+    return {"tokens_norm": {"us_por_lista": t_norm * 1e6 / len(listas), "listas": len(listas)},
+            "soft_jaccard": {"us_por_par": t_sj * 1e6 / len(sets), "pares": len(sets)}}
+
+
+async def _rebuild(db, perfil_id: str, repeticiones: int) -> Dict[str, Any]:
+    from metricas.services.rebuild import rebuild_ranking_for_profile
+    n = 0
+
+    async def una():
+        nonlocal n
+        n = await rebuild_ranking_for_profile(db, perfil_id)
+
+    ts = await _tiempos(una, repeticiones)
+    return {"cvs": n, "s": float(np.median(ts)), "cvs_s": n / float(np.median(ts))}
+
+
+async def _upsert(db, ids, m: int) -> Dict[str, Any]:
+    from bson import ObjectId
+    from metricas.services.ranking_upsert import upsert_ranking_for_active_profile
+    docs = [d async for d in db["curriculum"].find(
+        {"_id": {"$in": [ObjectId(i) for i in ids[:m]]}}, projection={"cv_vector": 1, "norm": 1})]
+    it = iter(docs)
+
+    async def uno():
+        d = next(it)
+        await upsert_ranking_for_active_profile(db, str(d["_id"]), d["cv_vector"], d["norm"])
+
+    return _lat(await _tiempos(uno, len(docs)))
+
+
+async def _http(db, n_cvs: int, repeticiones: int) -> Dict[str, Any]:
+    """get_ranking paginado y costo de la dependencia de auth, por la app ASGI completa."""
+    import httpx
+    from auth.services import principal_cache
+    from auth.services.auth_service import create_access_token
+    from core.database import get_db
+    from main import app
+
+    async def _get_db():
+        yield db
+
+    app.dependency_overrides[get_db] = _get_db
+    res = await db["users"].insert_one({"username": "bench", "email": "bench@example.com",
+                                         "password_hash": "x", "roles": ["user"], "is_active": True})
+    token = create_access_token(str(res.inserted_id))
+    auth = {"Authorization": f"Bearer {token}"}
+    out: Dict[str, Any] = {}
+    async with httpx.AsyncClient(transport=httpx.ASGITransport(app=app), base_url="http://bench") as c:
+        def get(url: str, **kw):
+            # una respuesta de error mediría otro camino (404, 401): se corta la corrida
+            async def fn():
+                r = await c.get(url, **kw)
+                assert r.status_code == 200, f"GET {url}: HTTP {r.status_code}"
+            return fn
+
+        pagina = 100
+        for nombre, skip in (("primera", 0), ("media", n_cvs // 2), ("ultima", max(0, n_cvs - pagina))):
+            out[f"get_ranking_{nombre}"] = _lat(await _tiempos(
+                get("/api/metricas/ranking", params={"limit": pagina, "skip": skip}), repeticiones))
+        base = _lat(await _tiempos(get("/health"), repeticiones))
+        me = get("/api/users/me", headers=auth)
+        caliente = _lat(await _tiempos(me, repeticiones))
+
+        async def frio():
+            principal_cache._cache.clear()
+            await me()
+        fria = _lat(await _tiempos(frio, repeticiones))
+    app.dependency_overrides.pop(get_db, None)
+    out["health"] = base
+    out["auth_cache_caliente"] = {**caliente, "overhead_ms": caliente["p50_ms"] - base["p50_ms"]}
+    out["auth_cache_frio"] = {**fria, "overhead_ms": fria["p50_ms"] - base["p50_ms"]}
+    return out
+
+
+async def _gridfs(db, repeticiones: int, kb: int = 200) -> Dict[str, Any]:
+    from cv.services.cv_service import _gridfs as bucket, cargar_cv
+    fs = bucket(db)
+    data = np.random.default_rng(0).bytes(kb * 1024)
+    ids = []
+
+    async def subir():
+        ids.append(await fs.upload_from_stream("bench.pdf", data))
+
+    sube = _lat(await _tiempos(subir, repeticiones))
+    it = iter(ids)
+    baja = _lat(await _tiempos(lambda: cargar_cv(db, str(next(it))), repeticiones))
+    return {"kb": kb, "upload": sube, "download": baja}
+
+
+async def _correr(args) -> Dict[str, Any]:
+    db, motor = _db(args.mongo_uri)
+    r: Dict[str, Any] = {}
+    try:
+        t0 = time.perf_counter()
+        ids = await cargar_corpus(db, args.n, seed=args.seed)
+        r["carga_corpus_s"] = time.perf_counter() - t0
+        docs = [d async for d in db["curriculum"].find({}, projection={
+            "tokens_habilidades": 1, "tokens_experiencia": 1, "tokens_formacion": 1, "tokens_idiomas": 1})]
+        r.update(_tokens(docs))
+        perfil_id = await crear_perfil_activo(db, seed=args.seed)
+        r["rebuild"] = await _rebuild(db, perfil_id, args.repeticiones)
+        r["upsert_active_profile"] = await _upsert(db, ids, min(args.n, 200))
+        r.update(await _http(db, args.n, args.repeticiones * 10))
+        r["gridfs"] = await _gridfs(db, args.repeticiones * 4) if motor == "mongod" else "omitido (requiere --mongo-uri)"
+    finally:
+        if motor == "mongod":
+            await db.client.drop_database(db.name)
+    return {"commit": _commit(), "fecha": datetime.now(timezone.utc).isoformat(),
+            "python": platform.python_version(), "mongo": motor,
+            "params": {"n": args.n, "seed": args.seed, "repeticiones": args.repeticiones,
+                       "embed_dim": int(os.environ["EMBED_DIM"])},
+            "resultados": r}
+
+
+def _planas(d: Dict[str, Any], pref: str = "") -> Dict[str, float]:
+    out = {}
+    for k, v in d.items():
+        if isinstance(v, dict):
+            out.update(_planas(v, f"{pref}{k}."))
+        elif isinstance(v, (int, float)):
+            out[f"{pref}{k}"] = float(v)
+    return out
+
+
+def comparar(base: Dict[str, Any], nuevo: Dict[str, Any]) -> None:
+    a, b = _planas(base["resultados"]), _planas(nuevo["resultados"])
+    print(f"{'métrica':45s} {base['commit']:>12s} {nuevo['commit']:>12s}   nuevo/base")
+    for k in sorted(a.keys() & b.keys()):
+        ratio = b[k] / a[k] if a[k] else float("nan")
+        print(f"{k:45s} {a[k]:12.3f} {b[k]:12.3f}   {ratio:6.2f}x")
+
+
+if __name__ == "__main__":
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--n", type=int, default=2000)
+    ap.add_argument("--seed", type=int, default=0)
+    ap.add_argument("--repeticiones", type=int, default=3)
+    ap.add_argument("--mongo-uri", default=None)
+    ap.add_argument("--out", default=None, help="JSON de salida (default bench_<commit>.json)")
+    ap.add_argument("--comparar", default=None, help="JSON de una corrida anterior")
+    args = ap.parse_args()
+
+    res = asyncio.run(_correr(args))
+    out = args.out or f"bench_{res['commit']}.json"
+    with open(out, "w", encoding="utf-8") as f:
+        json.dump(res, f, indent=2, ensure_ascii=False)
+    for k, v in _planas(res["resultados"]).items():
+        print(f"{k:45s} {v:12.3f}")
+    print(f"→ {out}")
+    if args.comparar:
+        with open(args.comparar, encoding="utf-8") as f:
+            comparar(json.load(f), res)
@@ -0,0 +1,44 @@
+# benchmarks/bench_vectors.py
+# Tamaño BSON y costo de lectura de un doc de curriculum según el formato del vector.
+# Simula el camino del rebuild: bytes BSON → dict → ndarray float32.
+#   python -m benchmarks.bench_vectors [--n 2000] [--dim 1536]
+import argparse
+import time
+
+import bson
+import numpy as np
+
+from core.vectors import encode_vector, decode_vector
+
+
+def run(n: int = 2000, dim: int = 1536) -> dict:
+    rng = np.random.default_rng(0)
+    vecs = rng.standard_normal((n, dim)).astype(np.float32)
+    out = {}
+    for storage in ("list", "f32", "f16"):
+        raws = [bson.encode({"cv_vector": encode_vector(v, storage), "norm": 1.0})
+                for v in vecs]
+        t0 = time.perf_counter()
+        acc = 0.0
+        for raw in raws:
+            x = decode_vector(bson.decode(raw)["cv_vector"])
+            acc += float(x[0])
+        dt = time.perf_counter() - t0
+        out[storage] = {
+            "bytes_per_doc": sum(len(r) for r in raws) / n,
+            "decode_ms_per_doc": dt * 1000 / n,
+        }
+    return out
+
+
+if __name__ == "__main__":
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--n", type=int, default=2000)
+    ap.add_argument("--dim", type=int, default=1536)
+    args = ap.parse_args()
+    res = run(args.n, args.dim)
+    base = res["list"]
+    for k, r in res.items():
+        print(f"{k:5s} {r['bytes_per_doc']:9.0f} B/doc  {r['decode_ms_per_doc']:.4f} ms/doc  "
+              f"(x{base['bytes_per_doc'] / r['bytes_per_doc']:.1f} más chico, "
+              f"x{base['decode_ms_per_doc'] / r['decode_ms_per_doc']:.1f} más rápido)")
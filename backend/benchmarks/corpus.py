@@ -0,0 +1,139 @@
+# benchmarks/corpus.py
+# Corpus sintético de CVs y perfiles para los benchmarks: tokens en español con
+# frecuencias tipo Zipf (pocas habilidades muy comunes, cola larga), variantes de
+# escritura (sin tildes, mayúsculas, typos) para ejercitar el jaccard blando, y
+# embeddings del embedder fake (EMBED_PROVIDER=fake), deterministas por texto.
+# Mismo seed → mismo corpus: los resultados se comparan entre commits.
+import time
+import unicodedata
+from typing import Any, Dict, List
+
+import numpy as np
+
+HABILIDADES = [
+    "python", "sql", "excel", "javascript", "java", "git", "docker", "linux", "react",
+    "django", "fastapi", "node.js", "typescript", "mongodb", "postgresql", "aws", "azure",
+    "kubernetes", "power bi", "tableau", "scrum", "jira", "sap", "contabilidad",
+    "liquidación de sueldos", "atención al cliente", "ventas", "negociación", "marketing digital",
+    "seo", "photoshop", "illustrator", "autocad", "solidworks", "análisis de datos",
+    "machine learning", "estadística", "redacción", "gestión de proyectos", "logística",
+    "comercio exterior", "facturación", "impuestos", "auditoría", "recursos humanos",
+    "selección de personal", "capacitación", "soporte técnico", "redes", "ciberseguridad",
+    "c#", ".net", "php", "laravel", "angular", "vue", "flutter", "kotlin", "swift", "go",
+    "rust", "spark", "airflow", "terraform", "ansible", "jenkins", "selenium", "testing",
+    "ux", "ui", "figma", "trabajo en equipo", "liderazgo", "comunicación efectiva",
+    "resolución de problemas", "pensamiento crítico", "organización", "proactividad",
+]
+PUESTOS = [
+    "desarrollador backend", "desarrollador frontend", "analista de datos", "data scientist",
+    "administrativo contable", "analista contable", "vendedor", "ejecutivo de cuentas",
+    "soporte técnico", "administrador de sistemas", "devops", "qa tester", "diseñador gráfico",
+    "project manager", "analista de recursos humanos", "operario logístico", "jefe de ventas",
+    "community manager", "auditor", "analista funcional", "líder técnico", "pasante",
+]
+FORMACION = [
+    "ingeniería en sistemas", "licenciatura en administración", "contador público",
+    "técnico en programación", "licenciatura en economía", "ingeniería industrial",
+    "licenciatura en recursos humanos", "diseño gráfico", "analista de sistemas",
+    "secundario completo", "maestría en data science", "licenciatura en marketing",
+]
+IDIOMAS = ["español", "inglés", "portugués", "francés", "italiano", "alemán"]
+NOMBRES = ["juan", "maría", "lucía", "martín", "sofía", "diego", "valentina", "pablo", "camila", "nicolás"]
+APELLIDOS = ["gonzález", "rodríguez", "gómez", "fernández", "lópez", "díaz", "martínez", "pérez", "romero"]
+CIUDADES = ["córdoba", "rosario", "buenos aires", "mendoza", "salta", "neuquén", "la plata"]
+
+
+def _pesos_zipf(n: int, s: float = 0.9) -> np.ndarray:
+    w = 1.0 / np.arange(1, n + 1) ** s
+    return w / w.sum()
+
+
+_PZ = {id(v): _pesos_zipf(len(v)) for v in (HABILIDADES, PUESTOS, FORMACION, IDIOMAS)}
+
+
+def _sin_tildes(s: str) -> str:
+    return "".join(c for c in unicodedata.normalize("NFD", s) if unicodedata.category(c) != "Mn")
+
+
+def _variante(rng: np.random.Generator, t: str, p: float) -> str:
+    """Cómo lo escribiría un candidato: igual, sin tildes, capitalizado o con un typo."""
+    if rng.random() >= p:
+        return t
+    r = rng.integers(0, 3)
+    if r == 0:
+        return _sin_tildes(t)
+    if r == 1:
+        return t.title()
+    if len(t) > 4:
+        i = int(rng.integers(1, len(t) - 2))
+        return t[:i] + t[i + 1] + t[i] + t[i + 2:]
+    return t
+
+
+def _muestra(rng, vocab: List[str], k: int, p_var: float = 0.0) -> List[str]:
+    k = min(k, len(vocab))
+    idx = rng.choice(len(vocab), size=k, replace=False, p=_PZ[id(vocab)])
+    return [_variante(rng, vocab[i], p_var) for i in idx]
+
+
+def generar_cv(rng: np.random.Generator, i: int, p_var: float = 0.15) -> Dict[str, Any]:
+    """Doc de curriculum como lo deja la ingesta (sin vector ni tokidx_*)."""
+    hab = _muestra(rng, HABILIDADES, int(rng.integers(5, 16)), p_var)
+    exp = _muestra(rng, PUESTOS, int(rng.integers(1, 5)), p_var)
+    edu = _muestra(rng, FORMACION, int(rng.integers(1, 3)), p_var)
+    idi = _muestra(rng, IDIOMAS, int(rng.integers(1, 4)), p_var)
+    nombre, apellido = NOMBRES[i % len(NOMBRES)], APELLIDOS[(i // len(NOMBRES)) % len(APELLIDOS)]
+    return {
+        "nombre": nombre, "apellido": apellido,
+        "email": f"cv{i}@bench.local",
+        "ciudad": CIUDADES[int(rng.integers(0, len(CIUDADES)))],
+        "edad": int(rng.integers(18, 65)),
+        "timestamp": time.time() - float(rng.integers(0, 365 * 86400)),
+        "cv_text": " ".join(exp + edu + hab + idi),
+        "tokens_habilidades": hab, "tokens_experiencia": exp,
+        "tokens_formacion": edu, "tokens_idiomas": idi,
+    }
+
+
+def generar_perfil(rng: np.random.Generator) -> Dict[str, Any]:
+    """Payload de guardar_perfil (sin activar: el benchmark decide cuándo)."""
+    return {
+        "puesto": PUESTOS[int(rng.integers(0, 6))],
+        "atributos": _muestra(rng, HABILIDADES, 8),
+        "experiencia": _muestra(rng, PUESTOS, 2),
+        "educacion": _muestra(rng, FORMACION, 2),
+        "idiomas": _muestra(rng, IDIOMAS, 2),
+        "edad": 30, "activo": False, "publicado": False, "usuario": "bench",
+    }
+
+
+async def cargar_corpus(db, n: int, seed: int = 0, lote: int = 500) -> List[str]:
+    """Inserta n CVs (vigentes, con vector fake y tokidx_*) y devuelve sus ids."""
+    from core.ai import embed_texts
+    from core.vectors import encode_vector
+    from metricas.services.token_index import indexar_tokens
+
+    rng = np.random.default_rng(seed)
+    ids: List[str] = []
+    for s in range(0, n, lote):
+        docs = [generar_cv(rng, i) for i in range(s, min(n, s + lote))]
+        vecs = embed_texts([d["cv_text"] for d in docs])
+        for d, v in zip(docs, vecs):
+            d["cv_vector"] = encode_vector(v)
+            d["norm"] = float(np.linalg.norm(v))
+            d["is_current"] = True
+            d.update(await indexar_tokens(db, d))
+        res = await db["curriculum"].insert_many(docs)
+        ids += [str(i) for i in res.inserted_ids]
+    return ids
+
+
+async def crear_perfil_activo(db, seed: int = 0) -> str:
+    from metricas.services.perfil_cache import bump_perfiles_version
+    from perfil.services.perfil_service import guardar_perfil
+    from bson import ObjectId
+
+    perfil_id = await guardar_perfil(db, generar_perfil(np.random.default_rng(seed + 10_000)))
+    await db["perfiles"].update_one({"_id": ObjectId(perfil_id)}, {"$set": {"activo": True}})
+    await bump_perfiles_version(db)
+    return perfil_id
@@ -1,15 +1,25 @@
 # core/ai.py
 from __future__ import annotations
+from functools import lru_cache
 from typing import List
+import hashlib
 import os
 import numpy as np
 from openai import OpenAI
 
+from core.metrics import llamada_openai
+from core.tracing import span
+
 # Config por env
+# "openai" | "fake": vectores deterministas locales (bolsa de palabras hasheada), para
+# benchmarks y desarrollo sin API key; textos con palabras en común dan coseno alto
+EMBED_PROVIDER = os.getenv("EMBED_PROVIDER", "openai")
 EMBED_MODEL = os.getenv("EMBED_MODEL", "text-embedding-3-small")
 # Si querés recortar dimensiones (opcional):
 EMBED_DIM = os.getenv("EMBED_DIM")
 EMBED_DIM = int(EMBED_DIM) if (EMBED_DIM and EMBED_DIM.isdigit()) else None
+# consultas de búsqueda cacheadas en memoria (texto → vector)
+EMBED_QUERY_CACHE = int(os.getenv("EMBED_QUERY_CACHE", "1024"))
 
 _client: OpenAI | None = None
 
@@ -21,12 +31,34 @@ def _client_singleton() -> OpenAI:
     return _client
 
 
+@lru_cache(maxsize=65536)
+def _vector_palabra(palabra: str, dim: int) -> np.ndarray:
+    seed = int.from_bytes(hashlib.blake2b(palabra.encode(), digest_size=8).digest(), "little")
+    return np.random.default_rng(seed).standard_normal(dim).astype(np.float32)
+
+
+def _embed_fake(texts: List[str]) -> List[List[float]]:
+    dim = EMBED_DIM or 1536
+    out = []
+    for t in texts:
+        v = np.zeros(dim, dtype=np.float32)
+        for w in (t or "").lower().split():
+            v += _vector_palabra(w, dim)
+        n = float(np.linalg.norm(v))
+        out.append((v / n if n else v).tolist())
+    return out
+
+
 def _embed_texts_sync(texts: List[str]) -> List[List[float]]:
+    if EMBED_PROVIDER == "fake":
+        with span("embeddings.fake", n=len(texts)):
+            return _embed_fake(texts)
     client = _client_singleton()
     kwargs = {"model": EMBED_MODEL, "input": texts}
     if EMBED_DIM:  # opcional, ej 768/1024
         kwargs["dimensions"] = EMBED_DIM
-    resp = client.embeddings.create(**kwargs)
+    with llamada_openai("embeddings"), span("openai.embeddings", n=len(texts)):
+        resp = client.embeddings.create(**kwargs)
     return [item.embedding for item in resp.data]
 
 
@@ -40,6 +72,22 @@ def embed_texts(texts: List[str]) -> List[List[float]]:
     return _embed_texts_sync(texts)
 
 
+@lru_cache(maxsize=EMBED_QUERY_CACHE)
+def _embed_query_cached(text: str) -> np.ndarray:
+    v = np.asarray(_embed_texts_sync([text])[0], dtype=np.float32)
+    v.setflags(write=False)  # compartido entre llamadas: solo lectura
+    return v
+
+
+def embed_query(text: str) -> np.ndarray:
+    """
+    Embedding de una consulta de búsqueda, con cache LRU por texto (espacios
+    colapsados). Repetir la misma búsqueda no vuelve a llamar a la API.
+    Igual que embed_texts, llamarla en un hilo: anyio.to_thread.run_sync(embed_query, q)
+    """
+    return _embed_query_cached(" ".join((text or "").split()))
+
+
 def cosine(a: List[float], b: List[float]) -> float:
     va = np.asarray(a, dtype=np.float32)
     vb = np.asarray(b, dtype=np.float32)
@@ -0,0 +1,242 @@
+# core/ann_index.py
+# Índice IVF-Flat (k-means esférico + listas invertidas) sobre el snapshot de
+# embeddings (core/embedding_store). Solo CPU/numpy, en proceso, persistido al
+# lado del snapshot:
+#
+#   <EMBED_STORE_DIR>/ivf_centroids.npy → (nlist × d) float32, centroides L2-normalizados
+#   <EMBED_STORE_DIR>/ivf_assign.i32    → lista asignada a cada fila del snapshot (solo append)
+#   <EMBED_STORE_DIR>/ivf_meta.json     → {"generation": g, "nlist": n, "dim": d}
+#
+# Las filas del snapshot que todavía no tienen lista asignada (ingesta reciente,
+# índice sin entrenar) se comparan por fuerza bruta ("cola"), así que la búsqueda
+# nunca pierde CVs nuevos: sin entrenar, search() equivale al scorer exacto.
+#
+#   python -m core.ann_index train     (desde backend/, con EMBED_STORE_DIR configurado)
+from __future__ import annotations
+import json
+import os
+import threading
+from typing import List, Optional, Tuple
+
+import numpy as np
+
+from core.config import ANN_NLIST, ANN_NPROBE
+from core.embedding_store import EmbeddingStore, _unit, get_store
+
+_CENTROIDS = "ivf_centroids.npy"
+_ASSIGN = "ivf_assign.i32"
+_META = "ivf_meta.json"
+
+# filas por bloque al asignar (acota la memoria temporal de la matmul)
+_CHUNK = 65536
+# si la cola supera esta fracción de lo indexado, se rearman las listas en memoria
+_TAIL_REINDEX = 0.05
+
+
+def _assign(C: np.ndarray, X: np.ndarray) -> np.ndarray:
+    """Lista más cercana (máximo producto interno) de cada fila, por bloques."""
+    out = np.empty(len(X), dtype=np.int32)
+    for s in range(0, len(X), _CHUNK):
+        out[s:s + _CHUNK] = np.argmax(np.asarray(X[s:s + _CHUNK]) @ C.T, axis=1)
+    return out
+
+
+def kmeans_esferico(X: np.ndarray, k: int, iters: int = 10, seed: int = 0) -> np.ndarray:
+    """k-means con similitud coseno (filas de X ya normalizadas). Devuelve centroides unitarios."""
+    rng = np.random.default_rng(seed)
+    C = np.array(X[rng.choice(len(X), size=k, replace=False)], dtype=np.float32)
+    for _ in range(iters):
+        a = _assign(C, X)
+        sums = np.zeros_like(C)
+        np.add.at(sums, a, np.asarray(X))
+        counts = np.bincount(a, minlength=k)
+        vacias = np.flatnonzero(counts == 0)
+        if len(vacias):
+            # listas vacías: se re-siembran con puntos al azar
+            sums[vacias] = X[rng.choice(len(X), size=len(vacias), replace=False)]
+        norms = np.linalg.norm(sums, axis=1, keepdims=True)
+        norms[norms == 0] = 1.0
+        C = (sums / norms).astype(np.float32)
+    return C
+
+
+class IvfIndex:
+    def __init__(self, store: EmbeddingStore, nprobe: int = ANN_NPROBE):
+        self.store = store
+        self.nprobe = nprobe
+        self._mu = threading.Lock()
+        self._C: Optional[np.ndarray] = None
+        self._meta: dict = {}
+        # listas en memoria: filas ordenadas por lista + offsets de cada lista
+        self._order = np.zeros(0, dtype=np.int64)
+        self._bounds = np.zeros(1, dtype=np.int64)
+        self._indexed = 0      # filas cubiertas por _order/_bounds
+        self._mtime = 0.0
+        self._C_cache: Tuple[float, Optional[np.ndarray]] = (0.0, None)
+
+    def _p(self, name: str) -> str:
+        return os.path.join(self.store.path, name)
+
+    def _read_meta(self) -> dict:
+        try:
+            with open(self._p(_META)) as fh:
+                return json.load(fh)
+        except (FileNotFoundError, ValueError):
+            return {}
+
+    def _assigned_rows(self) -> int:
+        try:
+            return os.path.getsize(self._p(_ASSIGN)) // 4
+        except FileNotFoundError:
+            return 0
+
+    def _centroids(self) -> np.ndarray:
+        mtime = os.path.getmtime(self._p(_CENTROIDS))
+        if self._C_cache[0] != mtime:
+            self._C_cache = (mtime, np.load(self._p(_CENTROIDS)))
+        return self._C_cache[1]
+
+    # ---------- escritura (bajo el lock del snapshot) ----------
+    def train(self, nlist: int = ANN_NLIST, sample: int = 100_000, iters: int = 10) -> int:
+        """Entrena centroides sobre una muestra de filas vigentes y asigna todo el snapshot."""
+        self.store.refresh()
+        ids, X = self.store.matrix()
+        if not len(ids):
+            return 0
+        nlist = nlist or max(1, int(np.sqrt(len(ids))))
+        nlist = min(nlist, len(ids))
+        rng = np.random.default_rng(0)
+        sel = np.sort(rng.choice(len(ids), size=min(sample, len(ids)), replace=False))
+        C = kmeans_esferico(np.asarray(X[sel]), nlist, iters=iters)
+        with self.store.locked():
+            self.store.refresh()
+            mm, _, _, gen = self.store.view()
+            tmp = self._p(_ASSIGN + ".tmp")
+            _assign(C, mm).tofile(tmp)
+            np.save(self._p(_CENTROIDS), C)
+            os.replace(tmp, self._p(_ASSIGN))
+            self._write_meta({"generation": gen, "nlist": nlist, "dim": int(C.shape[1])})
+        self._load(force=True)
+        return nlist
+
+    def _write_meta(self, meta: dict) -> None:
+        tmp = self._p(_META + ".tmp")
+        with open(tmp, "w") as fh:
+            json.dump(meta, fh)
+        os.replace(tmp, self._p(_META))
+
+    def catch_up(self) -> int:
+        """
+        Asigna lista a las filas nuevas del snapshot (hook de ingesta). Si el
+        snapshot se reconstruyó (otra generación), re-asigna todo con los mismos centroides.
+        """
+        meta = self._read_meta()
+        if not meta:
+            return 0
+        with self.store.locked():
+            self.store.refresh()
+            mm, _, _, gen = self.store.view()
+            if mm is None or mm.shape[1] != int(meta.get("dim", 0)):
+                return 0
+            C = self._centroids()
+            if int(meta.get("generation", -1)) != gen:
+                tmp = self._p(_ASSIGN + ".tmp")
+                _assign(C, mm).tofile(tmp)
+                os.replace(tmp, self._p(_ASSIGN))
+                self._write_meta({**meta, "generation": gen})
+                return len(mm)
+            done = self._assigned_rows()
+            if done >= len(mm):
+                return 0
+            with open(self._p(_ASSIGN), "ab") as fh:
+                fh.write(_assign(C, mm[done:]).astype("<i4").tobytes())
+            return len(mm) - done
+
+    # ---------- lectura ----------
+    def _load(self, force: bool = False) -> None:
+        """(Re)arma las listas en memoria si el archivo de asignaciones cambió lo suficiente."""
+        try:
+            mtime = os.path.getmtime(self._p(_META))
+        except FileNotFoundError:
+            with self._mu:
+                self._C, self._meta, self._indexed = None, {}, 0
+            return
+        meta = self._read_meta()
+        rows = self._assigned_rows()
+        with self._mu:
+            stale = (force or mtime != self._mtime or self._C is None
+                     or rows - self._indexed > max(1024, _TAIL_REINDEX * self._indexed))
+            if not stale:
+                return
+        C = self._centroids()
+        assign = np.fromfile(self._p(_ASSIGN), dtype="<i4", count=rows)
+        order = np.argsort(assign, kind="stable")
+        bounds = np.searchsorted(assign[order], np.arange(len(C) + 1))
+        with self._mu:
+            self._C, self._meta, self._mtime = C, meta, mtime
+            self._order, self._bounds, self._indexed = order, bounds, rows
+
+    def search(self, perfil_vector, k: int, nprobe: Optional[int] = None) -> Tuple[List[str], np.ndarray]:
+        """Top-k CVs por coseno: nprobe listas más cercanas + cola sin indexar, filas vigentes."""
+        self._load()
+        mm, ids, row_of, gen = self.store.view()
+        q = _unit(perfil_vector)
+        if mm is None or q.size != mm.shape[1] or k <= 0:
+            return [], np.zeros(0, dtype=np.float32)
+        with self._mu:
+            C, order, bounds, indexed = self._C, self._order, self._bounds, self._indexed
+            usable = C is not None and self._meta.get("generation") == gen and C.shape[1] == q.size
+        rows = len(mm)
+        if usable:
+            indexed = min(indexed, rows)
+            probe = min(nprobe or self.nprobe, len(C))
+            listas = np.argpartition(-(C @ q), probe - 1)[:probe]
+            partes = [order[bounds[c]:bounds[c + 1]] for c in listas]
+            partes.append(np.arange(indexed, rows, dtype=np.int64))
+            cand = np.concatenate(partes)
+            cand = cand[cand < rows]
+        else:
+            cand = np.arange(rows, dtype=np.int64)
+        if not len(cand):
+            return [], np.zeros(0, dtype=np.float32)
+
+        # filas pisadas (última-fila-gana) quedan afuera
+        vivas = np.fromiter((row_of.get(ids[r]) == r for r in cand.tolist()),
+                            dtype=bool, count=len(cand))
+        cand = cand[vivas]
+        cand.sort()  # lectura secuencial del mmap
+        scores = np.asarray(mm[cand] @ q) if len(cand) else np.zeros(0, dtype=np.float32)
+        if len(cand) > k:
+            top = np.argpartition(-scores, k - 1)[:k]
+            cand, scores = cand[top], scores[top]
+        o = np.argsort(-scores)
+        return [ids[r] for r in cand[o].tolist()], scores[o]
+
+
+_index: Optional[IvfIndex] = None
+
+
+def get_ann() -> Optional[IvfIndex]:
+    """Singleton del índice; None si el snapshot de embeddings está deshabilitado."""
+    global _index
+    store = get_store()
+    if store is None:
+        return None
+    if _index is None:
+        _index = IvfIndex(store)
+    return _index
+
+
+if __name__ == "__main__":
+    import sys
+
+    ann = get_ann()
+    if ann is None:
+        raise SystemExit("EMBED_STORE_DIR no está definido")
+    cmd = sys.argv[1] if len(sys.argv) > 1 else "train"
+    if cmd == "train":
+        print(f"OK: {ann.train()} listas")
+    elif cmd == "catch_up":
+        print(f"OK: {ann.catch_up()} filas asignadas")
+    else:
+        raise SystemExit("uso: python -m core.ann_index [train|catch_up]")
@@ -67,6 +67,14 @@ class Settings(BaseSettings):
     # Aceptar alias si lo usabas antes (opcional)
     MONGO_URI: str | None = None
 
+    # Pool y compresión del cliente (None → default del driver)
+    MONGO_MAX_POOL_SIZE: int = 100
+    MONGO_MIN_POOL_SIZE: int = 0
+    MONGO_MAX_IDLE_TIME_MS: int | None = None
+    MONGO_WAIT_QUEUE_TIMEOUT_MS: int | None = None
+    MONGO_COMPRESSORS: str | None = None          # ej "zstd,zlib" (zstd requiere zstandard)
+    MONGO_ZLIB_LEVEL: int | None = None
+
     @computed_field  # type: ignore[misc]
     @property
     def MONGODB_URI(self) -> str:
@@ -130,3 +138,47 @@ W_EDU = float(os.getenv("RANK_W_EDU", "0.35"))
 W_IDI = float(os.getenv("RANK_W_IDI", "0"))
 # % de similitud para contar en jaccard
 THR_JACCARD = int(os.getenv("RANK_THR_JACCARD", "87"))
+# tamaño de lote del cursor para exportar rankings completos (memoria constante)
+EXPORT_BATCH_SIZE = int(os.getenv("RANK_EXPORT_BATCH", "2000"))
+# cada cuántos segundos un worker verifica el contador de versión de perfiles (cache de scoring)
+PERFIL_CACHE_CHECK_S = float(os.getenv("PERFIL_CACHE_CHECK_S", "1"))
+# formato de los embeddings en Mongo (core/vectors): "f32" | "f16" | "list"
+VECTOR_STORAGE = os.getenv("VECTOR_STORAGE", "f32").strip().lower()
+# directorio del snapshot mmap de embeddings compartido entre workers (core/embedding_store); vacío → deshabilitado
+EMBED_STORE_DIR = os.getenv("EMBED_STORE_DIR", "").strip()
+# índice ANN (IVF) sobre el snapshot de embeddings: cantidad de listas (0 → √n) y listas sondeadas
+ANN_NLIST = int(os.getenv("ANN_NLIST", "0"))
+ANN_NPROBE = int(os.getenv("ANN_NPROBE", "16"))
+# rebuild: solo los K CVs más cercanos por coseno pasan al jaccard blando (0 → todos)
+RANK_TOPK = int(os.getenv("RANK_TOPK", "0"))
+# búsqueda por palabras clave (BM25 sobre cv_text) y fusión híbrida (RRF) con el coseno
+BM25_K1 = float(os.getenv("BM25_K1", "1.2"))
+BM25_B = float(os.getenv("BM25_B", "0.75"))
+SEARCH_RRF_K = int(os.getenv("SEARCH_RRF_K", "60"))
+# casi duplicados (LSH): un candidato cuenta si supera ambos umbrales contra el CV nuevo
+LSH_DUP_COS = float(os.getenv("LSH_DUP_COS", "0.95"))
+LSH_DUP_JACCARD = float(os.getenv("LSH_DUP_JACCARD", "0.7"))
+# split caliente/frío de curriculum: nivel zlib del doc de detalle (cv_text + análisis GPT); 0 → sin comprimir
+CV_DETALLE_ZLIB = int(os.getenv("CV_DETALLE_ZLIB", "6"))
+# auth: cache del usuario autenticado por (sub, token_version), TTL y tope de entradas;
+# cada cuántos segundos un worker trae revocaciones nuevas y la versión de usuarios
+AUTH_CACHE_TTL_S = float(os.getenv("AUTH_CACHE_TTL_S", "30"))
+AUTH_CACHE_MAX = int(os.getenv("AUTH_CACHE_MAX", "10000"))
+AUTH_SYNC_S = float(os.getenv("AUTH_SYNC_S", "1"))
+# hashing de passwords (bcrypt) fuera del event loop: hilos dedicados, cola máxima
+# (más allá → 503) y costo; los hashes con otro costo se re-hashean en el login
+PWD_HASH_WORKERS = int(os.getenv("PWD_HASH_WORKERS", str(min(4, os.cpu_count() or 1))))
+PWD_HASH_QUEUE = int(os.getenv("PWD_HASH_QUEUE", "32"))
+PWD_BCRYPT_ROUNDS = int(os.getenv("PWD_BCRYPT_ROUNDS", "12"))
+# trazas por request (core/tracing): header Server-Timing, log JSON de spans por request
+# y export OTLP/HTTP opcional (p.ej. http://localhost:4318/v1/traces; requiere opentelemetry-sdk)
+TRACE_ENABLED = os.getenv("TRACE_ENABLED", "1") == "1"
+TRACE_LOG = os.getenv("TRACE_LOG", "0") == "1"
+TRACE_OTLP_ENDPOINT = os.getenv("TRACE_OTLP_ENDPOINT", "")
+# comandos de Mongo más lentos que esto (ms) van al slow log (una línea JSON); 0 → sin slow log
+MONGO_SLOW_MS = float(os.getenv("MONGO_SLOW_MS", "100"))
+# lag del event loop: intervalo de muestreo y tamaño de la ventana de cuantiles;
+# LOOP_BLOCK_MS > 0 activa el watchdog que loguea el stack de quien bloquea el loop más de N ms
+LOOP_LAG_INTERVAL_S = float(os.getenv("LOOP_LAG_INTERVAL_S", "0.5"))
+LOOP_LAG_WINDOW = int(os.getenv("LOOP_LAG_WINDOW", "600"))
+LOOP_BLOCK_MS = float(os.getenv("LOOP_BLOCK_MS", "0"))
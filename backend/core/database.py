@@ -1,17 +1,34 @@
 from motor.motor_asyncio import AsyncIOMotorClient, AsyncIOMotorDatabase
 from typing import AsyncGenerator
 from .config import get_settings
+from .metrics import CommandMetrics, PoolMetrics
 
 _client: AsyncIOMotorClient | None = None
 
 
+def _opciones_pool(cfg) -> dict:
+    """Pool y compresión desde settings; las no definidas quedan con el default del driver."""
+    opts = {"maxPoolSize": cfg.MONGO_MAX_POOL_SIZE, "minPoolSize": cfg.MONGO_MIN_POOL_SIZE}
+    if cfg.MONGO_MAX_IDLE_TIME_MS is not None:
+        opts["maxIdleTimeMS"] = cfg.MONGO_MAX_IDLE_TIME_MS
+    if cfg.MONGO_WAIT_QUEUE_TIMEOUT_MS is not None:
+        opts["waitQueueTimeoutMS"] = cfg.MONGO_WAIT_QUEUE_TIMEOUT_MS
+    if cfg.MONGO_COMPRESSORS:
+        opts["compressors"] = cfg.MONGO_COMPRESSORS
+        if cfg.MONGO_ZLIB_LEVEL is not None:
+            opts["zlibCompressionLevel"] = cfg.MONGO_ZLIB_LEVEL
+    return opts
+
+
 def get_client() -> AsyncIOMotorClient:
     """Singleton del cliente Mongo."""
     global _client
     if _client is None:
         cfg = get_settings()
         _client = AsyncIOMotorClient(
-            cfg.MONGODB_URI, serverSelectionTimeoutMS=3000)
+            cfg.MONGODB_URI, serverSelectionTimeoutMS=3000,
+            event_listeners=[PoolMetrics(), CommandMetrics()],
+            **_opciones_pool(cfg))
     return _client
 
 
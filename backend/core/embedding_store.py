@@ -0,0 +1,469 @@
+# core/embedding_store.py
+# Snapshot local de embeddings de CVs compartido entre workers de uvicorn.
+#
+#   <EMBED_STORE_DIR>/vectors.f32  → matriz float32 (filas L2-normalizadas), solo append
+#   <EMBED_STORE_DIR>/ids.jsonl    → una línea JSON por fila: {"cv_id": ..., <atributos de filtro>}
+#                                     ({"cv_id": ..., "retirado": true} → baja del CV, fila en cero)
+#   <EMBED_STORE_DIR>/meta.json    → {"dim": d, "generation": n}
+#
+# Todos los workers mapean vectors.f32 en modo lectura (np.memmap): el SO comparte
+# las páginas, así que no hay una copia por worker ni un scan de Mongo por rebuild.
+# Las escrituras (append desde guardar_cv/resubir_cv y el build completo) se
+# serializan con flock. Si un cv_id aparece dos veces, vale la última fila; una fila
+# "retirado" (CV borrado, versión histórica o vieja de un cluster de duplicados) lo
+# saca del snapshot hasta que se vuelva a agregar.
+# Si EMBED_STORE_DIR no está definido, el snapshot queda deshabilitado.
+#
+# Los atributos de cada fila (ciudad normalizada, edad, timestamp de carga) se
+# mantienen en columnas numpy para filtrar antes de la matmul (búsqueda de CVs).
+from __future__ import annotations
+import fcntl
+import json
+import math
+import os
+import threading
+import uuid
+from array import array
+from contextlib import contextmanager
+from typing import Any, Dict, List, Optional, Tuple
+
+import anyio
+import numpy as np
+
+from core.config import EMBED_STORE_DIR
+from core.vectors import decode_vector
+from utils.text_normalizer import normalizar_texto
+
+_VEC = "vectors.f32"
+_IDS = "ids.jsonl"
+_META = "meta.json"
+_LOCK = ".lock"
+
+
+def _unit(v) -> np.ndarray:
+    x = decode_vector(v).astype(np.float32, copy=False)
+    n = float(np.linalg.norm(x)) if x.size else 0.0
+    return x / n if n else x
+
+
+def cv_atributos(doc: Dict[str, Any]) -> Dict[str, Any]:
+    """Atributos de filtro de un doc de 'curriculum' que viajan con su fila del snapshot."""
+    attrs: Dict[str, Any] = {}
+    ciudad = normalizar_texto(doc.get("ciudad") or "")
+    if ciudad:
+        attrs["ciudad"] = ciudad
+    if doc.get("edad") is not None:
+        attrs["edad"] = int(doc["edad"])
+    if doc.get("timestamp") is not None:
+        attrs["ts"] = float(doc["timestamp"])
+    return attrs
+
+
+def _linea(cv_id: str, attrs: Optional[Dict[str, Any]]) -> bytes:
+    return (json.dumps({"cv_id": str(cv_id), **(attrs or {})}) + "\n").encode("utf-8")
+
+
+def _size(path: str) -> int:
+    try:
+        return os.path.getsize(path)
+    except FileNotFoundError:
+        return 0
+
+
+class EmbeddingStore:
+    def __init__(self, path: str):
+        self.path = path
+        os.makedirs(path, exist_ok=True)
+        self._mu = threading.Lock()
+        self._generation = -1
+        self._dim = 0
+        self._mm: Optional[np.memmap] = None
+        self._rows = 0
+        self._ids: List[str] = []
+        self._ids_offset = 0
+        self._row_of: Dict[str, int] = {}
+        self._live = np.zeros(0, dtype=bool)          # fila vigente (no pisada) por fila
+        self._num: Dict[str, array] = {}              # atributos numéricos (nan si falta)
+        self._cat: Dict[str, array] = {}              # atributos de texto → código (-1 si falta)
+        self._codes: Dict[str, Dict[str, int]] = {}
+        self._cols: Dict[str, np.ndarray] = {}        # columnas materializadas (cache)
+
+    # ---------- helpers de archivo ----------
+    def _p(self, name: str) -> str:
+        return os.path.join(self.path, name)
+
+    @contextmanager
+    def locked(self):
+        with open(self._p(_LOCK), "a+") as fh:
+            fcntl.flock(fh, fcntl.LOCK_EX)
+            try:
+                yield
+            finally:
+                fcntl.flock(fh, fcntl.LOCK_UN)
+
+    def _read_meta(self) -> dict:
+        try:
+            with open(self._p(_META)) as fh:
+                return json.load(fh)
+        except (FileNotFoundError, ValueError):
+            return {}
+
+    def _write_meta(self, meta: dict) -> None:
+        tmp = self._p(_META + ".tmp")
+        with open(tmp, "w") as fh:
+            json.dump(meta, fh)
+        os.replace(tmp, self._p(_META))
+
+    # ---------- lectura (cualquier worker) ----------
+    def refresh(self) -> None:
+        """Re-mapea si hubo un build nuevo o si otro worker agregó filas."""
+        with self._mu:
+            meta = self._read_meta()
+            gen, dim = int(meta.get("generation", 0)), int(meta.get("dim", 0))
+            if gen != self._generation or dim != self._dim:
+                self._generation, self._dim = gen, dim
+                self._mm, self._rows = None, 0
+                self._ids, self._ids_offset, self._row_of = [], 0, {}
+                self._live = np.zeros(0, dtype=bool)
+                self._num, self._cat, self._codes, self._cols = {}, {}, {}, {}
+            if not self._dim:
+                return
+
+            # ids nuevos (lectura incremental desde el último offset)
+            antes, pisadas = len(self._ids), []
+            try:
+                with open(self._p(_IDS), "rb") as fh:
+                    fh.seek(self._ids_offset)
+                    for line in fh:
+                        if not line.endswith(b"\n"):
+                            break  # línea a medio escribir: la tomamos en el próximo refresh
+                        self._ids_offset += len(line)
+                        rec = json.loads(line)
+                        cid = rec.pop("cv_id")
+                        row = len(self._ids)
+                        prev = self._row_of.get(cid)
+                        if prev is not None:
+                            pisadas.append(prev)
+                        self._ids.append(cid)
+                        if rec.pop("retirado", False):
+                            # baja: la fila (en cero) nunca es vigente y el cv_id sale del índice
+                            self._row_of.pop(cid, None)
+                            pisadas.append(row)
+                            continue
+                        self._row_of[cid] = row
+                        for k, v in rec.items():
+                            self._set_attr(k, row, v)
+            except FileNotFoundError:
+                return
+            if len(self._ids) != antes:
+                live = np.ones(len(self._ids), dtype=bool)
+                live[:antes] = self._live
+                live[pisadas] = False
+                self._live = live
+                self._cols = {}
+
+            try:
+                vec_rows = os.path.getsize(self._p(_VEC)) // (4 * self._dim)
+            except FileNotFoundError:
+                vec_rows = 0
+            rows = min(vec_rows, len(self._ids))
+            if rows != self._rows or self._mm is None:
+                self._mm = np.memmap(self._p(_VEC), dtype=np.float32, mode="r",
+                                     shape=(rows, self._dim)) if rows else None
+                self._rows = rows
+
+    def _set_attr(self, k: str, row: int, v: Any) -> None:
+        if isinstance(v, bool) or v is None:
+            return
+        if isinstance(v, (int, float)):
+            col = self._num.setdefault(k, array("d"))
+            col.extend([math.nan] * (row - len(col)))
+            col.append(float(v))
+        elif isinstance(v, str):
+            codes = self._codes.setdefault(k, {})
+            col = self._cat.setdefault(k, array("i"))
+            col.extend([-1] * (row - len(col)))
+            col.append(codes.setdefault(v, len(codes)))
+
+    def _columna(self, k: str) -> Optional[np.ndarray]:
+        """Columna de un atributo alineada a las filas (llamar con _mu tomado)."""
+        if k not in self._cols:
+            n = len(self._ids)
+            if k in self._num:
+                col = np.full(n, np.nan)
+                src = self._num[k]
+            elif k in self._cat:
+                col = np.full(n, -1, dtype=np.int32)
+                src = self._cat[k]
+            else:
+                return None
+            col[:len(src)] = np.asarray(src)
+            self._cols[k] = col
+        return self._cols[k]
+
+    def filtro(self, rangos: Optional[Dict[str, Tuple[Optional[float], Optional[float]]]] = None,
+               iguales: Optional[Dict[str, str]] = None) -> np.ndarray:
+        """
+        Máscara booleana de filas vigentes que cumplen los filtros:
+          rangos  → {"edad": (min, max), "ts": (desde, hasta)}  (None = sin límite)
+          iguales → {"ciudad": "cordoba"}                        (valor ya normalizado)
+        Una fila sin el atributo no pasa el filtro correspondiente.
+        """
+        self.refresh()
+        with self._mu:
+            mask = self._live[:self._rows].copy()
+            for k, (lo, hi) in (rangos or {}).items():
+                if lo is None and hi is None:
+                    continue
+                col = self._columna(k)
+                if col is None:
+                    return np.zeros_like(mask)
+                col = col[:len(mask)]
+                if lo is not None:
+                    mask &= col >= lo
+                if hi is not None:
+                    mask &= col <= hi
+            for k, v in (iguales or {}).items():
+                code = self._codes.get(k, {}).get(v)
+                if code is None:
+                    return np.zeros_like(mask)
+                mask &= self._columna(k)[:len(mask)] == code
+        return mask
+
+    @property
+    def dim(self) -> int:
+        return self._dim
+
+    def __len__(self) -> int:
+        return len(self._row_of)
+
+    def cosines(self, perfil_vector) -> Tuple[List[str], np.ndarray]:
+        """
+        Coseno de TODOS los CVs del snapshot contra un vector de perfil:
+        una matmul local sobre el mmap. Devuelve (cv_ids, scores) solo de las filas vigentes.
+        """
+        self.refresh()
+        p = _unit(perfil_vector)
+        with self._mu:
+            if self._mm is None or p.size != self._dim:
+                return [], np.zeros(0, dtype=np.float32)
+            idx = np.flatnonzero(self._live[:self._rows])
+            ids = self._ids
+            mm = self._mm
+        if not len(idx):
+            return [], np.zeros(0, dtype=np.float32)
+        # una sola matmul sobre todo el mmap; las filas pisadas se descartan al indexar
+        scores = np.asarray(mm @ p)[idx]
+        return [ids[r] for r in idx.tolist()], scores
+
+    def matrix(self) -> Tuple[List[str], np.ndarray]:
+        """(ids, matriz) de filas vigentes; la matriz es una vista del mmap cuando no hay filas pisadas."""
+        self.refresh()
+        with self._mu:
+            if self._mm is None:
+                return [], np.zeros((0, self._dim), dtype=np.float32)
+            rows = self._rows
+            idx = np.flatnonzero(self._live[:rows])
+            ids = [self._ids[r] for r in idx.tolist()]
+            mm = self._mm
+        return ids, (mm if len(idx) == rows else mm[idx])
+
+    def row_of(self, cv_id: str) -> Optional[int]:
+        return self._row_of.get(cv_id)
+
+    def view(self) -> Tuple[Optional[np.memmap], List[str], Dict[str, int], int]:
+        """(mmap completo, cv_id por fila, fila vigente por cv_id, generación) para índices derivados."""
+        self.refresh()
+        with self._mu:
+            return self._mm, self._ids, self._row_of, self._generation
+
+    # ---------- escritura ----------
+    def append(self, cv_id: str, vector, attrs: Optional[Dict[str, Any]] = None) -> bool:
+        """Agrega (o reemplaza, por última-fila-gana) el vector de un CV y sus atributos de filtro."""
+        x = _unit(vector)
+        with self.locked():
+            meta = self._read_meta()
+            dim = int(meta.get("dim", 0))
+            if x.size == 0:
+                if not dim:
+                    return False
+                # CV que se quedó sin vector: fila en cero (coseno 0) pisa la anterior
+                x = np.zeros(dim, dtype=np.float32)
+            if not dim:
+                dim = x.size
+                self._write_meta({"dim": dim, "generation": int(meta.get("generation", 0)) + 1})
+            if x.size != dim:
+                return False
+            # primero el vector, después el id: un lector nunca ve un id sin su fila
+            with open(self._p(_VEC), "ab") as fh:
+                fh.write(x.astype("<f4").tobytes())
+            with open(self._p(_IDS), "ab") as fh:
+                fh.write(_linea(cv_id, attrs))
+        return True
+
+    def extend(self, cv_ids: List[str], X: np.ndarray,
+               attrs: Optional[List[Dict[str, Any]]] = None) -> int:
+        """Append en bloque (filas ya en float32); normaliza cada fila."""
+        X = np.asarray(X, dtype=np.float32)
+        if X.ndim != 2 or not len(X):
+            return 0
+        norms = np.linalg.norm(X, axis=1, keepdims=True)
+        norms[norms == 0] = 1.0
+        X = (X / norms).astype("<f4")
+        with self.locked():
+            meta = self._read_meta()
+            dim = int(meta.get("dim", 0))
+            if not dim:
+                dim = X.shape[1]
+                self._write_meta({"dim": dim, "generation": int(meta.get("generation", 0)) + 1})
+            if X.shape[1] != dim:
+                return 0
+            with open(self._p(_VEC), "ab") as fh:
+                fh.write(X.tobytes())
+            with open(self._p(_IDS), "ab") as fh:
+                fh.write(b"".join(_linea(c, a) for c, a in zip(cv_ids, attrs or [None] * len(cv_ids))))
+        return len(X)
+
+    def retirar(self, cv_ids: List[str]) -> int:
+        """Saca CVs del snapshot (fila en cero + marca "retirado"); no-op para los que no están."""
+        self.refresh()
+        with self.locked():
+            dim = int(self._read_meta().get("dim", 0))
+            if not dim:
+                return 0
+            self.refresh()
+            cv_ids = [str(c) for c in cv_ids if str(c) in self._row_of]
+            if not cv_ids:
+                return 0
+            with open(self._p(_VEC), "ab") as fh:
+                fh.write(np.zeros((len(cv_ids), dim), dtype="<f4").tobytes())
+            with open(self._p(_IDS), "ab") as fh:
+                fh.write(b"".join(_linea(c, {"retirado": True}) for c in cv_ids))
+        return len(cv_ids)
+
+    async def build(self, db, batch_size: int = 1000) -> int:
+        """
+        Reconstruye el snapshot completo desde 'curriculum' (reemplazo atómico de archivos),
+        solo con la versión vigente de cada email y la última de cada cluster de duplicados.
+        Los appends/bajas que llegan durante el scan se copian al final del snapshot nuevo.
+        """
+        # import diferido: cv.services usa este módulo en sus hooks de ingesta
+        from cv.services.cv_vigente import SOLO_VIGENTES
+        from cv.services.duplicados import SOLO_ULTIMOS
+
+        # nombres propios de este build: dos builds concurrentes no se pisan los temporales
+        suf = f".{os.getpid()}.{uuid.uuid4().hex}.tmp"
+        tmp_vec, tmp_ids = self._p(_VEC + suf), self._p(_IDS + suf)
+        with self.locked():
+            meta0 = self._read_meta()
+            off_vec, off_ids = _size(self._p(_VEC)), _size(self._p(_IDS))
+        n, dim = 0, 0
+        try:
+            with open(tmp_vec, "wb") as fv, open(tmp_ids, "wb") as fi:
+                cur = db["curriculum"].find(
+                    {"cv_vector": {"$ne": None}, **SOLO_VIGENTES, **SOLO_ULTIMOS},
+                    projection={"cv_vector": 1, "ciudad": 1, "edad": 1, "timestamp": 1},
+                ).batch_size(batch_size)
+                async for cv in cur:
+                    x = _unit(cv.get("cv_vector"))
+                    if x.size == 0:
+                        continue
+                    dim = dim or x.size
+                    if x.size != dim:
+                        continue
+                    fv.write(x.astype("<f4").tobytes())
+                    fi.write(_linea(cv["_id"], cv_atributos(cv)))
+                    n += 1
+            with self.locked():
+                meta = self._read_meta()
+                gen = int(meta.get("generation", 0))
+                if gen != int(meta0.get("generation", 0)):
+                    # otro build terminó durante el scan: sus archivos ya tienen todo lo agregado
+                    # desde entonces; reemplazarlos perdería esas filas
+                    return n
+                dim = dim or int(meta.get("dim", 0))
+                if int(meta.get("dim", 0)) == dim:
+                    # filas agregadas (o retiradas) después de empezar el scan: última-fila-gana
+                    with open(self._p(_VEC), "rb") as src, open(tmp_vec, "ab") as dst:
+                        src.seek(off_vec)
+                        dst.write(src.read())
+                    with open(self._p(_IDS), "rb") as src, open(tmp_ids, "ab") as dst:
+                        src.seek(off_ids)
+                        dst.write(src.read())
+                os.replace(tmp_vec, self._p(_VEC))
+                os.replace(tmp_ids, self._p(_IDS))
+                self._write_meta({"dim": dim, "generation": gen + 1})
+        finally:
+            for tmp in (tmp_vec, tmp_ids):
+                if os.path.exists(tmp):
+                    os.remove(tmp)
+        self.refresh()
+        return n
+
+
+_store: Optional[EmbeddingStore] = None
+
+
+def get_store() -> Optional[EmbeddingStore]:
+    """Singleton del snapshot; None si EMBED_STORE_DIR no está configurado."""
+    global _store
+    if not EMBED_STORE_DIR:
+        return None
+    if _store is None:
+        _store = EmbeddingStore(EMBED_STORE_DIR)
+    return _store
+
+
+async def registrar_vector(cv_id: str, vector, attrs: Optional[Dict[str, Any]] = None) -> None:
+    """Hook de ingesta: agrega el vector al snapshot y al índice ANN (no-op si está deshabilitado)."""
+    store = get_store()
+    if store is None:
+        return
+    try:
+        await anyio.to_thread.run_sync(store.append, cv_id, vector, attrs)
+    except Exception as e:
+        # el snapshot es una optimización: si falla, el rebuild cae a Mongo
+        print(f"[embedding_store] append falló para {cv_id}: {e}")
+        return
+    # índice ANN: asignar lista a la fila nueva (import diferido: ann_index depende de este módulo)
+    from core.ann_index import get_ann
+    try:
+        await anyio.to_thread.run_sync(get_ann().catch_up)
+    except Exception as e:
+        # sin asignar, la fila queda en la cola del índice y se busca por fuerza bruta
+        print(f"[ann_index] catch_up falló para {cv_id}: {e}")
+
+
+async def retirar_vectores(cv_ids: List[str]) -> None:
+    """Hook de borrado/degradación: saca los CVs del snapshot (no-op si está deshabilitado)."""
+    store = get_store()
+    if store is None or not cv_ids:
+        return
+    try:
+        if not await anyio.to_thread.run_sync(store.retirar, list(cv_ids)):
+            return
+    except Exception as e:
+        # sin la baja, los lectores re-validan contra Mongo y descartan el CV
+        print(f"[embedding_store] retirar falló para {list(cv_ids)[:5]}: {e}")
+        return
+    # las filas de baja también reciben lista en el índice ANN (mantiene alineadas las asignaciones)
+    from core.ann_index import get_ann
+    try:
+        await anyio.to_thread.run_sync(get_ann().catch_up)
+    except Exception as e:
+        print(f"[ann_index] catch_up falló tras retirar: {e}")
+
+
+if __name__ == "__main__":
+    # python -m core.embedding_store   (desde backend/, con EMBED_STORE_DIR y Mongo configurados)
+    import asyncio
+    from core.database import get_client
+
+    async def _main():
+        store = get_store()
+        if store is None:
+            raise SystemExit("EMBED_STORE_DIR no está definido")
+        n = await store.build(get_client().get_default_database())
+        print(f"OK: {n} vectores en {store.path}")
+
+    asyncio.run(_main())
@@ -0,0 +1,213 @@
+# core/indexes.py
+# Registro declarativo de índices de todas las colecciones.
+#
+#   aplicar_indices(db): crea los que faltan, recrea los que cambiaron de opciones y
+#       borra los obsoletos. Idempotente; se llama en el startup de la app. Guarda un
+#       hash del registro en meta {_id: "indices"}: si no cambió, no toca Mongo.
+#   python -m core.indexes [apply|check]
+#       apply: aplica (forzado, sin mirar el hash)
+#       check: explain() de las consultas calientes; sale con error si alguna hace COLLSCAN
+import hashlib
+import sys
+from dataclasses import dataclass, field
+from typing import Any, Dict, List, Optional, Tuple
+
+from bson import ObjectId
+
+
+@dataclass(frozen=True)
+class Indice:
+    coleccion: str
+    claves: Tuple[Tuple[str, int], ...]
+    nombre: Optional[str] = None
+    opciones: Dict[str, Any] = field(default_factory=dict, hash=False)
+
+    @property
+    def nombre_efectivo(self) -> str:
+        return self.nombre or "_".join(f"{k}_{v}" for k, v in self.claves)
+
+
+def _ix(coleccion: str, *claves, nombre: Optional[str] = None, **opciones) -> Indice:
+    norm = tuple((c, 1) if isinstance(c, str) else (c[0], c[1]) for c in claves)
+    return Indice(coleccion, norm, nombre, opciones)
+
+
+REGISTRO: List[Indice] = [
+    # usuarios y auth
+    _ix("users", "email", unique=True),
+    _ix("revoked_tokens", "jti", unique=True),
+    _ix("revoked_tokens", "exp", expireAfterSeconds=0),        # TTL: se borran al vencer
+    _ix("revoked_tokens", "revoked_at"),
+    # curriculum: lookups por email (vigente + fallback ordenado), filtros y scoring
+    _ix("curriculum", "email", ("timestamp", -1)),
+    _ix("curriculum", "email", nombre="email_vigente", unique=True,
+        partialFilterExpression={"is_current": True}),
+    _ix("curriculum", ("timestamp", -1)),
+    _ix("curriculum", "tokidx_hab"),
+    _ix("curriculum", "tokidx_exp"),
+    _ix("curriculum", "tokidx_edu"),
+    _ix("curriculum", "tokidx_idi"),
+    _ix("curriculum", "lsh_bands"),
+    _ix("curriculum", "dup_cluster", ("timestamp", -1)),
+    # perfiles vigentes: $or activo / publicado (las dos ramas con índice)
+    _ix("perfiles", "activo"),
+    _ix("perfiles", "publicado"),
+    # ranking: página ordenada por score (desempate por cv_id) y upsert por (perfil, cv)
+    _ix("ranking", "perfil_id", ("score", -1), "cv_id"),
+    _ix("ranking", "perfil_id", "cv_id", unique=True),
+    _ix("ranking", "cv_id"),
+    # vocabulario, BM25
+    _ix("vocab", "t", unique=True),
+    _ix("vocab_sim", "a", "b", unique=True),
+    _ix("vocab_sim", "b"),
+    _ix("cv_terms", "seq"),
+    # GridFS (los drivers los crean en la primera subida; acá quedan explícitos)
+    _ix("fs.files", "filename", "uploadDate"),
+    _ix("fs.chunks", "files_id", "n", unique=True),
+]
+
+# reemplazados por otro del registro (el prefijo queda cubierto)
+OBSOLETOS: List[Tuple[str, str]] = [
+    ("curriculum", "email_1"),
+    ("ranking", "perfil_id_1_score_-1"),
+]
+
+# opciones que, si difieren, obligan a recrear el índice
+_OPCIONES = ("unique", "partialFilterExpression", "expireAfterSeconds")
+
+
+def _hash_registro() -> str:
+    h = hashlib.sha1()
+    for ix in REGISTRO:
+        h.update(repr((ix.coleccion, ix.claves, ix.nombre_efectivo, sorted(ix.opciones.items()))).encode())
+    h.update(repr(OBSOLETOS).encode())
+    return h.hexdigest()
+
+
+def _difiere(ix: Indice, info: Dict[str, Any]) -> bool:
+    if tuple((k, int(v)) for k, v in info["key"]) != ix.claves:
+        return True
+    return any(info.get(o) != ix.opciones.get(o) for o in _OPCIONES)
+
+
+async def aplicar_indices(db, forzar: bool = False) -> int:
+    """Lleva los índices al estado del registro. Devuelve cuántos creó/recreó/borró."""
+    firma = _hash_registro()
+    meta = await db["meta"].find_one({"_id": "indices"}) or {}
+    if not forzar and meta.get("hash") == firma:
+        return 0
+
+    cambios = 0
+    existentes: Dict[str, Dict[str, Any]] = {}
+    for c in sorted({ix.coleccion for ix in REGISTRO} | {c for c, _ in OBSOLETOS}):
+        existentes[c] = await db[c].index_information()
+
+    for c, nombre in OBSOLETOS:
+        if nombre in existentes[c]:
+            await db[c].drop_index(nombre)
+            print(f"[indices] {c}.{nombre}: obsoleto, borrado")
+            cambios += 1
+
+    errores = 0
+    for ix in REGISTRO:
+        info = existentes[ix.coleccion].get(ix.nombre_efectivo)
+        if info is not None and not _difiere(ix, info):
+            continue
+        try:
+            if info is not None:
+                await db[ix.coleccion].drop_index(ix.nombre_efectivo)
+                print(f"[indices] {ix.coleccion}.{ix.nombre_efectivo}: cambió, se recrea")
+            await db[ix.coleccion].create_index(list(ix.claves), name=ix.nombre_efectivo, **ix.opciones)
+            cambios += 1
+        except Exception as e:
+            # p.ej. un único con datos duplicados: seguimos con el resto y reintentamos
+            # en el próximo arranque (no se guarda el hash)
+            print(f"[indices] {ix.coleccion}.{ix.nombre_efectivo}: ERROR {e}")
+            errores += 1
+
+    if not errores:
+        await db["meta"].update_one({"_id": "indices"}, {"$set": {"hash": firma}}, upsert=True)
+    return cambios
+
+
+# ---------- check: planes de las consultas calientes ----------
+
+@dataclass(frozen=True)
+class Consulta:
+    nombre: str
+    coleccion: str
+    filtro: Dict[str, Any]
+    sort: Optional[List[Tuple[str, int]]] = None
+    scan_ok: bool = False      # recorrido completo esperado (se informa, no falla)
+
+
+def consultas_calientes() -> List[Consulta]:
+    from cv.services.cv_vigente import SOLO_VIGENTES
+    from cv.services.duplicados import SOLO_ULTIMOS
+    from metricas.services.perfil_cache import PERFILES_VIGENTES
+    from datetime import datetime, timezone
+    oid, ahora = ObjectId(), datetime.now(timezone.utc)
+    return [
+        # metricas_router.get_ranking (página y conteo) + export ordenado
+        Consulta("get_ranking", "ranking", {"perfil_id": "x"}),
+        Consulta("ranking ordenado", "ranking", {"perfil_id": "x"}, [("score", -1)]),
+        # cv_service.obtener_cv_por_email (vigente y fallback sin migrar)
+        Consulta("obtener_cv_por_email", "curriculum", {"email": "x@x", "is_current": True}),
+        Consulta("obtener_cv_por_email (fallback)", "curriculum", {"email": "x@x"}, [("timestamp", -1)]),
+        # auth_service.get_current_user (en frío) y sync de revocaciones
+        Consulta("get_current_user (id)", "users", {"_id": oid}),
+        Consulta("get_current_user (email)", "users", {"email": "x@x"}),
+        Consulta("revocaciones nuevas", "revoked_tokens", {"revoked_at": {"$gt": ahora}}),
+        Consulta("revocaciones vigentes", "revoked_tokens", {"exp": {"$gt": ahora}}),
+        # rebuild: candidatos top-K del ANN, y el recorrido completo (scan por diseño)
+        Consulta("rebuild (top-K)", "curriculum", {"_id": {"$in": [oid]}, **SOLO_VIGENTES, **SOLO_ULTIMOS}),
+        Consulta("rebuild (completo)", "curriculum", {**SOLO_VIGENTES, **SOLO_ULTIMOS}, scan_ok=True),
+        Consulta("perfiles vigentes", "perfiles", PERFILES_VIGENTES),
+        Consulta("duplicados: candidatos", "curriculum", {"lsh_bands": {"$in": ["v0:0"]}}),
+        Consulta("bm25 refresh", "cv_terms", {"seq": {"$gt": 0}}, [("seq", 1)]),
+    ]
+
+
+def _etapas(plan: Dict[str, Any]) -> List[str]:
+    out = [plan.get("stage", "")]
+    for k in ("inputStage", "queryPlan"):
+        if isinstance(plan.get(k), dict):
+            out += _etapas(plan[k])
+    for p in plan.get("inputStages", []) or []:
+        out += _etapas(p)
+    return out
+
+
+async def verificar_planes(db) -> List[Tuple[Consulta, List[str]]]:
+    out = []
+    for q in consultas_calientes():
+        cur = db[q.coleccion].find(q.filtro)
+        if q.sort:
+            cur = cur.sort(q.sort)
+        exp = await cur.explain()
+        plan = (exp.get("queryPlanner") or {}).get("winningPlan") or {}
+        out.append((q, _etapas(plan)))
+    return out
+
+
+if __name__ == "__main__":
+    # python -m core.indexes [apply|check]   (desde backend/, con Mongo configurado)
+    import asyncio
+    from core.database import get_client
+
+    async def _main(cmd: str) -> int:
+        db = get_client().get_default_database()
+        if cmd == "apply":
+            print(f"OK: {await aplicar_indices(db, forzar=True)} cambios")
+            return 0
+        malos = 0
+        for q, etapas in await verificar_planes(db):
+            scan = "COLLSCAN" in etapas
+            estado = "scan (esperado)" if scan and q.scan_ok else ("COLLSCAN" if scan else "ok")
+            malos += scan and not q.scan_ok
+            print(f"{estado:16s} {q.nombre:34s} {' > '.join(e for e in etapas if e)}")
+        if malos:
+            print(f"ERROR: {malos} consulta(s) caliente(s) sin índice", file=sys.stderr)
+        return 1 if malos else 0
+
+    sys.exit(asyncio.run(_main(sys.argv[1] if len(sys.argv) > 1 else "check")))
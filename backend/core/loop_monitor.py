@@ -0,0 +1,105 @@
+# core/loop_monitor.py
+# Lag del event loop y detector de bloqueos.
+#
+#   Muestreo (siempre): cada LOOP_LAG_INTERVAL_S se duerme ese intervalo y se mide cuánto
+#   tarde despertó; el atraso es el tiempo que otro callback retuvo el loop. Va al
+#   histograma event_loop_lag_seconds y a gauges p50/p99/max de la ventana reciente.
+#
+#   Debug (LOOP_BLOCK_MS > 0): un latido en el loop cada LOOP_BLOCK_MS/4 y un hilo
+#   watchdog que, si el latido se atrasa más de LOOP_BLOCK_MS, captura el stack del hilo
+#   del loop EN ESE MOMENTO (el código que lo está bloqueando) y lo loguea como JSON,
+#   una vez por bloqueo. Costo: sys._current_frames() solo cuando hay un bloqueo.
+import asyncio
+import json
+import sys
+import threading
+import time
+import traceback
+from collections import deque
+from typing import Dict, List, Optional
+
+from core.config import LOOP_BLOCK_MS, LOOP_LAG_INTERVAL_S, LOOP_LAG_WINDOW
+from core.metrics import LOOP_BLOQUEOS, LOOP_LAG, LOOP_LAG_Q
+
+_ventana: "deque[float]" = deque(maxlen=LOOP_LAG_WINDOW)
+_tareas: List[asyncio.Task] = []
+_watchdog: Optional["_Watchdog"] = None
+
+
+def _cuantil(xs: List[float], q: float) -> float:
+    return xs[min(len(xs) - 1, int(q * len(xs)))] if xs else 0.0
+
+
+def lag_resumen() -> Dict[str, float]:
+    """p50/p99/max (ms) de la ventana reciente de este worker."""
+    xs = sorted(_ventana)
+    return {"muestras": len(xs), "p50_ms": _cuantil(xs, 0.5) * 1000,
+            "p99_ms": _cuantil(xs, 0.99) * 1000, "max_ms": (xs[-1] if xs else 0.0) * 1000}
+
+
+async def _muestrear() -> None:
+    loop = asyncio.get_running_loop()
+    while True:
+        t = loop.time()
+        await asyncio.sleep(LOOP_LAG_INTERVAL_S)
+        lag = max(0.0, loop.time() - t - LOOP_LAG_INTERVAL_S)
+        LOOP_LAG.observe(lag)
+        _ventana.append(lag)
+        xs = sorted(_ventana)
+        LOOP_LAG_Q.labels(q="0.5").set(_cuantil(xs, 0.5))
+        LOOP_LAG_Q.labels(q="0.99").set(_cuantil(xs, 0.99))
+        LOOP_LAG_Q.labels(q="max").set(xs[-1])
+
+
+class _Watchdog(threading.Thread):
+    def __init__(self, hilo_loop: int, umbral_s: float):
+        super().__init__(name="loop-watchdog", daemon=True)
+        self.hilo_loop, self.umbral = hilo_loop, umbral_s
+        self.latido = time.monotonic()
+        self._reportado = 0.0
+        self._parar = threading.Event()
+
+    def run(self) -> None:
+        while not self._parar.wait(self.umbral / 4):
+            latido = self.latido
+            atraso = time.monotonic() - latido
+            if atraso < self.umbral or latido == self._reportado:
+                continue
+            self._reportado = latido           # un reporte por bloqueo
+            frame = sys._current_frames().get(self.hilo_loop)
+            LOOP_BLOQUEOS.inc()
+            print(json.dumps({
+                "loop_bloqueado_ms": round(atraso * 1000, 1),
+                "stack": traceback.format_stack(frame) if frame is not None else [],
+            }))
+
+    def detener(self) -> None:
+        self._parar.set()
+
+
+async def _latir(w: _Watchdog) -> None:
+    while True:
+        w.latido = time.monotonic()
+        await asyncio.sleep(w.umbral / 4)
+
+
+def iniciar_monitor_loop() -> None:
+    """Llamar desde el startup (dentro del loop). Idempotente."""
+    global _watchdog
+    if _tareas:
+        return
+    _tareas.append(asyncio.create_task(_muestrear()))
+    if LOOP_BLOCK_MS > 0:
+        _watchdog = _Watchdog(threading.get_ident(), LOOP_BLOCK_MS / 1000)
+        _watchdog.start()
+        _tareas.append(asyncio.create_task(_latir(_watchdog)))
+
+
+def detener_monitor_loop() -> None:
+    global _watchdog
+    for t in _tareas:
+        t.cancel()
+    _tareas.clear()
+    if _watchdog is not None:
+        _watchdog.detener()
+        _watchdog = None
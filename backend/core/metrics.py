@@ -0,0 +1,238 @@
+# core/metrics.py
+# Métricas Prometheus (GET /metrics): latencia por etapa de la ingesta de CVs,
+# throughput de rebuilds, llamadas a OpenAI, pool de Mongo y latencia por ruta HTTP.
+#
+# Costo: un perf_counter + observe por etapa (microsegundos). Con varios workers de
+# uvicorn/gunicorn, definir PROMETHEUS_MULTIPROC_DIR (directorio vacío y escribible)
+# para que /metrics agregue los valores de todos los procesos.
+# Sin prometheus_client instalado las métricas son no-op y /metrics responde 503.
+#
+# Comandos de Mongo (CommandMetrics): duración y documentos devueltos por comando,
+# colección y ruta HTTP que lo emitió; los que superan MONGO_SLOW_MS van al slow log
+# (una línea JSON con la forma del filtro, sin valores).
+import json
+import os
+import time
+from contextlib import contextmanager
+from typing import Any, Dict, Iterator, Tuple
+
+from pymongo import monitoring
+
+from core.config import MONGO_SLOW_MS
+from core.tracing import registrar, ruta_actual, trace_id_actual
+
+try:
+    from prometheus_client import (CONTENT_TYPE_LATEST, CollectorRegistry, Counter, Gauge,
+                                   Histogram, generate_latest)
+    from prometheus_client import multiprocess
+    HABILITADAS = True
+except ImportError:  # pragma: no cover - dependencia opcional
+    HABILITADAS = False
+    CONTENT_TYPE_LATEST = "text/plain; version=0.0.4; charset=utf-8"
+
+
+class _Nula:
+    """Métrica no-op (sin prometheus_client)."""
+    def labels(self, *a, **k): return self
+    def observe(self, *a, **k): pass
+    def inc(self, *a, **k): pass
+    def dec(self, *a, **k): pass
+    def set(self, *a, **k): pass
+
+
+def _hist(nombre, ayuda, labels=(), buckets=None):
+    if not HABILITADAS:
+        return _Nula()
+    kw = {"buckets": buckets} if buckets else {}
+    return Histogram(nombre, ayuda, labels, **kw)
+
+
+def _counter(nombre, ayuda, labels=()):
+    return Counter(nombre, ayuda, labels) if HABILITADAS else _Nula()
+
+
+def _gauge(nombre, ayuda, labels=(), modo="livesum"):
+    return Gauge(nombre, ayuda, labels, multiprocess_mode=modo) if HABILITADAS else _Nula()
+
+
+# etapas de la ingesta: de ms (insert) a decenas de s (visión)
+_BUCKETS_ETAPA = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 20, 40, 80)
+
+INGEST_ETAPA = _hist("cv_ingest_stage_seconds", "Duración de cada etapa de guardar_cv/resubir_cv",
+                     ("op", "etapa"), _BUCKETS_ETAPA)
+INGEST_TOTAL = _counter("cv_ingest_total", "CVs procesados por la ingesta", ("op", "resultado"))
+
+REBUILD_SEGUNDOS = _hist("ranking_rebuild_seconds", "Duración de un rebuild de ranking por perfil",
+                         buckets=(0.1, 0.5, 1, 2.5, 5, 10, 30, 60, 120, 300, 600))
+REBUILD_CVS = _counter("ranking_rebuild_cvs_total", "CVs puntuados por rebuilds (rate → CVs/s)")
+
+OPENAI_SEGUNDOS = _hist("openai_request_seconds", "Latencia de llamadas a OpenAI", ("op",),
+                        _BUCKETS_ETAPA)
+OPENAI_ERRORES = _counter("openai_errors_total", "Errores de llamadas a OpenAI", ("op", "codigo"))
+
+MONGO_CONEXIONES = _gauge("mongo_pool_connections", "Conexiones abiertas del pool de Mongo")
+MONGO_EN_USO = _gauge("mongo_pool_checked_out", "Conexiones del pool tomadas por operaciones")
+MONGO_CHECKOUT_FALLIDO = _counter("mongo_pool_checkout_failed_total",
+                                  "Checkouts del pool fallidos", ("motivo",))
+MONGO_CHECKOUT_ESPERA = _hist("mongo_pool_checkout_wait_seconds",
+                              "Espera para obtener una conexión del pool",
+                              buckets=(0.0005, 0.001, 0.005, 0.01, 0.05, 0.1, 0.5, 1, 5))
+
+_BUCKETS_MONGO = (0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5)
+MONGO_CMD_SEGUNDOS = _hist("mongo_command_seconds", "Duración de comandos de Mongo",
+                           ("cmd", "coleccion", "route"), _BUCKETS_MONGO)
+MONGO_CMD_DOCS = _counter("mongo_command_docs_total", "Documentos devueltos/afectados por comandos",
+                          ("cmd", "coleccion", "route"))
+MONGO_CMD_ERRORES = _counter("mongo_command_errors_total", "Comandos de Mongo fallidos",
+                             ("cmd", "coleccion", "route"))
+MONGO_LENTOS = _counter("mongo_slow_commands_total", "Comandos por encima de MONGO_SLOW_MS",
+                        ("cmd", "coleccion", "route"))
+
+# lag del event loop (core/loop_monitor): histograma + cuantiles de la ventana reciente
+LOOP_LAG = _hist("event_loop_lag_seconds", "Atraso del event loop al despertar de un sleep",
+                 buckets=(0.001, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5))
+LOOP_LAG_Q = _gauge("event_loop_lag_quantile_seconds", "Cuantiles del lag en la ventana reciente",
+                    ("q",), modo="livemax")
+LOOP_BLOQUEOS = _counter("event_loop_blocked_total", "Bloqueos del loop por encima de LOOP_BLOCK_MS")
+
+HTTP_SEGUNDOS = _hist("http_request_seconds", "Latencia por ruta", ("method", "route", "status"))
+
+
+@contextmanager
+def medir(hist, **labels) -> Iterator[None]:
+    """Observa la duración del bloque (también si termina con excepción)."""
+    t0 = time.perf_counter()
+    try:
+        yield
+    finally:
+        (hist.labels(**labels) if labels else hist).observe(time.perf_counter() - t0)
+
+
+@contextmanager
+def llamada_openai(op: str) -> Iterator[None]:
+    """Latencia + errores (por status HTTP o tipo de excepción) de una llamada a OpenAI."""
+    t0 = time.perf_counter()
+    try:
+        yield
+    except Exception as e:
+        OPENAI_ERRORES.labels(op=op, codigo=str(getattr(e, "status_code", None) or type(e).__name__)).inc()
+        raise
+    finally:
+        OPENAI_SEGUNDOS.labels(op=op).observe(time.perf_counter() - t0)
+
+
+class PoolMetrics(monitoring.ConnectionPoolListener):
+    """Uso del pool de conexiones de pymongo (se registra al crear el cliente)."""
+
+    def pool_created(self, event): pass
+    def pool_ready(self, event): pass
+    def pool_cleared(self, event): pass
+    def pool_closed(self, event): pass
+    def connection_created(self, event): MONGO_CONEXIONES.inc()
+    def connection_ready(self, event): pass
+    def connection_closed(self, event): MONGO_CONEXIONES.dec()
+    def connection_check_out_started(self, event): pass
+
+    def connection_check_out_failed(self, event):
+        MONGO_CHECKOUT_FALLIDO.labels(motivo=str(event.reason)).inc()
+
+    def connection_checked_out(self, event):
+        MONGO_EN_USO.inc()
+        MONGO_CHECKOUT_ESPERA.observe(event.duration)
+
+    def connection_checked_in(self, event): MONGO_EN_USO.dec()
+
+
+# comandos cuyo primer valor no es el nombre de la colección
+_SIN_COLECCION = {"getMore": "collection"}
+# partes del comando que describen la consulta (se loguea su forma, no los valores)
+_PARTES_CONSULTA = ("filter", "sort", "projection", "pipeline", "updates", "deletes", "query")
+
+
+def _forma(v: Any, prof: int = 0) -> Any:
+    """Estructura de un filtro/pipeline con los valores reemplazados por '?'."""
+    if prof > 6:
+        return "…"
+    if isinstance(v, dict):
+        return {k: _forma(x, prof + 1) for k, x in v.items()}
+    if isinstance(v, list):
+        return [_forma(x, prof + 1) for x in v[:3]] + (["…"] if len(v) > 3 else [])
+    return "?"
+
+
+def _docs(cmd: str, reply: Dict[str, Any]) -> int:
+    cur = reply.get("cursor")
+    if isinstance(cur, dict):
+        return len(cur.get("firstBatch") or cur.get("nextBatch") or [])
+    n = reply.get("n")
+    return int(n) if isinstance(n, (int, float)) else 0
+
+
+class CommandMetrics(monitoring.CommandListener):
+    """
+    Duración/documentos por comando + slow log. pymongo llama a los listeners en el hilo
+    de Motor, que copia los contextvars: ruta_actual() y la traza del request son las
+    del endpoint que emitió el comando (cada comando queda además como span mongo.<cmd>).
+    """
+
+    def __init__(self):
+        self._pend: Dict[Tuple[Any, int], Tuple[str, str, Dict[str, Any]]] = {}
+
+    def started(self, event):
+        cmd = event.command_name
+        clave = _SIN_COLECCION.get(cmd, cmd)
+        col = event.command.get(clave)
+        self._pend[(event.connection_id, event.request_id)] = (
+            ruta_actual() or "<sin ruta>", col if isinstance(col, str) else "", event.command)
+
+    def _fin(self, event):
+        return self._pend.pop((event.connection_id, event.request_id), None)
+
+    def succeeded(self, event):
+        pend = self._fin(event)
+        if pend is None:
+            return
+        ruta, col, comando = pend
+        cmd, dur = event.command_name, event.duration_micros / 1e6
+        docs = _docs(cmd, event.reply)
+        MONGO_CMD_SEGUNDOS.labels(cmd=cmd, coleccion=col, route=ruta).observe(dur)
+        if docs:
+            MONGO_CMD_DOCS.labels(cmd=cmd, coleccion=col, route=ruta).inc(docs)
+        registrar(f"mongo.{cmd}", dur, coleccion=col)
+        if MONGO_SLOW_MS > 0 and dur * 1000 >= MONGO_SLOW_MS:
+            MONGO_LENTOS.labels(cmd=cmd, coleccion=col, route=ruta).inc()
+            print(json.dumps({
+                "slow_mongo": cmd, "coleccion": col, "route": ruta, "ms": round(dur * 1000, 2),
+                "docs": docs, "trace_id": trace_id_actual(),
+                "forma": {k: _forma(comando[k]) for k in _PARTES_CONSULTA if k in comando},
+            }, default=str))
+
+    def failed(self, event):
+        pend = self._fin(event)
+        if pend is None:
+            return
+        ruta, col, _ = pend
+        MONGO_CMD_ERRORES.labels(cmd=event.command_name, coleccion=col, route=ruta).inc()
+        registrar(f"mongo.{event.command_name}", event.duration_micros / 1e6, coleccion=col, error=True)
+
+
+async def metrics_middleware(request, call_next):
+    t0 = time.perf_counter()
+    status = 500
+    try:
+        response = await call_next(request)
+        status = response.status_code
+        return response
+    finally:
+        # plantilla de la ruta ("/api/cv/file/{file_id}"), no el path: cardinalidad acotada
+        route = request.scope.get("route")
+        HTTP_SEGUNDOS.labels(method=request.method, route=getattr(route, "path", "<sin ruta>"),
+                             status=str(status)).observe(time.perf_counter() - t0)
+
+
+def exportar() -> bytes:
+    if os.getenv("PROMETHEUS_MULTIPROC_DIR"):
+        registry = CollectorRegistry()
+        multiprocess.MultiProcessCollector(registry)
+        return generate_latest(registry)
+    return generate_latest()
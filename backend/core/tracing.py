@@ -0,0 +1,245 @@
+# core/tracing.py
+# Trazas livianas por request: spans anidados (contextvars) alrededor de servicios,
+# llamadas a OpenAI, render de PDFs, Mongo y scoring.
+#
+#   - Header Server-Timing en cada respuesta (duración sumada por nombre de span):
+#     se ve directo en la pestaña Network del navegador.
+#   - TRACE_LOG=1: una línea JSON por request con todos los spans (inicio relativo,
+#     duración, padre, atributos).
+#   - TRACE_OTLP_ENDPOINT=http://localhost:4318/v1/traces: además se exportan por OTLP
+#     (requiere opentelemetry-sdk y opentelemetry-exporter-otlp-proto-http).
+#
+# Uso:  with span("rebuild.candidatos", perfil_id=pid): ...   (también `async with`)
+#       @trazado("cv.guardar_cv")  sobre funciones sync o async
+#       registrar("rebuild.scoring", segundos)  tiempo acumulado en un loop (un span, no N)
+# Los spans abiertos en hilos (anyio.to_thread) cuelgan del span que lanzó el hilo.
+import functools
+import inspect
+import json
+import time
+import uuid
+from contextvars import ContextVar
+from dataclasses import dataclass, field
+from typing import Any, Dict, List, Optional
+
+from core.config import TRACE_ENABLED, TRACE_LOG, TRACE_OTLP_ENDPOINT
+
+# tope de entradas del header (agrupadas por nombre): los headers largos molestan a proxies
+_MAX_SERVER_TIMING = 20
+# tope de spans por request (un rebuild emite un span Mongo por CV): los demás se cuentan
+_MAX_SPANS = 2000
+
+
+@dataclass
+class _Span:
+    nombre: str
+    padre: Optional[int]
+    t0: float
+    t0_ns: int
+    dur: Optional[float] = None
+    attrs: Dict[str, Any] = field(default_factory=dict)
+    error: Optional[str] = None
+
+
+@dataclass
+class Traza:
+    trace_id: str
+    t0: float
+    spans: List[_Span] = field(default_factory=list)
+    descartados: int = 0
+
+    def lleno(self) -> bool:
+        if len(self.spans) < _MAX_SPANS:
+            return False
+        self.descartados += 1
+        return True
+
+
+_traza: ContextVar[Optional[Traza]] = ContextVar("traza", default=None)
+_actual: ContextVar[Optional[int]] = ContextVar("span_actual", default=None)
+_scope: ContextVar[Optional[dict]] = ContextVar("scope_http", default=None)
+
+
+def ruta_actual() -> Optional[str]:
+    """Plantilla de la ruta del request en curso ("/api/cv/file/{file_id}"), o None."""
+    scope = _scope.get()
+    if scope is None:
+        return None
+    route = scope.get("route")
+    return getattr(route, "path", None) or "<sin ruta>"
+
+
+def trace_id_actual() -> Optional[str]:
+    tr = _traza.get()
+    return tr.trace_id if tr is not None else None
+
+
+class span:
+    """Span de la traza del request actual; no-op si no hay traza (scripts, tests)."""
+
+    __slots__ = ("nombre", "attrs", "_i", "_tok")
+
+    def __init__(self, nombre: str, **attrs: Any):
+        self.nombre, self.attrs, self._i, self._tok = nombre, attrs, None, None
+
+    def __enter__(self):
+        tr = _traza.get()
+        if tr is not None and not tr.lleno():
+            tr.spans.append(_Span(self.nombre, _actual.get(), time.perf_counter(),
+                                  time.time_ns(), attrs=self.attrs))
+            self._i = len(tr.spans) - 1
+            self._tok = _actual.set(self._i)
+        return self
+
+    def __exit__(self, et, ev, tb):
+        if self._i is not None:
+            s = _traza.get().spans[self._i]
+            s.dur = time.perf_counter() - s.t0
+            if et is not None:
+                s.error = et.__name__
+            _actual.reset(self._tok)
+        return False
+
+    async def __aenter__(self):
+        return self.__enter__()
+
+    async def __aexit__(self, et, ev, tb):
+        return self.__exit__(et, ev, tb)
+
+
+def registrar(nombre: str, segundos: float, **attrs: Any) -> None:
+    """Span ya medido (p.ej. la suma de una etapa dentro de un loop), que termina ahora."""
+    tr = _traza.get()
+    if tr is None or tr.lleno():
+        return
+    t0 = time.perf_counter() - segundos
+    tr.spans.append(_Span(nombre, _actual.get(), t0, time.time_ns() - int(segundos * 1e9),
+                          dur=segundos, attrs=attrs))
+
+
+def trazado(nombre: str):
+    """Decorador: la función entera como un span."""
+    def deco(fn):
+        if inspect.iscoroutinefunction(fn):
+            @functools.wraps(fn)
+            async def aw(*a, **k):
+                with span(nombre):
+                    return await fn(*a, **k)
+            return aw
+
+        @functools.wraps(fn)
+        def w(*a, **k):
+            with span(nombre):
+                return fn(*a, **k)
+        return w
+    return deco
+
+
+def _server_timing(tr: Traza, total: float) -> str:
+    acc: Dict[str, float] = {}
+    for s in tr.spans:
+        if s.dur is not None:
+            acc[s.nombre] = acc.get(s.nombre, 0.0) + s.dur
+    top = sorted(acc.items(), key=lambda x: -x[1])[:_MAX_SERVER_TIMING]
+    partes = [f"total;dur={total * 1000:.1f}"]
+    # nombres de métrica Server-Timing: token sin '.'/espacios → '_'
+    partes += [f"{n.replace('.', '_').replace(' ', '_')};dur={d * 1000:.1f}" for n, d in top]
+    return ", ".join(partes)
+
+
+def _log_json(tr: Traza, metodo: str, ruta: str, status: int, total: float) -> None:
+    print(json.dumps({
+        "trace_id": tr.trace_id, "method": metodo, "route": ruta, "status": status,
+        "ms": round(total * 1000, 2), "spans_descartados": tr.descartados,
+        "spans": [{"i": i, "name": s.nombre, "parent": s.padre,
+                   "start_ms": round((s.t0 - tr.t0) * 1000, 2),
+                   "ms": round((s.dur or 0.0) * 1000, 2),
+                   **({"error": s.error} if s.error else {}),
+                   **({"attrs": s.attrs} if s.attrs else {})} for i, s in enumerate(tr.spans)],
+    }, default=str), flush=False)
+
+
+_otlp_tracer = None
+
+
+def _get_otlp_tracer():
+    global _otlp_tracer
+    if _otlp_tracer is None:
+        try:
+            from opentelemetry.exporter.otlp.proto.http.trace_exporter import OTLPSpanExporter
+            from opentelemetry.sdk.resources import Resource
+            from opentelemetry.sdk.trace import TracerProvider
+            from opentelemetry.sdk.trace.export import BatchSpanProcessor
+        except ImportError:
+            print("[tracing] TRACE_OTLP_ENDPOINT definido pero falta opentelemetry-sdk: sin export")
+            _otlp_tracer = False
+            return None
+        provider = TracerProvider(resource=Resource.create({"service.name": "cv-backend"}))
+        provider.add_span_processor(BatchSpanProcessor(OTLPSpanExporter(endpoint=TRACE_OTLP_ENDPOINT)))
+        _otlp_tracer = provider.get_tracer("core.tracing")
+    return _otlp_tracer or None
+
+
+def _exportar_otlp(tr: Traza, raiz: str, t0_ns: int, total: float) -> None:
+    tracer = _get_otlp_tracer()
+    if tracer is None:
+        return
+    from opentelemetry import trace as ot
+    root = tracer.start_span(raiz, start_time=t0_ns)
+    otel: List[Any] = []
+    # los spans están en orden de inicio: el padre siempre se crea antes que sus hijos
+    for s in tr.spans:
+        padre = otel[s.padre] if s.padre is not None else root
+        o = tracer.start_span(s.nombre, context=ot.set_span_in_context(padre),
+                              start_time=s.t0_ns, attributes={k: str(v) for k, v in s.attrs.items()})
+        otel.append(o)
+    for s, o in zip(tr.spans, otel):
+        if s.error:
+            o.set_attribute("error.type", s.error)
+        o.end(end_time=s.t0_ns + int((s.dur or 0.0) * 1e9))
+    root.end(end_time=t0_ns + int(total * 1e9))
+
+
+class TracingMiddleware:
+    """ASGI: abre la traza del request, agrega Server-Timing y loguea/exporta al final.
+    Con TRACE_ENABLED=0 solo deja disponible ruta_actual() (para los listeners de Mongo)."""
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            return await self.app(scope, receive, send)
+        # el router completa scope["route"] en el mismo dict: ruta_actual() la ve
+        tok_scope = _scope.set(scope)
+        if not TRACE_ENABLED:
+            try:
+                return await self.app(scope, receive, send)
+            finally:
+                _scope.reset(tok_scope)
+        tr = Traza(uuid.uuid4().hex, time.perf_counter())
+        t0_ns = time.time_ns()
+        tok = _traza.set(tr)
+        status = 500
+
+        async def _send(msg):
+            nonlocal status
+            if msg["type"] == "http.response.start":
+                status = msg["status"]
+                total = time.perf_counter() - tr.t0
+                headers = list(msg.get("headers", []))
+                headers.append((b"server-timing", _server_timing(tr, total).encode("latin-1")))
+                msg = {**msg, "headers": headers}
+            await send(msg)
+
+        try:
+            await self.app(scope, receive, _send)
+        finally:
+            _traza.reset(tok)
+            _scope.reset(tok_scope)
+            total = time.perf_counter() - tr.t0
+            ruta = getattr(scope.get("route"), "path", scope.get("path", ""))
+            if TRACE_LOG:
+                _log_json(tr, scope.get("method", ""), ruta, status, total)
+            if TRACE_OTLP_ENDPOINT:
+                _exportar_otlp(tr, f"{scope.get('method', '')} {ruta}", t0_ns, total)
@@ -0,0 +1,96 @@
+# core/vectors.py
+# Almacenamiento compacto de embeddings en Mongo.
+#   "f32"  → BSON Binary con float32 little-endian (default, ~4 bytes/dim)
+#   "f16"  → BSON Binary con float16 (~2 bytes/dim; pierde algo de precisión)
+#   "list" → array BSON de doubles (formato viejo, ~9+ bytes/dim con overhead)
+# La lectura acepta los tres formatos, así conviven docs migrados y sin migrar.
+from __future__ import annotations
+from typing import Any, List, Optional
+
+import numpy as np
+from bson.binary import Binary
+from pymongo import UpdateOne
+
+from core.config import VECTOR_STORAGE
+
+# subtipos "user defined" de BSON (0x80-0xFF) para distinguir el dtype
+VEC_SUBTYPE_F32 = 0x80
+VEC_SUBTYPE_F16 = 0x81
+
+_DTYPES = {VEC_SUBTYPE_F32: np.dtype("<f4"), VEC_SUBTYPE_F16: np.dtype("<f2")}
+
+
+def encode_vector(v: Any, storage: str | None = None) -> Any:
+    """Convierte un vector (lista / ndarray) al formato de almacenamiento configurado."""
+    if v is None:
+        return None
+    storage = storage or VECTOR_STORAGE
+    arr = np.asarray(v, dtype=np.float32)
+    if storage == "list":
+        return arr.tolist()
+    if storage == "f16":
+        return Binary(arr.astype("<f2").tobytes(), VEC_SUBTYPE_F16)
+    return Binary(arr.astype("<f4").tobytes(), VEC_SUBTYPE_F32)
+
+
+def decode_vector(x: Any) -> np.ndarray:
+    """
+    Devuelve el vector como ndarray float32.
+    Para Binary f32 es zero-copy (np.frombuffer, vista de solo lectura).
+    """
+    if x is None:
+        return np.zeros(0, dtype=np.float32)
+    if isinstance(x, Binary):
+        dt = _DTYPES.get(x.subtype)
+        if dt is None:
+            raise ValueError(f"subtipo de vector desconocido: {x.subtype}")
+        arr = np.frombuffer(x, dtype=dt)
+        return arr if dt == np.float32 else arr.astype(np.float32)
+    if isinstance(x, (bytes, bytearray, memoryview)):
+        return np.frombuffer(x, dtype="<f4")
+    return np.asarray(x, dtype=np.float32)
+
+
+def vector_to_list(x: Any) -> Optional[List[float]]:
+    """Para respuestas de la API (JSON): cualquier formato → lista de floats."""
+    if x is None:
+        return None
+    return decode_vector(x).tolist()
+
+
+async def migrar_vectores(db, collection: str, field: str,
+                          batch: int = 500, storage: str | None = None) -> int:
+    """
+    Convierte a Binary los vectores guardados como array. Reanudable: cada lote
+    solo toma docs que todavía tienen el formato viejo, así que se puede cortar
+    y volver a correr sin repetir trabajo.
+    """
+    storage = storage or VECTOR_STORAGE
+    if storage == "list":
+        return 0
+    total = 0
+    while True:
+        docs = await db[collection].find(
+            {field: {"$type": "array"}}, projection={field: 1}
+        ).limit(batch).to_list(length=batch)
+        if not docs:
+            return total
+        ops = [UpdateOne({"_id": d["_id"]}, {"$set": {field: encode_vector(d[field], storage)}})
+               for d in docs]
+        await db[collection].bulk_write(ops, ordered=False)
+        total += len(ops)
+        print(f"[vectores] {collection}.{field}: {total} migrados")
+
+
+if __name__ == "__main__":
+    # python -m core.vectors   (desde backend/, con las variables de Mongo cargadas)
+    import asyncio
+    from core.database import get_client
+
+    async def _main():
+        db = get_client().get_default_database()
+        n_cv = await migrar_vectores(db, "curriculum", "cv_vector")
+        n_pf = await migrar_vectores(db, "perfiles", "vector")
+        print(f"OK: curriculum={n_cv} perfiles={n_pf}")
+
+    asyncio.run(_main())
@@ -1,9 +1,12 @@
 # cv/routes/cv_router.py
 from io import BytesIO
-from fastapi import APIRouter, Depends, File, Form, UploadFile, HTTPException, Query
-from cv.schemas.cv_schemas import CVCreate, CVOut, CVProfileUpdate, CVWithAnalysisOut
+from fastapi import APIRouter, BackgroundTasks, Depends, File, Form, UploadFile, HTTPException, Query
+from cv.schemas.cv_schemas import CVCreate, CVOut, CVProfileUpdate, CVWithAnalysisOut, CVSearchIn, CVSearchItem
 from cv.services.cv_service import actualizar_perfil_usuario, guardar_cv, obtener_cv_por_email, count_cv, cargar_cv, resubir_cv
+from cv.services.search_service import buscar_cvs
+from cv.services.duplicados import listar_clusters, reindexar_duplicados
 from core.database import get_db
+from auth.utils.permissions import require_admin
 from fastapi.responses import StreamingResponse
 
 cv_router = APIRouter(prefix="/cv", tags=["cv"])
@@ -34,7 +37,7 @@ async def get_cv_by_email(
     full: bool = Query(False),
     db=Depends(get_db),
 ):
-    doc = await obtener_cv_por_email(db, email)
+    doc = await obtener_cv_por_email(db, email, detalle=full)
     if not doc:
         return {}
 
@@ -75,7 +78,7 @@ async def download_file(file_id: str, inline: bool = False, db=Depends(get_db)):
 
 @cv_router.get("/file/by-email")
 async def download_by_email(email: str, inline: bool = False, db=Depends(get_db)):
-    doc = await obtener_cv_por_email(db, email)
+    doc = await obtener_cv_por_email(db, email, projection={"cv_file_id": 1})
     if not doc or not doc.get("cv_file_id"):
         raise HTTPException(
             status_code=404, detail="CV no encontrado para ese email")
@@ -87,6 +90,52 @@ async def download_by_email(email: str, inline: bool = False, db=Depends(get_db)
     return StreamingResponse(BytesIO(data), media_type="application/pdf", headers=headers)
 
 
+@cv_router.post("/search", response_model=list[CVSearchItem], dependencies=[Depends(require_admin())])
+async def search_cvs(body: CVSearchIn, db=Depends(get_db)):
+    """
+    Búsqueda de CVs (texto libre o perfil ad-hoc) con filtros opcionales de ciudad,
+    rango de edad y fecha de carga. modo: semantico (coseno), keyword (BM25 sobre
+    cv_text) o hibrido (fusión RRF). No escribe en 'ranking'.
+    """
+    return await buscar_cvs(db, body)
+
+
+@cv_router.get("/duplicates", dependencies=[Depends(require_admin())])
+async def list_duplicates(limit: int = Query(100, ge=1, le=1000), db=Depends(get_db)):
+    """Clusters de CVs casi duplicados (más de un miembro); 'ultimo' marca la versión vigente."""
+    return await listar_clusters(db, limit)
+
+
+_reindex_en_curso = False
+
+
+async def _reindexar_en_segundo_plano(db) -> None:
+    global _reindex_en_curso
+    try:
+        n = await reindexar_duplicados(db)
+        print(f"[duplicados] reindex OK: {n} CVs")
+    except Exception as e:
+        print(f"[duplicados] reindex ERROR: {e}")
+    finally:
+        _reindex_en_curso = False
+
+
+@cv_router.post("/duplicates/reindex", response_model=dict, status_code=202,
+                dependencies=[Depends(require_admin())])
+async def reindex_duplicates(background: BackgroundTasks, db=Depends(get_db)):
+    """
+    Backfill de firmas LSH para CVs cargados antes de la detección de duplicados.
+    Recorre todo el corpus: corre en segundo plano (202) y deja el resultado en el log.
+    Para corpus grandes, preferir `python -m cv.services.duplicados`.
+    """
+    global _reindex_en_curso
+    if _reindex_en_curso:
+        raise HTTPException(status_code=409, detail="Ya hay un reindex en curso en este worker")
+    _reindex_en_curso = True
+    background.add_task(_reindexar_en_segundo_plano, db)
+    return {"ok": True, "estado": "en curso"}
+
+
 @cv_router.get("/count")
 async def count_curriculums(db=Depends(get_db)):
     n = await count_cv(db)
@@ -1,6 +1,6 @@
 # cv/schemas/cv_schemas.py
-from pydantic import BaseModel, EmailStr, Field
-from typing import Optional, List, Dict, Any
+from pydantic import BaseModel, EmailStr, Field, model_validator
+from typing import Optional, List, Dict, Any, Literal
 from datetime import date
 
 
@@ -53,3 +53,45 @@ class CVProfileUpdate(BaseModel):
     direccion: Optional[str] = None
     fecha_nacimiento: Optional[str] = None  # ISO string (yyyy-mm-dd)
     edad: Optional[int] = None
+
+
+class PerfilBusqueda(BaseModel):
+    """Perfil ad-hoc para buscar (mismo texto de embedding que un perfil guardado)."""
+    puesto: str = ""
+    educacion: List[str] = []
+    atributos: List[str] = []
+    experiencia: List[str] = []
+    idiomas: List[str] = []
+
+
+class CVSearchIn(BaseModel):
+    texto: Optional[str] = Field(None, description="Consulta en texto libre")
+    perfil: Optional[PerfilBusqueda] = None
+    ciudad: Optional[str] = None
+    edad_min: Optional[int] = Field(None, ge=0)
+    edad_max: Optional[int] = Field(None, ge=0)
+    desde: Optional[date] = Field(None, description="Cargado desde (inclusive)")
+    hasta: Optional[date] = Field(None, description="Cargado hasta (inclusive)")
+    top_k: int = Field(20, ge=1, le=500)
+    # semantico: coseno de embeddings | keyword: BM25 sobre cv_text | hibrido: fusión RRF de ambos
+    modo: Literal["semantico", "keyword", "hibrido"] = "semantico"
+
+    @model_validator(mode="after")
+    def _consulta(self):
+        if not (self.texto or "").strip() and self.perfil is None:
+            raise ValueError("Indicar 'texto' o 'perfil'")
+        return self
+
+
+class CVSearchItem(BaseModel):
+    cv_id: str
+    score: float
+    score_cos: Optional[float] = None
+    score_bm25: Optional[float] = None
+    nombre: str = ""
+    apellido: str = ""
+    email: str = ""
+    ciudad: str = ""
+    edad: Optional[int] = None
+    timestamp: float = 0.0
+    cv_file_id: Optional[str] = None
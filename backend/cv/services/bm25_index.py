@@ -0,0 +1,213 @@
+# cv/services/bm25_index.py
+# Índice BM25 sobre curriculum.cv_text, con el mismo normalizador del proyecto
+# (minúsculas, sin tildes, abreviaturas y sinónimos).
+#
+# Persistencia (índice directo, compacto): una entrada por CV en 'cv_terms'
+#   {_id: <cv ObjectId>, seq: n, dl: <largo>, t: [términos], f: [frecuencias], retirado?: true}
+# 'seq' sale de un contador en 'meta' (_id="bm25") y crece con cada (re)indexado.
+# Los CVs borrados o degradados (versión histórica, viejo de un cluster) quedan con
+# retirado=true y seq nuevo; al borrar se vacían los términos, al degradar se conservan
+# para que restaurar_texto los vuelva a publicar sin re-tokenizar.
+#
+# Cada worker arma en memoria el índice invertido (término → CVs, frecuencias) y
+# lo pone al día leyendo solo las entradas con seq mayor al último visto. Si un CV
+# se re-indexa o se retira, su entrada vieja queda marcada como muerta; cuando las
+# muertas pesan demasiado, las listas se compactan.
+import asyncio
+import math
+from array import array
+from collections import Counter
+from typing import Dict, List, Tuple
+
+import numpy as np
+from bson import ObjectId
+from pymongo import ReturnDocument
+
+from core.config import BM25_B, BM25_K1
+from cv.services.cv_detalle import cargar_detalles
+from utils.text_normalizer import tokens_norm_list
+
+# compactar las listas en memoria cuando las entradas muertas superan esta fracción
+_COMPACTAR = 0.25
+
+
+async def _siguiente_seq(db) -> int:
+    meta = await db["meta"].find_one_and_update(
+        {"_id": "bm25"}, {"$inc": {"seq": 1}}, upsert=True, return_document=ReturnDocument.AFTER)
+    return int(meta["seq"])
+
+
+async def indexar_texto(db, cv_id: str, texto: str) -> None:
+    """Hook de ingesta: (re)escribe la entrada de cv_terms del CV."""
+    tf = Counter(tokens_norm_list(texto or ""))
+    seq = await _siguiente_seq(db)
+    terms = sorted(tf)
+    await db["cv_terms"].replace_one(
+        {"_id": ObjectId(cv_id)},
+        {"seq": seq, "dl": sum(tf.values()),
+         "t": terms, "f": [min(tf[t], 65535) for t in terms]},
+        upsert=True,
+    )
+
+
+async def retirar_texto(db, cv_ids: List[str], borrado: bool = False) -> None:
+    """Hook de borrado/degradación: saca los CVs del índice de todos los workers."""
+    if not cv_ids:
+        return
+    q = {"_id": {"$in": [ObjectId(c) for c in cv_ids]}}
+    cambios = {"seq": await _siguiente_seq(db), "retirado": True}
+    if borrado:
+        cambios.update({"dl": 0, "t": [], "f": []})
+    else:
+        q["retirado"] = {"$ne": True}  # los ya retirados no generan trabajo en los workers
+    await db["cv_terms"].update_many(q, {"$set": cambios})
+
+
+async def restaurar_texto(db, cv_id: str) -> None:
+    """El CV vuelve a ser vigente: se re-publica su entrada retirada (no-op si no lo estaba)."""
+    await db["cv_terms"].update_one(
+        {"_id": ObjectId(cv_id), "retirado": True},
+        {"$set": {"seq": await _siguiente_seq(db)}, "$unset": {"retirado": ""}})
+
+
+async def migrar_cv_terms(db, batch: int = 500) -> int:
+    """Indexa los CVs que todavía no tienen entrada en cv_terms (reanudable)."""
+    total, last = 0, None
+    while True:
+        q = {"_id": {"$gt": last}} if last is not None else {}
+        docs = await db["curriculum"].find(q, projection={"_id": 1}) \
+            .sort("_id", 1).limit(batch).to_list(length=batch)
+        if not docs:
+            return total
+        last = docs[-1]["_id"]
+        ya = {d["_id"] async for d in db["cv_terms"].find(
+            {"_id": {"$in": [d["_id"] for d in docs]}}, projection={"_id": 1})}
+        nuevos = [d["_id"] for d in docs if d["_id"] not in ya]
+        for oid, frio in (await cargar_detalles(db, nuevos)).items():
+            await indexar_texto(db, str(oid), frio.get("cv_text") or "")
+            total += 1
+        print(f"[bm25] {total} CVs indexados")
+
+
+class Bm25Index:
+    def __init__(self, k1: float = BM25_K1, b: float = BM25_B):
+        self.k1, self.b = k1, b
+        self._seq = 0
+        self._cv_ids: List[str] = []
+        self._doc_of: Dict[str, int] = {}
+        self._dl = array("f")
+        self._alive = array("b")
+        self._n_alive = 0
+        self._sum_dl = 0.0
+        self._post: Dict[str, Tuple[array, array]] = {}   # término → (docs int32, tf uint16)
+        self._lock = asyncio.Lock()
+
+    def __len__(self) -> int:
+        return self._n_alive
+
+    def _quitar(self, cv_id: str) -> None:
+        prev = self._doc_of.pop(cv_id, None)
+        if prev is not None and self._alive[prev]:
+            self._alive[prev] = 0
+            self._n_alive -= 1
+            self._sum_dl -= self._dl[prev]
+
+    def _agregar(self, cv_id: str, dl: int, terms: List[str], freqs: List[int]) -> None:
+        self._quitar(cv_id)
+        doc = len(self._cv_ids)
+        self._cv_ids.append(cv_id)
+        self._doc_of[cv_id] = doc
+        self._dl.append(float(dl))
+        self._alive.append(1)
+        self._n_alive += 1
+        self._sum_dl += dl
+        for t, f in zip(terms, freqs):
+            docs, tfs = self._post.setdefault(t, (array("i"), array("H")))
+            docs.append(doc)
+            tfs.append(f)
+
+    async def refresh(self, db) -> None:
+        """Trae las entradas nuevas o re-indexadas desde el último seq visto."""
+        async with self._lock:
+            cur = db["cv_terms"].find({"seq": {"$gt": self._seq}}).sort("seq", 1)
+            async for e in cur:
+                if e.get("retirado"):
+                    self._quitar(str(e["_id"]))
+                else:
+                    self._agregar(str(e["_id"]), int(e.get("dl", 0)), e.get("t", []), e.get("f", []))
+                self._seq = max(self._seq, int(e["seq"]))
+            muertas = len(self._cv_ids) - self._n_alive
+            if muertas > max(1024, _COMPACTAR * len(self._cv_ids)):
+                self._compactar()
+
+    def _compactar(self) -> None:
+        """Renumera los CVs vivos y saca de las listas las entradas muertas."""
+        alive = np.array(self._alive, dtype=bool)
+        nuevo = np.full(len(alive), -1, dtype=np.int64)
+        nuevo[alive] = np.arange(int(alive.sum()))
+        vivos = np.flatnonzero(alive).tolist()
+        self._cv_ids = [self._cv_ids[i] for i in vivos]
+        self._doc_of = {cid: i for i, cid in enumerate(self._cv_ids)}
+        self._dl = array("f", (self._dl[i] for i in vivos))
+        self._alive = array("b", [1] * len(vivos))
+        post: Dict[str, Tuple[array, array]] = {}
+        for t, (docs, tfs) in self._post.items():
+            d = np.array(docs, dtype=np.int64)
+            keep = alive[d]
+            if keep.any():
+                post[t] = (array("i", nuevo[d[keep]].astype(np.int32).tobytes()),
+                           array("H", np.array(tfs, dtype=np.uint16)[keep].tobytes()))
+        self._post = post
+
+    def scores(self, query: str) -> Tuple[np.ndarray, np.ndarray]:
+        """(docs, scores) BM25 de todos los CVs vivos con al menos un término de la consulta."""
+        terms = set(tokens_norm_list(query))
+        if not terms or not self._n_alive:
+            return np.zeros(0, dtype=np.int64), np.zeros(0, dtype=np.float32)
+        # copias (no vistas): los array.array no pueden crecer mientras exportan su buffer
+        alive = np.array(self._alive, dtype=bool)
+        dl = np.array(self._dl, dtype=np.float32)
+        avgdl = (self._sum_dl / self._n_alive) or 1.0
+        acc = np.zeros(len(self._cv_ids), dtype=np.float32)
+        for t in terms:
+            if t not in self._post:
+                continue
+            docs, tfs = self._post[t]
+            d = np.array(docs, dtype=np.int64)
+            f = np.array(tfs, dtype=np.float32)
+            vivos = alive[d]
+            d, f = d[vivos], f[vivos]
+            if not len(d):
+                continue
+            idf = math.log(1.0 + (self._n_alive - len(d) + 0.5) / (len(d) + 0.5))
+            acc[d] += idf * f * (self.k1 + 1) / (f + self.k1 * (1 - self.b + self.b * dl[d] / avgdl))
+        docs = np.flatnonzero(acc)
+        return docs, acc[docs]
+
+    def top_k(self, query: str, k: int) -> List[Tuple[str, float]]:
+        docs, sc = self.scores(query)
+        if len(docs) > k:
+            top = np.argpartition(-sc, k - 1)[:k]
+            docs, sc = docs[top], sc[top]
+        o = np.argsort(-sc)
+        return [(self._cv_ids[i], float(s)) for i, s in zip(docs[o].tolist(), sc[o].tolist())]
+
+
+_index = Bm25Index()
+
+
+async def buscar_bm25(db, query: str, k: int) -> List[Tuple[str, float]]:
+    """Top-k CVs por BM25 (pone al día el índice del worker antes de buscar)."""
+    await _index.refresh(db)
+    return _index.top_k(query, k)
+
+
+if __name__ == "__main__":
+    # python -m cv.services.bm25_index   (desde backend/, con Mongo configurado)
+    from core.database import get_client
+
+    async def _main():
+        n = await migrar_cv_terms(get_client().get_default_database())
+        print(f"OK: {n} CVs")
+
+    asyncio.run(_main())
@@ -0,0 +1,114 @@
+# cv/services/cv_detalle.py
+# Split caliente/frío de 'curriculum'.
+#
+#   curriculum          → doc "caliente": identidad, archivo, timestamps y campos de
+#                         scoring (vector, tokens, tokidx_*, lsh_*). Es lo que leen
+#                         rankings, búsquedas y los lookups por email.
+#   curriculum_detalle  → doc "frío", mismo _id: cv_text y cv_analisis_gpt (decenas de KB).
+#                         Con CV_DETALLE_ZLIB > 0 se guarda comprimido:
+#                         {_id, z: Binary(zlib(bson(campos)))}; si no, {_id, **campos}.
+#
+# Los CVs anteriores al split todavía tienen los campos fríos en 'curriculum': las
+# lecturas de detalle caen ahí si no hay doc en curriculum_detalle (migrar_detalle los mueve).
+import zlib
+from typing import Any, Dict, Iterable, Optional, Tuple
+
+import bson
+from bson import ObjectId
+from bson.binary import Binary
+from motor.motor_asyncio import AsyncIOMotorDatabase
+
+from core.config import CV_DETALLE_ZLIB
+
+CAMPOS_FRIOS = ("cv_text", "cv_analisis_gpt")
+
+# proyección que deja afuera lo frío y lo pesado de scoring (para lecturas de identidad)
+SIN_FRIOS = {c: 0 for c in CAMPOS_FRIOS}
+
+
+def separar(doc: Dict[str, Any]) -> Tuple[Dict[str, Any], Dict[str, Any]]:
+    """(caliente, frío) de un doc completo de curriculum (o de un $set parcial)."""
+    caliente = {k: v for k, v in doc.items() if k not in CAMPOS_FRIOS}
+    frio = {k: doc[k] for k in CAMPOS_FRIOS if k in doc}
+    return caliente, frio
+
+
+def _empaquetar(frio: Dict[str, Any]) -> Dict[str, Any]:
+    if CV_DETALLE_ZLIB > 0:
+        return {"z": Binary(zlib.compress(bson.encode(frio), CV_DETALLE_ZLIB))}
+    return dict(frio)
+
+
+def _desempaquetar(d: Dict[str, Any]) -> Dict[str, Any]:
+    if "z" in d:
+        return bson.decode(zlib.decompress(d["z"]))
+    return {k: d[k] for k in CAMPOS_FRIOS if k in d}
+
+
+async def guardar_detalle(db: AsyncIOMotorDatabase, cv_oid: ObjectId, frio: Dict[str, Any]) -> None:
+    """(Re)escribe el doc frío. Acepta un subconjunto de campos: se combina con lo guardado."""
+    if not frio:
+        return
+    if set(frio) != set(CAMPOS_FRIOS):
+        frio = {**(await cargar_detalle(db, cv_oid)), **frio}
+    await db["curriculum_detalle"].replace_one({"_id": cv_oid}, _empaquetar(frio), upsert=True)
+
+
+async def cargar_detalles(db: AsyncIOMotorDatabase, cv_oids: Iterable[ObjectId]) -> Dict[ObjectId, Dict[str, Any]]:
+    """Campos fríos de varios CVs ({} para los que no tienen ninguno)."""
+    cv_oids = list(cv_oids)
+    out: Dict[ObjectId, Dict[str, Any]] = {}
+    async for d in db["curriculum_detalle"].find({"_id": {"$in": cv_oids}}):
+        out[d["_id"]] = _desempaquetar(d)
+    faltan = [o for o in cv_oids if o not in out]
+    if faltan:
+        # CVs no migrados: los campos siguen en el doc caliente
+        proy = {c: 1 for c in CAMPOS_FRIOS}
+        async for d in db["curriculum"].find({"_id": {"$in": faltan}}, projection=proy):
+            out[d["_id"]] = {c: d[c] for c in CAMPOS_FRIOS if c in d}
+    return {o: out.get(o, {}) for o in cv_oids}
+
+
+async def cargar_detalle(db: AsyncIOMotorDatabase, cv_id, campos: Optional[Iterable[str]] = None) -> Dict[str, Any]:
+    oid = ObjectId(cv_id) if not isinstance(cv_id, ObjectId) else cv_id
+    frio = (await cargar_detalles(db, [oid]))[oid]
+    return frio if campos is None else {c: frio[c] for c in campos if c in frio}
+
+
+async def borrar_detalle(db: AsyncIOMotorDatabase, cv_oid: ObjectId) -> None:
+    await db["curriculum_detalle"].delete_one({"_id": cv_oid})
+
+
+async def migrar_detalle(db: AsyncIOMotorDatabase, batch: int = 500) -> int:
+    """
+    Mueve cv_text / cv_analisis_gpt de 'curriculum' a 'curriculum_detalle' y los quita
+    del doc caliente. Reanudable: solo toma docs que todavía tienen algún campo frío.
+    """
+    pendientes = {"$or": [{c: {"$exists": True}} for c in CAMPOS_FRIOS]}
+    proy = {c: 1 for c in CAMPOS_FRIOS}
+    total = 0
+    while True:
+        docs = await db["curriculum"].find(pendientes, projection=proy).limit(batch).to_list(length=batch)
+        if not docs:
+            return total
+        for d in docs:
+            _, frio = separar(d)
+            await db["curriculum_detalle"].replace_one({"_id": d["_id"]}, _empaquetar(frio), upsert=True)
+        await db["curriculum"].update_many(
+            {"_id": {"$in": [d["_id"] for d in docs]}},
+            {"$unset": {c: "" for c in CAMPOS_FRIOS}},
+        )
+        total += len(docs)
+        print(f"[detalle] {total} CVs migrados")
+
+
+if __name__ == "__main__":
+    # python -m cv.services.cv_detalle   (desde backend/, con Mongo configurado)
+    import asyncio
+    from core.database import get_client
+
+    async def _main():
+        n = await migrar_detalle(get_client().get_default_database())
+        print(f"OK: {n} CVs")
+
+    asyncio.run(_main())
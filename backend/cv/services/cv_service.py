@@ -1,18 +1,41 @@
 import time
 import re
+from contextlib import contextmanager
 from typing import Optional, Dict, Any, List, Tuple
 from io import BytesIO
 from bson import ObjectId
 from motor.motor_asyncio import AsyncIOMotorDatabase, AsyncIOMotorGridFSBucket
-from metricas.services.ranking_upsert import upsert_ranking_for_active_profile
+from metricas.services.ranking_upsert import puntuar_cv, upsert_ranking_for_profiles
 from utils.extract_gpt import build_cv_text_from_gpt, reed_cv_bytes
 from core.ai import embed_texts
+from core.vectors import encode_vector
+from core.embedding_store import cv_atributos, registrar_vector, retirar_vectores
+from metricas.services.token_index import indexar_tokens
+from cv.services.bm25_index import indexar_texto, retirar_texto
+from cv.services.duplicados import marcar_ultimo, registrar_duplicados
+from cv.services.cv_vigente import cv_vigente, insertar_vigente, marcar_vigente, promover_siguiente
+from cv.services.cv_detalle import CAMPOS_FRIOS, borrar_detalle, cargar_detalle, guardar_detalle, separar
+from core.metrics import INGEST_ETAPA, INGEST_TOTAL, medir
+from core.tracing import span, trazado
 import anyio
 import fitz  # PyMuPDF
 import numpy as np
 
 # ----------------- helpers -----------------
 
+# proyección de las lecturas por email: identidad + datos personales (sin vector ni tokens)
+PROY_CV = {
+    "nombre": 1, "apellido": 1, "ciudad": 1, "direccion": 1, "email": 1, "cv_file_id": 1,
+    "fecha_nacimiento": 1, "edad": 1, "timestamp": 1,
+}
+
+
+@contextmanager
+def _etapa(op: str, etapa: str):
+    """Etapa de la ingesta: histograma Prometheus + span de la traza del request."""
+    with medir(INGEST_ETAPA, op=op, etapa=etapa), span(f"cv.{etapa}"):
+        yield
+
 
 def _tokens_simple(s: str) -> List[str]:
     return list({t.lower() for t in re.findall(r"\w+", s or "")})
@@ -70,6 +93,7 @@ async def count_cv(db: AsyncIOMotorDatabase, collection_name: str = "curriculum"
     return await db[collection_name].count_documents({})
 
 
+@trazado("cv.guardar_cv")
 async def guardar_cv(
     db: AsyncIOMotorDatabase,
     file_bytes: bytes,
@@ -79,17 +103,19 @@ async def guardar_cv(
         fs = _gridfs(db)
 
         # 1) Subir PDF
-        upload_id = await fs.upload_from_stream(
-            f"{payload['firstname']}_{payload['lastname']}.pdf",
-            file_bytes,
-            metadata={
-                "usuario": f"{payload['firstname']} {payload['lastname']}", "ts": time.time()},
-        )
+        with _etapa("guardar", "gridfs"):
+            upload_id = await fs.upload_from_stream(
+                f"{payload['firstname']}_{payload['lastname']}.pdf",
+                file_bytes,
+                metadata={
+                    "usuario": f"{payload['firstname']} {payload['lastname']}", "ts": time.time()},
+            )
 
         # 2) Extraer (si hace falta)
         extracted_data = payload.get("extracted_data") or {}
         if not extracted_data:
-            extracted_data = await anyio.to_thread.run_sync(reed_cv_bytes, file_bytes)
+            with _etapa("guardar", "extraccion"):
+                extracted_data = await anyio.to_thread.run_sync(reed_cv_bytes, file_bytes)
 
         # 3) Texto para embedding
         gpt_text = build_cv_text_from_gpt(
@@ -97,14 +123,16 @@ async def guardar_cv(
         texto_para_embedding = gpt_text or (payload.get("cv_text") or "")
         if not texto_para_embedding.strip():
             try:
-                texto_para_embedding = await anyio.to_thread.run_sync(_pdf_text_from_bytes, file_bytes)
+                with _etapa("guardar", "texto_pdf"):
+                    texto_para_embedding = await anyio.to_thread.run_sync(_pdf_text_from_bytes, file_bytes)
             except Exception:
                 texto_para_embedding = ""
 
         # 4) Embedding
         cv_vector = payload.get("cv_vector")
         if cv_vector is None and texto_para_embedding.strip():
-            cv_vector = await _embed_one(texto_para_embedding)
+            with _etapa("guardar", "embedding"):
+                cv_vector = await _embed_one(texto_para_embedding)
 
         # 5) Tokens
         formacion_src = _pick(extracted_data, [
@@ -149,8 +177,8 @@ async def guardar_cv(
             "timestamp": time.time(),
 
             "cv_text": texto_para_embedding or "",
-            # ✅ usar list(...) solo si hay vector
-            "cv_vector": (list(cv_vector) if cv_vector is not None else None),
+            # Binary float32/float16 según VECTOR_STORAGE (None si no hay vector)
+            "cv_vector": encode_vector(cv_vector),
             "cv_vector_src": cv_vector_src,
             "norm": norm_val,
 
@@ -159,26 +187,39 @@ async def guardar_cv(
             "tokens_experiencia": list(tokens_experiencia or []),
         }
 
-        # 9) Insert
-        res = await db["curriculum"].insert_one(doc)
-        cv_id = str(res.inserted_id)
+        # tokens como ids del vocabulario global, para el índice invertido (tokidx_*)
+        with _etapa("guardar", "tokens"):
+            doc.update(await indexar_tokens(db, doc))
+
+        # 9) Insert (pasa a ser el CV vigente del email); texto y análisis van al doc frío
+        with _etapa("guardar", "insert"):
+            caliente, frio = separar(doc)
+            cv_id = await insertar_vigente(db, caliente)
+            await guardar_detalle(db, caliente["_id"], frio)
+        with _etapa("guardar", "indices"):
+            await registrar_vector(cv_id, cv_vector, cv_atributos(doc))
+            await indexar_texto(db, cv_id, doc["cv_text"])
+            await registrar_duplicados(db, cv_id, doc)
 
         # 10) Upsert ranking (si hay vector) — ✅ pasar norm_val, NO la función
         if doc["cv_vector"] is not None:
-            await upsert_ranking_for_active_profile(
-                db,
-                cv_id,
-                doc["cv_vector"],
-                norm_val or 0.0
-            )
-
+            with _etapa("guardar", "ranking_upsert"):
+                await upsert_ranking_for_profiles(
+                    db,
+                    cv_id,
+                    cv_vector,
+                    norm_val or 0.0
+                )
+
+        INGEST_TOTAL.labels(op="guardar", resultado="ok").inc()
         return cv_id, None
 
     except Exception as e:
+        INGEST_TOTAL.labels(op="guardar", resultado="error").inc()
         return None, str(e)
         # 9) Upsert de ranking (solo si hay vector)
         if doc["cv_vector"] is not None:
-            await upsert_ranking_for_active_profile(
+            await upsert_ranking_for_profiles(
                 db,
                 cv_id,
                 doc["cv_vector"],
@@ -192,8 +233,20 @@ async def guardar_cv(
         return None, str(e)
 
 
-async def obtener_cv_por_email(db: AsyncIOMotorDatabase, email: str) -> Optional[Dict[str, Any]]:
-    return await db["curriculum"].find_one({"email": email}, sort=[("timestamp", -1)])
+async def obtener_cv_por_email(
+    db: AsyncIOMotorDatabase,
+    email: str,
+    projection: Optional[Dict[str, Any]] = None,
+    detalle: bool = False,
+) -> Optional[Dict[str, Any]]:
+    """
+    CV vigente del email. Por defecto solo identidad y datos personales (PROY_CV);
+    con detalle=True suma cv_text y cv_analisis_gpt desde el doc frío.
+    """
+    doc = await cv_vigente(db, email, projection=projection or PROY_CV)
+    if doc and detalle:
+        doc.update(await cargar_detalle(db, doc["_id"]))
+    return doc
 
 
 async def cargar_cv(db, cv_file_id: str) -> Tuple[Optional[bytes], Optional[str]]:
@@ -212,7 +265,10 @@ async def cargar_cv(db, cv_file_id: str) -> Tuple[Optional[bytes], Optional[str]
 async def eliminar_cv(db: AsyncIOMotorDatabase, cv_id: str) -> bool:
     try:
         cv_oid = ObjectId(cv_id)
-        cv_doc = await db["curriculum"].find_one({"_id": cv_oid})
+        cv_doc = await db["curriculum"].find_one(
+            {"_id": cv_oid},
+            projection={"cv_file_id": 1, "email": 1, "is_current": 1, "dup_cluster": 1},
+        )
         if not cv_doc:
             return False
         if "cv_file_id" in cv_doc:
@@ -223,6 +279,18 @@ async def eliminar_cv(db: AsyncIOMotorDatabase, cv_id: str) -> bool:
             except Exception:
                 pass
         await db["curriculum"].delete_one({"_id": cv_oid})
+        await borrar_detalle(db, cv_oid)
+        await db["ranking"].delete_many({"cv_id": cv_id})
+        await retirar_vectores([cv_id])
+        await retirar_texto(db, [cv_id], borrado=True)
+        # si era la versión vigente de un cluster de duplicados, pasa a serlo el siguiente
+        if cv_doc.get("dup_cluster"):
+            await marcar_ultimo(db, cv_doc["dup_cluster"])
+        if cv_doc.get("is_current") and cv_doc.get("email"):
+            promovido = await promover_siguiente(db, cv_doc["email"])
+            if promovido is not None:
+                # sus filas de ranking se borraron al degradarla: se vuelven a calcular
+                await puntuar_cv(db, str(promovido))
         return True
     except Exception:
         return False
@@ -235,8 +303,8 @@ async def actualizar_perfil_usuario(
 ) -> Tuple[bool, Optional[str]]:
 
     try:
-        # doc más reciente por email
-        doc = await db["curriculum"].find_one({"email": email}, sort=[("timestamp", -1)])
+        # doc vigente del email (lo necesario para refrescar el snapshot)
+        doc = await cv_vigente(db, email, projection={"cv_vector": 1, "ciudad": 1, "edad": 1, "timestamp": 1})
         if not doc:
             return False, "No existe CV previo para este email"
 
@@ -252,6 +320,9 @@ async def actualizar_perfil_usuario(
             {"_id": doc["_id"]},
             {"$set": updates}
         )
+        # ciudad/edad son filtros de búsqueda: refrescar la fila del snapshot
+        if ("ciudad" in updates or "edad" in updates) and doc.get("cv_vector") is not None:
+            await registrar_vector(str(doc["_id"]), doc["cv_vector"], cv_atributos({**doc, **updates}))
         return True, None
     except Exception as e:
         return False, str(e)
@@ -259,6 +330,7 @@ async def actualizar_perfil_usuario(
 # cv/services/cv_service.py (añadir)
 
 
+@trazado("cv.resubir_cv")
 async def resubir_cv(
     db: AsyncIOMotorDatabase,
     email: str,
@@ -268,24 +340,27 @@ async def resubir_cv(
     try:
         fs = _gridfs(db)
 
-        # Doc más reciente del usuario
-        prev = await db["curriculum"].find_one({"email": email}, sort=[("timestamp", -1)])
+        # Doc vigente del usuario
+        prev = await cv_vigente(db, email, projection={
+            **PROY_CV, "is_current": 1, "dup_cluster": 1, "tokens_idiomas": 1})
         if not prev:
             return None, "No existe CV previo para este email, suba uno nuevo primero."
 
         # 1) Subir nuevo PDF
-        upload_id = await fs.upload_from_stream(
-            f"{prev.get('nombre', 'user')}_{prev.get('apellido', 'cv')}.pdf",
-            file_bytes,
-            metadata={
-                "usuario": f"{prev.get('nombre', '')} {prev.get('apellido', '')}", "ts": time.time()},
-        )
+        with _etapa("resubir", "gridfs"):
+            upload_id = await fs.upload_from_stream(
+                f"{prev.get('nombre', 'user')}_{prev.get('apellido', 'cv')}.pdf",
+                file_bytes,
+                metadata={
+                    "usuario": f"{prev.get('nombre', '')} {prev.get('apellido', '')}", "ts": time.time()},
+            )
 
         # 2) Extraer + construir texto + embed
-        extracted_data = prev.get("cv_analisis_gpt") or {}
+        extracted_data = (await cargar_detalle(db, prev["_id"], ["cv_analisis_gpt"])).get("cv_analisis_gpt") or {}
         if not extracted_data:
             try:
-                extracted_data = await anyio.to_thread.run_sync(reed_cv_bytes, file_bytes)
+                with _etapa("resubir", "extraccion"):
+                    extracted_data = await anyio.to_thread.run_sync(reed_cv_bytes, file_bytes)
             except Exception:
                 extracted_data = {}
 
@@ -294,13 +369,15 @@ async def resubir_cv(
         texto_para_embedding = gpt_text
         if not texto_para_embedding.strip():
             try:
-                texto_para_embedding = await anyio.to_thread.run_sync(_pdf_text_from_bytes, file_bytes)
+                with _etapa("resubir", "texto_pdf"):
+                    texto_para_embedding = await anyio.to_thread.run_sync(_pdf_text_from_bytes, file_bytes)
             except Exception:
                 texto_para_embedding = ""
 
         cv_vector = None
         if texto_para_embedding.strip():
-            cv_vector = await _embed_one(texto_para_embedding)
+            with _etapa("resubir", "embedding"):
+                cv_vector = await _embed_one(texto_para_embedding)
         norm_val = _norm(cv_vector)
 
         # 3) Tokens mínimos desde análisis
@@ -331,7 +408,7 @@ async def resubir_cv(
                 "timestamp": time.time(),
 
                 "cv_text": texto_para_embedding or "",
-                "cv_vector": (list(cv_vector) if cv_vector is not None else None),
+                "cv_vector": encode_vector(cv_vector),
                 "cv_vector_src": "gpt" if gpt_text else ("pdf_text" if texto_para_embedding else None),
                 "norm": norm_val,
 
@@ -339,13 +416,23 @@ async def resubir_cv(
                 "tokens_habilidades": list(tokens_habilidades or []),
                 "tokens_experiencia": list(tokens_experiencia or []),
             }
-            res = await db["curriculum"].insert_one(doc)
-            cv_id = str(res.inserted_id)
+            with _etapa("resubir", "tokens"):
+                doc.update(await indexar_tokens(db, doc))
+            with _etapa("resubir", "insert"):
+                caliente, frio = separar(doc)
+                cv_id = await insertar_vigente(db, caliente)
+                await guardar_detalle(db, caliente["_id"], frio)
+            with _etapa("resubir", "indices"):
+                await registrar_vector(cv_id, cv_vector, cv_atributos(doc))
+                await indexar_texto(db, cv_id, doc["cv_text"])
+                await registrar_duplicados(db, cv_id, doc)
 
             # Upsert ranking (si hay vector)
             if doc["cv_vector"] is not None:
-                await upsert_ranking_for_active_profile(db, cv_id, doc["cv_vector"], norm_val or 0.0)
+                with _etapa("resubir", "ranking_upsert"):
+                    await upsert_ranking_for_profiles(db, cv_id, cv_vector, norm_val or 0.0)
 
+            INGEST_TOTAL.labels(op="resubir", resultado="ok").inc()
             return cv_id, None
 
         else:
@@ -355,7 +442,7 @@ async def resubir_cv(
                 "cv_file_id": str(upload_id),
                 "cv_analisis_gpt": extracted_data,
                 "cv_text": texto_para_embedding or "",
-                "cv_vector": (list(cv_vector) if cv_vector is not None else None),
+                "cv_vector": encode_vector(cv_vector),
                 "cv_vector_src": "gpt" if gpt_text else ("pdf_text" if texto_para_embedding else None),
                 "norm": norm_val,
                 "tokens_formacion": list(tokens_formacion or []),
@@ -363,13 +450,29 @@ async def resubir_cv(
                 "tokens_experiencia": list(tokens_experiencia or []),
                 "timestamp": time.time(),
             }
-
-            await db["curriculum"].update_one({"_id": prev["_id"]}, {"$set": updates})
+            with _etapa("resubir", "tokens"):
+                updates.update(await indexar_tokens(db, {**prev, **updates}))
+
+            with _etapa("resubir", "insert"):
+                caliente, frio = separar(updates)
+                # $unset: si el doc era anterior al split, los campos fríos viejos salen del caliente
+                await db["curriculum"].update_one(
+                    {"_id": prev["_id"]},
+                    {"$set": caliente, "$unset": {c: "" for c in CAMPOS_FRIOS}},
+                )
+                await guardar_detalle(db, prev["_id"], frio)
+                if not prev.get("is_current"):  # doc previo a la migración de is_current
+                    await marcar_vigente(db, prev["_id"], email)
             cv_id = str(prev["_id"])
+            with _etapa("resubir", "indices"):
+                await registrar_vector(cv_id, cv_vector, cv_atributos({**prev, **updates}))
+                await indexar_texto(db, cv_id, updates["cv_text"])
+                await registrar_duplicados(db, cv_id, {**prev, **updates})
 
             # Upsert ranking (si hay vector)
             if updates["cv_vector"] is not None:
-                await upsert_ranking_for_active_profile(db, cv_id, updates["cv_vector"], norm_val or 0.0)
+                with _etapa("resubir", "ranking_upsert"):
+                    await upsert_ranking_for_profiles(db, cv_id, cv_vector, norm_val or 0.0)
 
             # Limpieza de archivo anterior (best-effort)
             if old_file_id:
@@ -378,7 +481,9 @@ async def resubir_cv(
                 except Exception:
                     pass
 
+            INGEST_TOTAL.labels(op="resubir", resultado="ok").inc()
             return cv_id, None
 
     except Exception as e:
+        INGEST_TOTAL.labels(op="resubir", resultado="error").inc()
         return None, str(e)
@@ -0,0 +1,137 @@
+# cv/services/cv_vigente.py
+# "CV vigente" por email: curriculum.is_current=True solo en la versión más reciente.
+# Índice parcial único {email} donde is_current=True → a lo sumo un vigente por email,
+# y las búsquedas por email resuelven con un solo punto del índice (sin sort).
+#
+# Con keep_history, resubir_cv inserta una versión nueva: las anteriores quedan con
+# is_current=False y fuera de rebuilds, upserts de ranking y búsquedas.
+# Los docs sin el campo (anteriores a la migración) cuentan como vigentes.
+from typing import Any, Dict, Optional
+
+from bson import ObjectId
+from motor.motor_asyncio import AsyncIOMotorDatabase
+from pymongo.errors import DuplicateKeyError
+
+from core.embedding_store import retirar_vectores
+from cv.services.bm25_index import retirar_texto
+
+# filtro para lecturas que deben ver solo la versión vigente de cada candidato
+SOLO_VIGENTES = {"is_current": {"$ne": False}}
+
+# reintentos ante inserciones concurrentes para el mismo email (gana la última)
+_REINTENTOS = 5
+
+
+async def cv_vigente(db: AsyncIOMotorDatabase, email: str,
+                     projection: Optional[Dict[str, Any]] = None) -> Optional[Dict[str, Any]]:
+    """Doc vigente del email; si el email todavía no está migrado, el más reciente."""
+    doc = await db["curriculum"].find_one({"email": email, "is_current": True}, projection=projection)
+    if doc is None:
+        doc = await db["curriculum"].find_one({"email": email}, projection=projection,
+                                              sort=[("timestamp", -1)])
+    return doc
+
+
+async def _reelegir_clusters(db: AsyncIOMotorDatabase, clusters) -> None:
+    """Recalcula el representante de los clusters de duplicados tocados por un cambio de vigente."""
+    # import local: duplicados importa SOLO_VIGENTES de este módulo
+    from cv.services.duplicados import marcar_ultimo
+
+    for raiz in sorted({c for c in clusters if c}):
+        await marcar_ultimo(db, raiz)
+
+
+async def _degradar(db: AsyncIOMotorDatabase, email: str, excepto: Optional[ObjectId] = None) -> None:
+    q: Dict[str, Any] = {"email": email, "is_current": {"$ne": False}}
+    if excepto is not None:
+        q["_id"] = {"$ne": excepto}
+    docs = [d async for d in db["curriculum"].find(q, projection={"_id": 1, "dup_cluster": 1})]
+    if not docs:
+        return
+    viejos = [d["_id"] for d in docs]
+    await db["curriculum"].update_many({"_id": {"$in": viejos}}, {"$set": {"is_current": False}})
+    await db["ranking"].delete_many({"cv_id": {"$in": [str(v) for v in viejos]}})
+    await retirar_vectores([str(v) for v in viejos])
+    await retirar_texto(db, [str(v) for v in viejos])
+    # una versión histórica no puede seguir representando a su cluster: pasa al miembro vigente
+    await _reelegir_clusters(db, [d.get("dup_cluster") for d in docs])
+
+
+async def insertar_vigente(db: AsyncIOMotorDatabase, doc: Dict[str, Any]) -> str:
+    """
+    Inserta doc como versión vigente de su email: degrada las anteriores (y borra sus
+    filas de ranking) y después inserta con is_current=True. Si otra subida del mismo
+    email se cuela entre ambos pasos, el índice parcial único rechaza el insert y se
+    reintenta: nunca quedan dos vigentes.
+    """
+    email = doc.get("email")
+    for _ in range(_REINTENTOS):
+        await _degradar(db, email)
+        try:
+            res = await db["curriculum"].insert_one({**doc, "is_current": True})
+            doc["_id"] = res.inserted_id
+            doc["is_current"] = True
+            return str(res.inserted_id)
+        except DuplicateKeyError:
+            continue
+    raise RuntimeError(f"no se pudo registrar el CV vigente de {email}")
+
+
+async def marcar_vigente(db: AsyncIOMotorDatabase, cv_oid: ObjectId, email: str) -> None:
+    """Re-subida en el lugar: el doc reemplazado queda (o pasa a ser) el vigente del email."""
+    await _degradar(db, email, excepto=cv_oid)
+    doc = await db["curriculum"].find_one_and_update(
+        {"_id": cv_oid}, {"$set": {"is_current": True}}, projection={"dup_cluster": 1})
+    await _reelegir_clusters(db, [(doc or {}).get("dup_cluster")])
+
+
+async def promover_siguiente(db: AsyncIOMotorDatabase, email: str) -> Optional[ObjectId]:
+    """
+    Tras borrar el vigente, la versión más reciente que quede pasa a serlo. Devuelve su
+    _id (None si no hubo promoción): el llamador debe re-puntuarla, porque sus filas de
+    ranking se borraron cuando se la degradó.
+    """
+    if await db["curriculum"].find_one({"email": email, "is_current": True}, projection={"_id": 1}):
+        return None
+    doc = await db["curriculum"].find_one({"email": email}, projection={"_id": 1, "dup_cluster": 1},
+                                          sort=[("timestamp", -1)])
+    if not doc:
+        return None
+    try:
+        await db["curriculum"].update_one({"_id": doc["_id"]}, {"$set": {"is_current": True}})
+    except DuplicateKeyError:
+        return None  # una subida concurrente ya dejó otro vigente
+    # vuelve a competir por representar a su cluster de duplicados
+    await _reelegir_clusters(db, [doc.get("dup_cluster")])
+    return doc["_id"]
+
+
+async def migrar_is_current(db: AsyncIOMotorDatabase) -> int:
+    """Marca is_current en todos los emails (la versión más reciente de cada uno). Idempotente."""
+    total = 0
+    pipeline = [
+        {"$sort": {"email": 1, "timestamp": -1}},
+        {"$group": {"_id": "$email", "ids": {"$push": "$_id"}}},
+    ]
+    async for g in db["curriculum"].aggregate(pipeline, allowDiskUse=True):
+        vigente, viejos = g["ids"][0], g["ids"][1:]
+        if viejos:
+            await db["curriculum"].update_many({"_id": {"$in": viejos}}, {"$set": {"is_current": False}})
+            await db["ranking"].delete_many({"cv_id": {"$in": [str(v) for v in viejos]}})
+        await db["curriculum"].update_one({"_id": vigente}, {"$set": {"is_current": True}})
+        total += 1
+        if total % 1000 == 0:
+            print(f"[is_current] {total} emails")
+    return total
+
+
+if __name__ == "__main__":
+    # python -m cv.services.cv_vigente   (desde backend/, con Mongo configurado)
+    import asyncio
+    from core.database import get_client
+
+    async def _main():
+        n = await migrar_is_current(get_client().get_default_database())
+        print(f"OK: {n} emails")
+
+    asyncio.run(_main())
@@ -0,0 +1,173 @@
+# cv/services/duplicados.py
+# Clusters de CVs casi duplicados (re-subidas con historial, mismo candidato con
+# varios emails), mantenidos en la ingesta con LSH (utils/lsh.py):
+#
+#   curriculum.lsh_bands    → bandas SimHash + MinHash (multikey, con índice)
+#   curriculum.lsh_minhash  → firma MinHash (Binary uint32) para verificar candidatos
+#   curriculum.dup_cluster  → id del CV raíz del cluster (el más viejo)
+#   curriculum.dup_ultimo   → False en los miembros que no son el más reciente
+#
+# Rebuilds, rankings y búsquedas ignoran los CVs con dup_ultimo=False: cada cluster
+# aporta una sola fila (su versión más reciente).
+from typing import Any, Dict, List, Optional
+
+import numpy as np
+from bson import ObjectId
+from bson.binary import Binary
+from motor.motor_asyncio import AsyncIOMotorDatabase
+
+from core.config import LSH_DUP_COS, LSH_DUP_JACCARD
+from core.embedding_store import retirar_vectores
+from core.vectors import decode_vector
+from cv.services.bm25_index import retirar_texto
+from cv.services.cv_detalle import cargar_detalle, cargar_detalles
+from cv.services.cv_vigente import SOLO_VIGENTES
+from utils.lsh import jaccard_estimado, minhash, minhash_bandas, shingles, simhash_bandas
+
+# tope de candidatos a verificar por CV (bandas muy pobladas no deben disparar el costo)
+_MAX_CANDIDATOS = 200
+
+# filtro para lecturas que deben ver un solo CV por cluster
+SOLO_ULTIMOS = {"dup_ultimo": {"$ne": False}}
+
+
+def _firma(doc: Dict[str, Any]):
+    x = decode_vector(doc.get("cv_vector")).astype(np.float32)
+    sig = minhash(shingles(doc.get("cv_text") or ""))
+    return x, sig, simhash_bandas(x) + minhash_bandas(sig)
+
+
+def _es_duplicado(x: np.ndarray, sig: np.ndarray, otro: Dict[str, Any]) -> bool:
+    y = decode_vector(otro.get("cv_vector"))
+    if x.size == 0 or y.size != x.size:
+        return False
+    cos = float(x @ y) / ((float(np.linalg.norm(x)) * float(np.linalg.norm(y))) or 1e-8)
+    if cos < LSH_DUP_COS:
+        return False
+    raw = otro.get("lsh_minhash")
+    sig2 = np.frombuffer(raw, dtype=np.uint32) if raw else np.zeros(0, dtype=np.uint32)
+    return jaccard_estimado(sig, sig2) >= LSH_DUP_JACCARD
+
+
+async def registrar_duplicados(db: AsyncIOMotorDatabase, cv_id: str,
+                               doc: Optional[Dict[str, Any]] = None) -> str:
+    """
+    Hook de ingesta: calcula las bandas del CV, busca candidatos que compartan alguna,
+    verifica coseno + jaccard y une los clusters encontrados (union-find materializado:
+    todos los miembros quedan apuntando a la raíz más vieja). Devuelve el id de la raíz.
+    """
+    oid = ObjectId(cv_id)
+    if doc is None:
+        doc = await db["curriculum"].find_one(
+            {"_id": oid}, projection={"cv_vector": 1, "dup_cluster": 1}) or {}
+        doc.update(await cargar_detalle(db, oid, ["cv_text"]))
+    x, sig, bandas = _firma(doc)
+
+    dups: List[Dict[str, Any]] = []
+    if bandas:
+        cur = db["curriculum"].find(
+            {"lsh_bands": {"$in": bandas}, "_id": {"$ne": oid}},
+            projection={"cv_vector": 1, "lsh_minhash": 1, "dup_cluster": 1},
+        ).limit(_MAX_CANDIDATOS)
+        dups = [c async for c in cur if _es_duplicado(x, sig, c)]
+
+    clusters = {c.get("dup_cluster") or str(c["_id"]) for c in dups}
+    raiz = min(clusters | {cv_id})
+    await db["curriculum"].update_one({"_id": oid}, {"$set": {
+        "lsh_bands": bandas,
+        "lsh_minhash": Binary(sig.tobytes()),
+        "dup_cluster": raiz,
+    }})
+    if dups:
+        # unir: miembros de los clusters encontrados (y candidatos sin cluster) → raíz
+        await db["curriculum"].update_many(
+            {"$or": [{"dup_cluster": {"$in": sorted(clusters)}},
+                     {"_id": {"$in": [c["_id"] for c in dups]}}]},
+            {"$set": {"dup_cluster": raiz}},
+        )
+    await marcar_ultimo(db, raiz)
+    previo = doc.get("dup_cluster")
+    if previo and previo != raiz:
+        # el CV cambió (re-subida) y dejó su cluster anterior: recalcular el vigente de ese
+        await marcar_ultimo(db, previo)
+    return raiz
+
+
+async def marcar_ultimo(db: AsyncIOMotorDatabase, raiz: str) -> None:
+    """
+    Deja dup_ultimo=True solo en el miembro vigente (is_current) más reciente y borra el
+    ranking de los demás; las versiones históricas nunca representan al cluster.
+    Si el elegido venía excluido (dup_ultimo=False: se borró, se degradó o se fue del
+    cluster el que lo era), se re-puntúa, porque sus filas de ranking se habían borrado.
+    """
+    # import local: ranking_upsert importa SOLO_ULTIMOS de este módulo
+    from metricas.services.ranking_upsert import puntuar_cv
+
+    nuevo = await db["curriculum"].find_one(
+        {"dup_cluster": raiz, **SOLO_VIGENTES}, projection={"_id": 1, "dup_ultimo": 1},
+        sort=[("timestamp", -1)])
+    q: Dict[str, Any] = {"dup_cluster": raiz}
+    if nuevo is not None:
+        q["_id"] = {"$ne": nuevo["_id"]}
+    viejos = [d["_id"] async for d in db["curriculum"].find(q, projection={"_id": 1})]
+    if nuevo is not None:
+        await db["curriculum"].update_one({"_id": nuevo["_id"]}, {"$set": {"dup_ultimo": True}})
+    if viejos:
+        await db["curriculum"].update_many({"_id": {"$in": viejos}}, {"$set": {"dup_ultimo": False}})
+        await db["ranking"].delete_many({"cv_id": {"$in": [str(v) for v in viejos]}})
+        await retirar_vectores([str(v) for v in viejos])
+        await retirar_texto(db, [str(v) for v in viejos])
+    if nuevo is not None and nuevo.get("dup_ultimo") is False:
+        await puntuar_cv(db, str(nuevo["_id"]))
+
+
+async def listar_clusters(db: AsyncIOMotorDatabase, limit: int = 100) -> List[Dict[str, Any]]:
+    """Clusters con más de un miembro (los más grandes primero)."""
+    pipeline = [
+        {"$match": {"dup_cluster": {"$ne": None}}},
+        {"$sort": {"timestamp": -1}},
+        {"$group": {
+            "_id": "$dup_cluster",
+            "n": {"$sum": 1},
+            "miembros": {"$push": {
+                "cv_id": "$_id", "nombre": "$nombre", "apellido": "$apellido",
+                "email": "$email", "timestamp": "$timestamp", "ultimo": "$dup_ultimo"}},
+        }},
+        {"$match": {"n": {"$gt": 1}}},
+        {"$sort": {"n": -1}},
+        {"$limit": int(limit)},
+    ]
+    out = []
+    async for g in db["curriculum"].aggregate(pipeline):
+        miembros = [{**m, "cv_id": str(m["cv_id"])} for m in g["miembros"]]
+        out.append({"cluster": g["_id"], "n": g["n"], "miembros": miembros})
+    return out
+
+
+async def reindexar_duplicados(db: AsyncIOMotorDatabase, batch: int = 500) -> int:
+    """Backfill de firmas y clusters para CVs sin lsh_bands, del más viejo al más nuevo."""
+    total = 0
+    while True:
+        docs = await db["curriculum"].find(
+            {"lsh_bands": {"$exists": False}}, projection={"cv_vector": 1, "dup_cluster": 1}
+        ).sort("timestamp", 1).limit(batch).to_list(length=batch)
+        if not docs:
+            return total
+        textos = await cargar_detalles(db, [d["_id"] for d in docs])
+        for d in docs:
+            d["cv_text"] = textos[d["_id"]].get("cv_text") or ""
+            await registrar_duplicados(db, str(d["_id"]), d)
+        total += len(docs)
+        print(f"[duplicados] {total} CVs firmados")
+
+
+if __name__ == "__main__":
+    # python -m cv.services.duplicados   (desde backend/, con Mongo configurado)
+    import asyncio
+    from core.database import get_client
+
+    async def _main():
+        n = await reindexar_duplicados(get_client().get_default_database())
+        print(f"OK: {n} CVs")
+
+    asyncio.run(_main())
@@ -0,0 +1,218 @@
+# cv/services/search_service.py
+# Búsqueda de CVs (texto libre o perfil ad-hoc) con filtros estructurados.
+# No escribe filas de 'ranking': es solo lectura.
+#
+# modo "semantico":
+#   1) embedding de la consulta (cache LRU en core.ai.embed_query)
+#   2) filtros → máscara sobre las columnas del snapshot mmap (antes de la matmul)
+#   3) coseno solo sobre las filas que pasan el filtro + top-K con argpartition
+# Sin snapshot (EMBED_STORE_DIR vacío) se cae a un scan de Mongo con los filtros en la query.
+#
+# modo "keyword": BM25 sobre cv_text (cv/services/bm25_index), sin llamar al embedder.
+# modo "hibrido": fusión por rangos recíprocos (RRF) de las listas semántica y BM25.
+#
+# En todos los modos, los datos de los K CVs salen de Mongo re-validando los filtros
+# (y descartando versiones históricas y viejas de clusters de casi duplicados). Si tras
+# validar quedan menos de K, se piden más candidatos hasta completar o agotar las fuentes.
+import heapq
+from datetime import date, datetime, time as dtime, timedelta, timezone
+from typing import Any, Dict, List, Optional, Tuple
+
+import anyio
+import numpy as np
+from bson import ObjectId
+from motor.motor_asyncio import AsyncIOMotorDatabase
+
+from core.ai import embed_query
+from core.config import SEARCH_RRF_K
+from core.embedding_store import EmbeddingStore, get_store
+from core.vectors import decode_vector
+from utils.text_normalizer import normalizar_texto
+from cv.schemas.cv_schemas import CVSearchIn
+from cv.services.bm25_index import buscar_bm25
+from cv.services.duplicados import SOLO_ULTIMOS
+from cv.services.cv_vigente import SOLO_VIGENTES
+from perfil.services.perfil_service import _construir_perfil_texto
+
+_PROJ = {"nombre": 1, "apellido": 1, "email": 1, "ciudad": 1, "edad": 1,
+         "timestamp": 1, "cv_file_id": 1}
+
+# BM25 no ve los filtros: con filtros activos se piden más candidatos antes de validar
+_SOBREMUESTREO = 5
+# sin filtros también: snapshot e índice BM25 pueden traer CVs que Mongo ya descarta
+# (versiones históricas, viejos de un cluster, borrados que el worker todavía no vio)
+_SOBREMUESTREO_SIN_FILTROS = 2
+
+
+def _epoch(d: Optional[date], fin_de_dia: bool = False) -> Optional[float]:
+    if d is None:
+        return None
+    t = datetime.combine(d, dtime.min, tzinfo=timezone.utc)
+    if fin_de_dia:
+        t += timedelta(days=1) - timedelta(microseconds=1)
+    return t.timestamp()
+
+
+def _texto_consulta(body: CVSearchIn) -> str:
+    partes = []
+    if body.perfil is not None:
+        p = body.perfil
+        partes.append(_construir_perfil_texto(
+            p.puesto, p.educacion, p.atributos, p.experiencia, p.idiomas))
+    if body.texto:
+        partes.append(body.texto)
+    return " ".join(x for x in partes if x).strip()
+
+
+def _filtros(body: CVSearchIn) -> Tuple[Dict[str, Tuple[Any, Any]], Dict[str, str]]:
+    rangos = {
+        "edad": (body.edad_min, body.edad_max),
+        "ts": (_epoch(body.desde), _epoch(body.hasta, fin_de_dia=True)),
+    }
+    iguales = {}
+    ciudad = normalizar_texto(body.ciudad or "")
+    if ciudad:
+        iguales["ciudad"] = ciudad
+    return rangos, iguales
+
+
+def _mongo_query(rangos: Dict[str, Tuple[Any, Any]]) -> dict:
+    q: dict = {}
+    for attr, campo in (("edad", "edad"), ("ts", "timestamp")):
+        lo, hi = rangos.get(attr, (None, None))
+        cond = {}
+        if lo is not None:
+            cond["$gte"] = lo
+        if hi is not None:
+            cond["$lte"] = hi
+        if cond:
+            q[campo] = cond
+    return q
+
+
+def top_k_snapshot(store: EmbeddingStore, q: np.ndarray, k: int,
+                   rangos: Dict[str, Tuple[Any, Any]], iguales: Dict[str, str]) -> List[Tuple[str, float]]:
+    """Top-k por coseno entre las filas del snapshot que pasan los filtros (sync: correr en hilo)."""
+    mask = store.filtro(rangos, iguales)
+    mm, ids, _, _ = store.view()
+    n = float(np.linalg.norm(q))
+    if mm is None or q.size != mm.shape[1] or not n:
+        return []
+    mask = mask[:len(mm)]  # el snapshot pudo reconstruirse entre filtro() y view()
+    if not mask.any():
+        return []
+    q = (q / n).astype(np.float32)
+    idx = np.flatnonzero(mask)
+    # sin filtros efectivos la matmul va directo sobre el mmap (sin copiar filas)
+    scores = np.asarray(mm[:len(mask)] @ q)[idx] if len(idx) > len(mask) // 2 \
+        else np.asarray(mm[idx] @ q)
+    if len(idx) > k:
+        top = np.argpartition(-scores, k - 1)[:k]
+        idx, scores = idx[top], scores[top]
+    o = np.argsort(-scores)
+    return [(ids[r], float(s)) for r, s in zip(idx[o].tolist(), scores[o].tolist())]
+
+
+async def _top_k_mongo(db: AsyncIOMotorDatabase, q: np.ndarray, k: int,
+                       rangos: Dict[str, Tuple[Any, Any]], iguales: Dict[str, str]) -> List[Tuple[str, float]]:
+    """Fallback sin snapshot: scan de 'curriculum' con los filtros numéricos en la query."""
+    qn = float(np.linalg.norm(q)) or 1e-8
+    query = {**_mongo_query(rangos), **SOLO_VIGENTES, **SOLO_ULTIMOS, "cv_vector": {"$ne": None}}
+    heap: List[Tuple[float, str]] = []
+    cur = db["curriculum"].find(query, projection={"cv_vector": 1, "norm": 1, "ciudad": 1})
+    async for cv in cur:
+        if "ciudad" in iguales and normalizar_texto(cv.get("ciudad") or "") != iguales["ciudad"]:
+            continue
+        x = decode_vector(cv.get("cv_vector"))
+        if x.size != q.size:
+            continue
+        xn = float(cv.get("norm") or np.linalg.norm(x)) or 1e-8
+        item = (float(x @ q) / (xn * qn), str(cv["_id"]))
+        if len(heap) < k:
+            heapq.heappush(heap, item)
+        else:
+            heapq.heappushpop(heap, item)
+    return [(cid, s) for s, cid in sorted(heap, reverse=True)]
+
+
+async def _semanticos(db: AsyncIOMotorDatabase, texto: str, k: int,
+                      rangos: Dict[str, Tuple[Any, Any]], iguales: Dict[str, str]) -> List[Tuple[str, float]]:
+    q = await anyio.to_thread.run_sync(embed_query, texto)
+    store = get_store()
+    if store is not None:
+        return await anyio.to_thread.run_sync(top_k_snapshot, store, q, k, rangos, iguales)
+    return await _top_k_mongo(db, q, k, rangos, iguales)
+
+
+def fusion_rrf(*listas: List[Tuple[str, float]], k: int = SEARCH_RRF_K) -> List[Tuple[str, float]]:
+    """Reciprocal Rank Fusion: score = Σ 1 / (k + rango) sobre las listas donde aparece el CV."""
+    acc: Dict[str, float] = {}
+    for lista in listas:
+        for rango, (cid, _) in enumerate(lista, start=1):
+            acc[cid] = acc.get(cid, 0.0) + 1.0 / (k + rango)
+    return sorted(acc.items(), key=lambda x: x[1], reverse=True)
+
+
+async def _validar(db: AsyncIOMotorDatabase, hits: List[Tuple[str, float]], top_k: int,
+                   rangos: Dict[str, Tuple[Any, Any]], iguales: Dict[str, str],
+                   cos_de: Dict[str, float], bm25_de: Dict[str, float]) -> List[Dict[str, Any]]:
+    """Datos de los candidatos (en orden, hasta top_k); los filtros se re-validan contra Mongo."""
+    query = {"_id": {"$in": [ObjectId(cid) for cid, _ in hits]}, **_mongo_query(rangos),
+             **SOLO_VIGENTES, **SOLO_ULTIMOS}
+    docs = {str(d["_id"]): d async for d in db["curriculum"].find(query, projection=_PROJ)}
+    out = []
+    for cid, score in hits:
+        d = docs.get(cid)
+        if d is None:
+            continue
+        if "ciudad" in iguales and normalizar_texto(d.get("ciudad") or "") != iguales["ciudad"]:
+            continue
+        out.append({
+            "cv_id": cid,
+            "score": score,
+            "score_cos": cos_de.get(cid),
+            "score_bm25": bm25_de.get(cid),
+            "nombre": d.get("nombre", ""),
+            "apellido": d.get("apellido", ""),
+            "email": d.get("email", ""),
+            "ciudad": d.get("ciudad", ""),
+            "edad": d.get("edad"),
+            "timestamp": float(d.get("timestamp", 0.0) or 0.0),
+            "cv_file_id": d.get("cv_file_id"),
+        })
+        if len(out) >= top_k:
+            break
+    return out
+
+
+async def buscar_cvs(db: AsyncIOMotorDatabase, body: CVSearchIn) -> List[Dict[str, Any]]:
+    texto = _texto_consulta(body)
+    rangos, iguales = _filtros(body)
+    con_filtros = bool(iguales) or any(lo is not None or hi is not None for lo, hi in rangos.values())
+    n = body.top_k * (_SOBREMUESTREO if con_filtros else _SOBREMUESTREO_SIN_FILTROS)
+
+    while True:
+        sem: List[Tuple[str, float]] = []
+        kw: List[Tuple[str, float]] = []
+        if body.modo != "keyword":
+            # el embedding de la consulta sale de la cache LRU en las vueltas siguientes
+            sem = await _semanticos(db, texto, n, rangos, iguales)
+        if body.modo != "semantico":
+            kw = await buscar_bm25(db, texto, n)
+
+        if body.modo == "semantico":
+            hits = sem
+        elif body.modo == "keyword":
+            hits = kw
+        else:
+            hits = fusion_rrf(sem, kw)
+        if not hits:
+            return []
+
+        out = await _validar(db, hits, body.top_k, rangos, iguales, dict(sem), dict(kw))
+        # fuentes agotadas: devolvieron menos candidatos que los pedidos
+        agotado = all(len(lista) < n for lista, usada in
+                      ((sem, body.modo != "keyword"), (kw, body.modo != "semantico")) if usada)
+        if len(out) >= body.top_k or agotado:
+            return out
+        n *= 2
@@ -0,0 +1,93 @@
+# diagnostico/routes/diagnostico_router.py
+# Profiling y estado del worker para admins. Cada request actúa sobre EL worker que lo
+# atiende (con varios workers, repetir o fijar uno con un header de afinidad del proxy).
+import inspect
+import os
+import time
+
+from bson import ObjectId
+from fastapi import APIRouter, Depends, HTTPException, Query, Response
+
+from auth.utils.permissions import require_admin
+from core.database import get_db
+from core.loop_monitor import lag_resumen
+from diagnostico.services.profiling import (cprofile_operacion, diff_tracemalloc, ocupado,
+                                            operaciones, perfil_muestreo)
+
+diagnostico_router = APIRouter(prefix="/diagnostico", tags=["diagnostico"],
+                               dependencies=[Depends(require_admin())])
+
+
+def _archivo(data: bytes, nombre: str, media_type: str = "text/plain") -> Response:
+    return Response(data, media_type=media_type, headers={
+        "Content-Disposition": f'attachment; filename="{nombre}"',
+        "X-Worker-Pid": str(os.getpid()),
+    })
+
+
+def _libre() -> None:
+    if ocupado():
+        raise HTTPException(status_code=409, detail="Ya hay un profiling en curso en este worker")
+
+
+def _sufijo() -> str:
+    return f"{os.getpid()}_{time.strftime('%Y%m%d-%H%M%S')}"
+
+
+@diagnostico_router.get("/worker")
+async def estado_worker():
+    """Pid y lag del event loop (ventana reciente) del worker que responde."""
+    return {"pid": os.getpid(), "loop_lag": lag_resumen(), "profiling": ocupado()}
+
+
+@diagnostico_router.get("/profile")
+async def profile(
+    segundos: float = Query(10, gt=0, le=120),
+    intervalo_ms: float = Query(5, ge=1, le=1000),
+    todos_los_hilos: bool = False,
+):
+    """Perfil por muestreo → stacks colapsados (flamegraph.pl, speedscope, inferno)."""
+    _libre()
+    data = await perfil_muestreo(segundos, intervalo_ms / 1000, solo_loop=not todos_los_hilos)
+    return _archivo(data, f"profile_{_sufijo()}.collapsed")
+
+
+@diagnostico_router.get("/tracemalloc")
+async def tracemalloc_diff(
+    segundos: float = Query(10, gt=0, le=300),
+    top: int = Query(50, ge=1, le=1000),
+    formato: str = Query("texto", pattern="^(texto|collapsed)$"),
+):
+    """Crecimiento de memoria entre dos snapshots (top por línea, o colapsado por traceback)."""
+    _libre()
+    data = await diff_tracemalloc(segundos, top=top, colapsado=formato == "collapsed")
+    ext = "collapsed" if formato == "collapsed" else "txt"
+    return _archivo(data, f"tracemalloc_{_sufijo()}.{ext}")
+
+
+@diagnostico_router.post("/cprofile/{op}")
+async def cprofile(
+    op: str,
+    perfil_id: str | None = None,
+    cv_id: str | None = None,
+    db=Depends(get_db),
+):
+    """cProfile de una operación (rebuild?perfil_id=…, ranking_upsert?cv_id=…) → archivo .pstats."""
+    ops = operaciones(db)
+    fn = ops.get(op)
+    if fn is None:
+        raise HTTPException(status_code=404, detail=f"Operación desconocida; disponibles: {sorted(ops)}")
+    kwargs = {k: v for k, v in {"perfil_id": perfil_id, "cv_id": cv_id}.items() if v is not None}
+    try:
+        inspect.signature(fn).bind(**kwargs)
+    except TypeError:
+        params = list(inspect.signature(fn).parameters)
+        raise HTTPException(status_code=422, detail=f"'{op}' requiere exactamente: {params}")
+    invalidos = [k for k, v in kwargs.items() if not ObjectId.is_valid(v)]
+    if invalidos:
+        raise HTTPException(status_code=422, detail=f"ids inválidos: {invalidos}")
+    _libre()
+    data, res = await cprofile_operacion(lambda: fn(**kwargs))
+    resp = _archivo(data, f"{op}_{_sufijo()}.pstats", media_type="application/octet-stream")
+    resp.headers["X-Resultado"] = str(res)
+    return resp
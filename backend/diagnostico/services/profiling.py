@@ -0,0 +1,154 @@
+# diagnostico/services/profiling.py
+# Profiling bajo demanda del worker en ejecución (sin reiniciar ni dependencias extra):
+#
+#   perfil_muestreo: muestrea sys._current_frames() cada `intervalo_s` durante `segundos`
+#       y devuelve stacks colapsados ("a;b;c N"), listos para flamegraph.pl / speedscope.
+#   diff_tracemalloc: dos snapshots separados `segundos`; top de crecimiento por línea
+#       (texto) o por traceback (colapsado, pesado en bytes → flamegraph de memoria).
+#   cprofile_operacion: cProfile de una operación concreta (p.ej. rebuild de un perfil),
+#       volcado en formato pstats (snakeviz, `python -m pstats`, gprof2dot).
+#
+# Un solo profiling a la vez por worker (ocupado() → 409 en el router).
+import asyncio
+import cProfile
+import marshal
+import os
+import sys
+import threading
+import time
+import tracemalloc
+from collections import Counter
+from typing import Awaitable, Callable, Dict, Optional
+
+_lock = asyncio.Lock()
+_RAIZ = os.getcwd() + os.sep
+
+
+def ocupado() -> bool:
+    return _lock.locked()
+
+
+def _frame_nombre(code) -> str:
+    archivo = code.co_filename
+    # rutas del proyecto relativas; librerías desde site-packages/, stdlib por nombre
+    corte = archivo.find("site-packages" + os.sep)
+    if corte >= 0:
+        archivo = archivo[corte + len("site-packages" + os.sep):]
+    elif archivo.startswith(_RAIZ):
+        archivo = os.path.relpath(archivo, _RAIZ)
+    else:
+        archivo = os.path.basename(archivo)
+    return f"{code.co_name} ({archivo}:{code.co_firstlineno})".replace(";", ":")
+
+
+def _stack(frame) -> str:
+    partes = []
+    while frame is not None:
+        partes.append(_frame_nombre(frame.f_code))
+        frame = frame.f_back
+    return ";".join(reversed(partes))
+
+
+def _colapsado(cuentas: Counter) -> bytes:
+    return "".join(f"{s} {n}\n" for s, n in cuentas.most_common()).encode()
+
+
+def _muestrear(hilos: Optional[set], segundos: float, intervalo_s: float) -> Counter:
+    propio = threading.get_ident()
+    nombres = {t.ident: t.name for t in threading.enumerate()}
+    cuentas: Counter = Counter()
+    fin = time.monotonic() + segundos
+    while time.monotonic() < fin:
+        for tid, frame in sys._current_frames().items():
+            if tid == propio or (hilos is not None and tid not in hilos):
+                continue
+            cuentas[f"{nombres.get(tid, tid)};{_stack(frame)}"] += 1
+        time.sleep(intervalo_s)
+    return cuentas
+
+
+async def perfil_muestreo(segundos: float, intervalo_s: float, solo_loop: bool = True) -> bytes:
+    """Muestreo del worker; solo_loop=True limita al hilo del event loop (el que atiende requests)."""
+    hilos = {threading.get_ident()} if solo_loop else None
+    async with _lock:
+        # hilo propio (no el threadpool de anyio, que puede estar saturado justo por lo que se mide)
+        loop = asyncio.get_running_loop()
+        fut = loop.create_future()
+
+        def _correr():
+            try:
+                res = _muestrear(hilos, segundos, intervalo_s)
+                loop.call_soon_threadsafe(fut.set_result, res)
+            except Exception as e:  # pragma: no cover
+                loop.call_soon_threadsafe(fut.set_exception, e)
+
+        threading.Thread(target=_correr, name="profiler", daemon=True).start()
+        return _colapsado(await fut)
+
+
+async def diff_tracemalloc(segundos: float, top: int = 50, colapsado: bool = False,
+                           nframes: int = 25) -> bytes:
+    async with _lock:
+        propio = not tracemalloc.is_tracing()
+        if propio:
+            tracemalloc.start(nframes)
+        try:
+            antes = tracemalloc.take_snapshot()
+            await asyncio.sleep(segundos)
+            despues = tracemalloc.take_snapshot()
+        finally:
+            if propio:
+                tracemalloc.stop()
+        filtros = [tracemalloc.Filter(False, tracemalloc.__file__),
+                   tracemalloc.Filter(False, "<frozen importlib._bootstrap*>")]
+        antes, despues = antes.filter_traces(filtros), despues.filter_traces(filtros)
+
+        if colapsado:
+            cuentas: Counter = Counter()
+            for st in despues.compare_to(antes, "traceback"):
+                if st.size_diff > 0:
+                    pila = ";".join(f"{os.path.basename(f.filename)}:{f.lineno}" for f in reversed(st.traceback))
+                    cuentas[pila] += st.size_diff
+            return _colapsado(cuentas)
+
+        stats = despues.compare_to(antes, "lineno")[:top]
+        total = sum(s.size_diff for s in despues.compare_to(antes, "filename"))
+        lineas = [f"# {segundos:.0f}s, crecimiento total {total / 1024:+.1f} KiB (top {top} por línea)"]
+        lineas += [str(s) for s in stats]
+        return ("\n".join(lineas) + "\n").encode()
+
+
+async def cprofile_operacion(op: Callable[[], Awaitable[object]]) -> tuple[bytes, object]:
+    """
+    cProfile de una corrutina. El profiler mide el hilo del loop mientras dura la
+    operación: otros requests concurrentes también aparecen (filtrar por función en
+    pstats). Lo que la operación corre en hilos (anyio.to_thread) no se ve acá; para eso,
+    perfil_muestreo con solo_loop=False.
+    """
+    async with _lock:
+        prof = cProfile.Profile()
+        prof.enable()
+        try:
+            res = await op()
+        finally:
+            prof.disable()
+        prof.create_stats()
+        return marshal.dumps(prof.stats), res
+
+
+def operaciones(db) -> Dict[str, Callable[..., Awaitable[object]]]:
+    """Operaciones perfilables por nombre (parámetros por query string)."""
+    from metricas.services.rebuild import rebuild_ranking_for_profile
+    from metricas.services.ranking_upsert import upsert_ranking_for_profiles
+    from bson import ObjectId
+
+    async def _upsert(cv_id: str):
+        cv = await db["curriculum"].find_one({"_id": ObjectId(cv_id)}, projection={"cv_vector": 1, "norm": 1})
+        if not cv:
+            return 0
+        return await upsert_ranking_for_profiles(db, cv_id, cv.get("cv_vector"), cv.get("norm") or 0.0)
+
+    return {
+        "rebuild": lambda perfil_id: rebuild_ranking_for_profile(db, perfil_id),
+        "ranking_upsert": _upsert,
+    }
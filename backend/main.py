@@ -4,14 +4,19 @@ from user.routes.user_router import user_router
 from auth.routes.auth_router import auth_router
 
 from core.database import get_client
+from core.startup import ensure_indexes as crear_indices
+from core.tracing import TracingMiddleware
+from core.loop_monitor import detener_monitor_loop, iniciar_monitor_loop
+from core.metrics import CONTENT_TYPE_LATEST, HABILITADAS as METRICAS_HABILITADAS, exportar, metrics_middleware
 from core.config import get_settings
 from fastapi.middleware.cors import CORSMiddleware
-from fastapi import FastAPI, Depends
+from fastapi import FastAPI, Depends, Response
 from pathlib import Path
 from dotenv import load_dotenv
 from perfil.routes.perfil_router import perfil_router
 from cv.routes.cv_router import cv_router
 from metricas.routes.metricas_router import metricas_router
+from diagnostico.routes.diagnostico_router import diagnostico_router
 
 
 BASE_DIR = Path(__file__).resolve().parent
@@ -27,6 +32,7 @@ app.include_router(notification_router, prefix="/api")
 app.include_router(perfil_router, prefix="/api")   # ← NEW
 app.include_router(cv_router, prefix="/api")
 app.include_router(metricas_router, prefix="/api")
+app.include_router(diagnostico_router, prefix="/api")
 
 
 cfg = get_settings()
@@ -44,18 +50,40 @@ app.add_middleware(
 )
 
 
+@app.on_event("startup")
+async def monitor_loop():
+    iniciar_monitor_loop()
+
+
+@app.on_event("shutdown")
+async def detener_monitor():
+    detener_monitor_loop()
+
+
 @app.on_event("startup")
 async def ensure_indexes():
     db = get_client().get_default_database()
     try:
         await db.command("ping")
-        await db["users"].create_index("email", unique=True)
+        await crear_indices(db)
         print("Mongo OK (startup) + índices listos")
     except Exception as e:
         # No bloquees el arranque si la DB no está — logueá y seguí
         print(f"Mongo NO disponible (startup): {e} — sigo sin bloquear")
 
 
+app.middleware("http")(metrics_middleware)
+# la última agregada es la más externa: la traza cubre también CORS y métricas
+app.add_middleware(TracingMiddleware)
+
+
+@app.get("/metrics", include_in_schema=False)
+async def metrics():
+    if not METRICAS_HABILITADAS:
+        return Response("prometheus_client no instalado\n", status_code=503)
+    return Response(exportar(), media_type=CONTENT_TYPE_LATEST)
+
+
 @app.get("/health")
 async def health():
     return {"status": "ok", "env": cfg.ENVIRONMENT, "db": cfg.MONGO_DATABASE}
@@ -1,8 +1,14 @@
 # metricas/routes/metricas_router.py
+from typing import Literal
 from fastapi import APIRouter, Depends, Query
+from fastapi.responses import StreamingResponse
 from core.database import get_db
 from motor.motor_asyncio import AsyncIOMotorDatabase
 from metricas.services.rebuild import rebuild_ranking_for_profile
+from metricas.services.perfil_cache import get_perfil_activo_id
+from metricas.services.reweight import reweight_ranking, preview_ranking
+from metricas.schemas.ranking_schemas import PesosRanking, RankingItemOut
+from metricas.services.export import iter_ranking_cvs_zip, iter_ranking_csv, iter_ranking_ndjson
 from fastapi import HTTPException
 from bson import ObjectId
 from auth.utils.permissions import require_admin
@@ -10,6 +16,15 @@ from auth.utils.permissions import require_admin
 metricas_router = APIRouter(prefix="/metricas", tags=["metricas"])
 
 
+async def _perfil_id_o_activo(db, perfil_id: str | None) -> str:
+    if perfil_id:
+        return perfil_id
+    activo = await get_perfil_activo_id(db)
+    if not activo:
+        raise HTTPException(status_code=404, detail="No hay perfil activo")
+    return activo
+
+
 @metricas_router.get("/ranking")
 async def get_ranking(
     limit: int = Query(100, ge=1, le=1000),
@@ -19,10 +34,9 @@ async def get_ranking(
 ):
     # 🔍 1) Determinar perfil activo si no se pasa perfil_id
     if not perfil_id:
-        perfil_doc = await db["perfiles"].find_one({"activo": True})
-        if not perfil_doc:
+        perfil_id = await get_perfil_activo_id(db)
+        if not perfil_id:
             return {"perfil_id": None, "count": 0, "items": []}
-        perfil_id = str(perfil_doc["_id"])
 
     # 🔎 2) Filtro siempre por perfil_id
     q = {"perfil_id": perfil_id}
@@ -81,10 +95,71 @@ async def get_ranking(
 
 @metricas_router.post("/ranking/rebuild", response_model=dict)
 async def rebuild(perfil_id: str | None = None, db=Depends(get_db)):
-    if not perfil_id:
-        perf = await db["perfiles"].find_one({"activo": True}, projection={"_id": 1})
-        if not perf:
-            raise HTTPException(status_code=404, detail="No hay perfil activo")
-        perfil_id = str(perf["_id"])
+    perfil_id = await _perfil_id_o_activo(db, perfil_id)
     updated = await rebuild_ranking_for_profile(db, perfil_id)
     return {"perfil_id": perfil_id, "updated": updated}
+
+
+@metricas_router.get("/ranking/cvs.zip", dependencies=[Depends(require_admin())])
+async def download_ranking_cvs(
+    perfil_id: str | None = None,
+    top_n: int | None = Query(None, ge=1),
+    min_score: float | None = Query(None, ge=0.0, le=1.0),
+    cv_ids: list[str] | None = Query(None),
+    db: AsyncIOMotorDatabase = Depends(get_db),
+):
+    """ZIP con los CVs del ranking (top N, score mínimo o lista explícita de cv_id)."""
+    perfil_id = await _perfil_id_o_activo(db, perfil_id)
+
+    headers = {
+        "Content-Disposition": f'attachment; filename="ranking_{perfil_id}.zip"'}
+    return StreamingResponse(
+        iter_ranking_cvs_zip(db, perfil_id, top_n=top_n,
+                             min_score=min_score, cv_ids=cv_ids),
+        media_type="application/zip",
+        headers=headers,
+    )
+
+
+@metricas_router.get("/ranking/export", dependencies=[Depends(require_admin())])
+async def export_ranking(
+    perfil_id: str | None = None,
+    format: Literal["ndjson", "csv"] = Query("ndjson"),
+    db: AsyncIOMotorDatabase = Depends(get_db),
+):
+    """Ranking completo ordenado por score, en streaming (NDJSON o CSV)."""
+    perfil_id = await _perfil_id_o_activo(db, perfil_id)
+
+    if format == "csv":
+        body, media_type = iter_ranking_csv(db, perfil_id), "text/csv"
+    else:
+        body, media_type = iter_ranking_ndjson(
+            db, perfil_id), "application/x-ndjson"
+    headers = {
+        "Content-Disposition": f'attachment; filename="ranking_{perfil_id}.{format}"'}
+    return StreamingResponse(body, media_type=media_type, headers=headers)
+
+
+@metricas_router.post("/ranking/reweight", response_model=dict, dependencies=[Depends(require_admin())])
+async def reweight(
+    pesos: PesosRanking,
+    perfil_id: str | None = None,
+    db: AsyncIOMotorDatabase = Depends(get_db),
+):
+    """Fija los pesos del perfil y re-puntúa su ranking desde los componentes guardados."""
+    perfil_id = await _perfil_id_o_activo(db, perfil_id)
+    updated = await reweight_ranking(db, perfil_id, pesos.model_dump())
+    return {"perfil_id": perfil_id, "updated": updated, "pesos": pesos.model_dump()}
+
+
+@metricas_router.post("/ranking/preview", response_model=list[RankingItemOut],
+                      dependencies=[Depends(require_admin())])
+async def preview(
+    pesos: PesosRanking,
+    perfil_id: str | None = None,
+    limit: int = Query(100, ge=1, le=1000),
+    db: AsyncIOMotorDatabase = Depends(get_db),
+):
+    """Top-N con pesos alternativos (sin persistir)."""
+    perfil_id = await _perfil_id_o_activo(db, perfil_id)
+    return await preview_ranking(db, perfil_id, pesos.model_dump(), limit=limit)
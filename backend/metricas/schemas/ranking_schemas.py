@@ -0,0 +1,25 @@
+# metricas/schemas/ranking_schemas.py
+from pydantic import BaseModel, Field
+from core.config import ALPHA, W_HAB, W_EXP, W_EDU, W_IDI
+
+
+class PesosRanking(BaseModel):
+    # score = alpha * coseno + (1 - alpha) * (hab*J_hab + exp*J_exp + edu*J_edu + idi*J_idi)
+    alpha: float = Field(default=ALPHA, ge=0.0, le=1.0,
+                         description="peso del coseno vs. jaccard")
+    hab: float = Field(default=W_HAB, ge=0.0)
+    exp: float = Field(default=W_EXP, ge=0.0)
+    edu: float = Field(default=W_EDU, ge=0.0)
+    idi: float = Field(default=W_IDI, ge=0.0)
+
+
+class RankingItemOut(BaseModel):
+    cv_id: str
+    perfil_id: str
+    score: float
+    score_cos: float
+    score_j_total: float
+    nombre: str | None = None
+    apellido: str | None = None
+    email: str | None = None
+    cv_file_id: str | None = None
@@ -0,0 +1,177 @@
+# metricas/services/export.py
+import csv
+import io
+import json
+import re
+import zipfile
+import unicodedata
+from typing import AsyncIterator, List, Optional
+
+from bson import ObjectId
+from motor.motor_asyncio import AsyncIOMotorDatabase, AsyncIOMotorGridFSBucket
+
+from core.config import EXPORT_BATCH_SIZE
+
+# Columnas del export: componentes del score + snapshot del candidato
+EXPORT_FIELDS = [
+    "rank", "perfil_id", "cv_id",
+    "score", "score_cos", "score_j_total",
+    "score_j_hab", "score_j_exp", "score_j_edu", "score_j_idi",
+    "nombre", "apellido", "email", "cv_file_id", "updated_at",
+]
+
+
+class _ZipSink(io.RawIOBase):
+    """
+    Destino de escritura no 'seekable' para zipfile: acumula lo escrito y lo
+    entrega con drain(). Así el ZIP se arma al vuelo sin tenerlo entero en memoria.
+    """
+
+    def __init__(self):
+        self._buf = bytearray()
+
+    def writable(self) -> bool:
+        return True
+
+    def write(self, b) -> int:
+        self._buf += b
+        return len(b)
+
+    def drain(self) -> bytes:
+        out = bytes(self._buf)
+        self._buf.clear()
+        return out
+
+
+def _slug(s: str) -> str:
+    s = "".join(c for c in unicodedata.normalize("NFKD", s or "")
+                if not unicodedata.combining(c))
+    s = re.sub(r"[^\w\-]+", "_", s).strip("_")
+    return s or "candidato"
+
+
+def _ranking_query(
+    perfil_id: str,
+    min_score: Optional[float] = None,
+    cv_ids: Optional[List[str]] = None,
+) -> dict:
+    q: dict = {"perfil_id": perfil_id}
+    if min_score is not None:
+        q["score"] = {"$gte": float(min_score)}
+    if cv_ids:
+        q["cv_id"] = {"$in": [str(x) for x in cv_ids]}
+    return q
+
+
+async def iter_ranking_cvs_zip(
+    db: AsyncIOMotorDatabase,
+    perfil_id: str,
+    top_n: Optional[int] = None,
+    min_score: Optional[float] = None,
+    cv_ids: Optional[List[str]] = None,
+) -> AsyncIterator[bytes]:
+    """
+    Genera un ZIP (en streaming) con los PDFs de los candidatos del ranking,
+    ordenados por score y nombrados "<rank>_<apellido>_<nombre>.pdf".
+    Lee cada PDF chunk a chunk desde GridFS: memoria constante por archivo.
+    """
+    fs = AsyncIOMotorGridFSBucket(db)
+    cur = db["ranking"].find(
+        _ranking_query(perfil_id, min_score, cv_ids),
+        projection={"_id": 0, "cv_id": 1, "score": 1, "snapshot": 1},
+    ).sort("score", -1)
+    if top_n:
+        cur = cur.limit(int(top_n))
+
+    sink = _ZipSink()
+    # PDFs ya vienen comprimidos: STORED evita gastar CPU recomprimiendo
+    with zipfile.ZipFile(sink, mode="w", compression=zipfile.ZIP_STORED, allowZip64=True) as zf:
+        rank = 0
+        async for r in cur:
+            snap = r.get("snapshot") or {}
+            file_id = snap.get("cv_file_id")
+            if not file_id:
+                # ranking viejo sin snapshot completo → buscamos en curriculum
+                cv = await db["curriculum"].find_one(
+                    {"_id": ObjectId(r["cv_id"])},
+                    projection={"cv_file_id": 1, "nombre": 1, "apellido": 1},
+                )
+                if not cv or not cv.get("cv_file_id"):
+                    continue
+                snap = {**cv, **snap}
+                file_id = cv["cv_file_id"]
+
+            try:
+                grid_out = await fs.open_download_stream(ObjectId(file_id))
+            except Exception:
+                continue  # archivo borrado: lo salteamos
+
+            rank += 1
+            nombre = _slug(
+                f"{snap.get('apellido', '')}_{snap.get('nombre', '')}")
+            zinfo = zipfile.ZipInfo(f"{rank:03d}_{nombre}.pdf")
+            zinfo.compress_type = zipfile.ZIP_STORED
+            with zf.open(zinfo, mode="w", force_zip64=True) as dst:
+                while True:
+                    chunk = await grid_out.readchunk()
+                    if not chunk:
+                        break
+                    dst.write(chunk)
+                    data = sink.drain()
+                    if data:
+                        yield data
+            data = sink.drain()
+            if data:
+                yield data
+    # directorio central
+    yield sink.drain()
+
+
+async def iter_ranking_rows(
+    db: AsyncIOMotorDatabase,
+    perfil_id: str,
+    batch_size: int = EXPORT_BATCH_SIZE,
+) -> AsyncIterator[dict]:
+    """Recorre el ranking completo de un perfil ordenado por score, fila a fila (cursor del server)."""
+    projection = {"_id": 0, "weights": 0}
+    # el orden lo da el índice (perfil_id, score): sin sort en memoria en el server
+    cur = db["ranking"].find({"perfil_id": perfil_id}, projection=projection) \
+        .sort("score", -1).batch_size(batch_size)
+    rank = 0
+    async for r in cur:
+        rank += 1
+        snap = r.get("snapshot") or {}
+        row = {"rank": rank, "perfil_id": perfil_id, "cv_id": r.get("cv_id")}
+        for k in ("score", "score_cos", "score_j_total",
+                  "score_j_hab", "score_j_exp", "score_j_edu", "score_j_idi"):
+            row[k] = float(r.get(k, 0) or 0)
+        for k in ("nombre", "apellido", "email", "cv_file_id"):
+            row[k] = snap.get(k)
+        row["updated_at"] = r.get("updated_at")
+        yield row
+
+
+async def iter_ranking_ndjson(db: AsyncIOMotorDatabase, perfil_id: str) -> AsyncIterator[bytes]:
+    lines: List[str] = []
+    async for row in iter_ranking_rows(db, perfil_id):
+        lines.append(json.dumps(row, ensure_ascii=False))
+        if len(lines) >= EXPORT_BATCH_SIZE:
+            yield ("\n".join(lines) + "\n").encode("utf-8")
+            lines.clear()
+    if lines:
+        yield ("\n".join(lines) + "\n").encode("utf-8")
+
+
+async def iter_ranking_csv(db: AsyncIOMotorDatabase, perfil_id: str) -> AsyncIterator[bytes]:
+    buf = io.StringIO()
+    writer = csv.DictWriter(buf, fieldnames=EXPORT_FIELDS)
+    writer.writeheader()
+    n = 0
+    async for row in iter_ranking_rows(db, perfil_id):
+        writer.writerow(row)
+        n += 1
+        if n % EXPORT_BATCH_SIZE == 0:
+            yield buf.getvalue().encode("utf-8")
+            buf.seek(0)
+            buf.truncate()
+    yield buf.getvalue().encode("utf-8")
@@ -0,0 +1,152 @@
+# metricas/services/perfil_cache.py
+# Cache en proceso del estado de scoring de los perfiles: vector float32, su norma
+# y los sets de tokens ya normalizados, para no re-leer ni re-normalizar el perfil
+# en cada CV subido.
+#
+# Coherencia entre workers de uvicorn: cada escritura sobre 'perfiles' incrementa
+# un contador global (colección 'meta', _id="perfiles"). Cada worker lo consulta
+# como mucho cada PERFIL_CACHE_CHECK_S segundos y, si cambió, descarta su cache.
+import time
+from dataclasses import dataclass
+from typing import Dict, Optional, Tuple
+
+import numpy as np
+from bson import ObjectId
+
+from core.config import PERFIL_CACHE_CHECK_S
+from core.vectors import decode_vector
+from utils.text_normalizer import tokens_norm
+from metricas.services.pesos import pesos_efectivos
+
+PERFILES_VIGENTES = {"$or": [{"activo": True}, {"publicado": True}]}
+
+_PERFIL_PROJ = {"_id": 1, "vector": 1, "atributos": 1, "experiencia": 1,
+                "educacion": 1, "idiomas": 1, "activo": 1, "publicado": 1, "pesos": 1}
+
+
+@dataclass(frozen=True)
+class PerfilScoring:
+    perfil_id: str
+    version: int
+    activo: bool
+    publicado: bool
+    vector: np.ndarray          # float32 (d,)
+    norm: float
+    atributos: frozenset
+    experiencia: frozenset
+    educacion: frozenset
+    idiomas: frozenset
+    pesos: Dict[str, float]     # alpha + pesos de jaccard (perfil o RANK_* del entorno)
+
+
+@dataclass(frozen=True)
+class PerfilesVigentes:
+    perfiles: Tuple[PerfilScoring, ...]
+    matriz: np.ndarray          # float32 (k, d): vectores apilados
+    norms: np.ndarray           # float32 (k,)
+
+
+# ---------- estado del worker ----------
+_version: int = -1
+_checked_at: float = 0.0
+_por_id: Dict[Tuple[str, int], Optional[PerfilScoring]] = {}
+_vigentes: Optional[PerfilesVigentes] = None
+_activo_id: Optional[str] = None
+_activo_cargado = False
+
+
+def _reset_local() -> None:
+    global _vigentes, _activo_id, _activo_cargado
+    _por_id.clear()
+    _vigentes = None
+    _activo_id = None
+    _activo_cargado = False
+
+
+async def _sync(db) -> None:
+    """Compara el contador global de versión; si cambió, invalida la cache local."""
+    global _version, _checked_at
+    now = time.monotonic()
+    if now - _checked_at < PERFIL_CACHE_CHECK_S and _version >= 0:
+        return
+    _checked_at = now
+    meta = await db["meta"].find_one({"_id": "perfiles"}, projection={"version": 1})
+    v = int((meta or {}).get("version", 0))
+    if v != _version:
+        _reset_local()
+        _version = v
+
+
+async def bump_perfiles_version(db) -> None:
+    """Llamar después de crear/modificar un perfil (o su flag 'activo')."""
+    global _checked_at
+    await db["meta"].update_one({"_id": "perfiles"}, {"$inc": {"version": 1}}, upsert=True)
+    _reset_local()
+    _checked_at = 0.0  # forzar re-lectura del contador en el próximo acceso
+
+
+def _build(doc: dict) -> Optional[PerfilScoring]:
+    # Binary float32 → vista zero-copy; listas viejas → ndarray
+    vec = decode_vector(doc.get("vector"))
+    if vec.size == 0:
+        return None
+    return PerfilScoring(
+        perfil_id=str(doc["_id"]),
+        version=_version,
+        activo=bool(doc.get("activo", False)),
+        publicado=bool(doc.get("publicado", False)),
+        vector=vec,
+        norm=float(np.linalg.norm(vec)) or 1e-8,
+        atributos=frozenset(tokens_norm(doc.get("atributos", []))),
+        experiencia=frozenset(tokens_norm(doc.get("experiencia", []))),
+        educacion=frozenset(tokens_norm(doc.get("educacion", []))),
+        idiomas=frozenset(tokens_norm(doc.get("idiomas", []))),
+        pesos=pesos_efectivos(doc.get("pesos")),
+    )
+
+
+async def get_perfil_scoring(db, perfil_id: str) -> Optional[PerfilScoring]:
+    """Estado de scoring de un perfil puntual (None si no existe o no tiene vector)."""
+    await _sync(db)
+    key = (perfil_id, _version)
+    if key not in _por_id:
+        doc = await db["perfiles"].find_one({"_id": ObjectId(perfil_id)}, projection=_PERFIL_PROJ)
+        _por_id[key] = _build(doc) if doc else None
+    return _por_id[key]
+
+
+async def get_perfiles_vigentes(db) -> PerfilesVigentes:
+    """Perfiles activos/publicados con sus vectores apilados para una sola matmul."""
+    global _vigentes
+    await _sync(db)
+    if _vigentes is None:
+        states = []
+        async for doc in db["perfiles"].find(PERFILES_VIGENTES, projection=_PERFIL_PROJ):
+            st = _build(doc)
+            if st is not None:
+                _por_id[(st.perfil_id, _version)] = st
+                states.append(st)
+        if states:
+            # todos deben compartir dimensión (EMBED_DIM); los que no, se omiten
+            dim = states[0].vector.size
+            states = [s for s in states if s.vector.size == dim]
+            _vigentes = PerfilesVigentes(
+                perfiles=tuple(states),
+                matriz=np.stack([s.vector for s in states]),
+                norms=np.asarray([s.norm for s in states], dtype=np.float32),
+            )
+        else:
+            _vigentes = PerfilesVigentes(perfiles=(), matriz=np.zeros((0, 0), dtype=np.float32),
+                                         norms=np.zeros(0, dtype=np.float32))
+    return _vigentes
+
+
+async def get_perfil_activo_id(db) -> Optional[str]:
+    """Id del perfil activo (global), cacheado."""
+    global _activo_id, _activo_cargado
+    await _sync(db)
+    if not _activo_cargado:
+        doc = await db["perfiles"].find_one({"activo": True}, projection={"_id": 1})
+        _activo_id = str(doc["_id"]) if doc else None
+        _activo_cargado = True
+    return _activo_id
@@ -0,0 +1,54 @@
+# metricas/services/pesos.py
+from typing import Any, Dict, Optional, Tuple
+
+from core.config import ALPHA, W_HAB, W_EXP, W_EDU, W_IDI
+
+# componente de jaccard → campo persistido en 'ranking'
+_J_CAMPOS = {"hab": "score_j_hab", "exp": "score_j_exp",
+             "edu": "score_j_edu", "idi": "score_j_idi"}
+
+
+def pesos_efectivos(pesos: Optional[Dict[str, Any]]) -> Dict[str, float]:
+    """Pesos del perfil completados con los RANK_* del entorno."""
+    base = {"alpha": ALPHA, "hab": W_HAB,
+            "exp": W_EXP, "edu": W_EDU, "idi": W_IDI}
+    for k, v in (pesos or {}).items():
+        if k in base and v is not None:
+            base[k] = float(v)
+    return base
+
+
+def combinar_score(pesos: Dict[str, float], cos: float,
+                   j_hab: float, j_exp: float, j_edu: float, j_idi: float) -> Tuple[float, float]:
+    """Devuelve (score, j_total) a partir de los componentes ya calculados."""
+    j_total = pesos["hab"] * j_hab + pesos["exp"] * j_exp + \
+        pesos["edu"] * j_edu + pesos["idi"] * j_idi
+    score = pesos["alpha"] * cos + (1.0 - pesos["alpha"]) * j_total
+    return score, j_total
+
+
+def weights_doc(pesos: Dict[str, float], thr: int) -> Dict[str, Any]:
+    """Subdocumento 'weights' que se guarda en cada fila de ranking."""
+    return {
+        "alpha": float(pesos["alpha"]),
+        "j": {k: float(pesos[k]) for k in _J_CAMPOS},
+        "thr": int(thr),
+    }
+
+
+def pipeline_recalculo(pesos: Dict[str, float]) -> list:
+    """
+    Etapas de agregación que recalculan score_j_total y score desde los componentes
+    guardados (sin coseno ni fuzzy). Sirve tanto para update_many (pipeline) como
+    para aggregate.
+    """
+    j_total = {"$add": [
+        {"$multiply": [float(pesos[k]), {"$ifNull": [f"${campo}", 0]}]}
+        for k, campo in _J_CAMPOS.items()
+    ]}
+    score = {"$add": [
+        {"$multiply": [float(pesos["alpha"]), {"$ifNull": ["$score_cos", 0]}]},
+        {"$multiply": [1.0 - float(pesos["alpha"]), "$score_j_total"]},
+    ]}
+    # dos etapas: la segunda necesita el score_j_total ya recalculado
+    return [{"$set": {"score_j_total": j_total}}, {"$set": {"score": score}}]
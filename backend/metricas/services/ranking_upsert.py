@@ -2,75 +2,75 @@
 import time
 import numpy as np
 from bson import ObjectId
+from pymongo import UpdateOne
 
-from core.config import ALPHA, W_HAB, W_EXP, W_EDU, W_IDI
 # Umbral de similitud para soft_jaccard; si no está en config, usamos 87 por defecto
 try:
     from core.config import THR_JACCARD
 except Exception:
     THR_JACCARD = 87
 
+from core.embedding_store import cv_atributos, registrar_vector
+from core.vectors import decode_vector
 from utils.text_normalizer import tokens_norm, soft_jaccard
+from utils.token_index import TOKIDX_FIELDS
+from metricas.services.pesos import combinar_score, weights_doc
+from metricas.services.perfil_cache import get_perfiles_vigentes
+from metricas.services.token_index import preparar_tokens
+from cv.services.bm25_index import restaurar_texto
+from cv.services.duplicados import SOLO_ULTIMOS
+from cv.services.cv_vigente import SOLO_VIGENTES
+from core.tracing import span, trazado
 
 
-async def upsert_ranking_for_active_profile(db, cv_id: str, cv_vector: list[float], cv_norm: float):
+@trazado("ranking_upsert")
+async def upsert_ranking_for_profiles(
+    db,
+    cv_id: str,
+    cv_vector,
+    cv_norm: float,
+    solo_activo: bool = False,
+) -> int:
     """
-    Calcula score (coseno + jaccards blandos) para el CV dado contra el perfil ACTIVO,
-    y lo persiste en la colección 'ranking' (upsert).
+    Calcula score (coseno + jaccards blandos) del CV dado contra TODOS los perfiles
+    vigentes (activo o publicado) en una sola pasada:
+      - coseno: una sola matmul contra la matriz apilada de vectores de perfil,
+      - tokens del CV normalizados una única vez,
+      - todas las filas de 'ranking' en un único bulk_write.
+    El estado de los perfiles (vectores, normas, tokens) sale de la cache en proceso.
+    Devuelve la cantidad de perfiles puntuados.
     """
-    # 1) Perfil activo (vector + listas simbólicas)
-    perfil = await db["perfiles"].find_one(
-        {"activo": True},
-        projection={"_id": 1, "vector": 1, "atributos": 1,
-                    "experiencia": 1, "educacion": 1, "idiomas": 1}
-    )
-    if not perfil or not perfil.get("vector"):
-        return
+    # 1) Perfiles vigentes (cacheados: vector float32 + norma + sets normalizados)
+    vig = await get_perfiles_vigentes(db)
+    x = decode_vector(cv_vector)
+    if not vig.perfiles or x.size == 0 or vig.matriz.shape[1] != x.size:
+        return 0
+    idx = [i for i, p in enumerate(vig.perfiles) if p.activo or not solo_activo]
+    if not idx:
+        return 0
 
     # 2) CV (tokens + snapshot)
     cv_doc = await db["curriculum"].find_one(
-        {"_id": ObjectId(cv_id)},
+        {"_id": ObjectId(cv_id), **SOLO_VIGENTES, **SOLO_ULTIMOS},
         projection={
             "nombre": 1, "apellido": 1, "email": 1, "cv_file_id": 1,
             "tokens_habilidades": 1, "tokens_experiencia": 1, "tokens_formacion": 1,
-            "tokens_idiomas": 1,   
+            "tokens_idiomas": 1, **{f: 1 for f in TOKIDX_FIELDS},
         }
     )
-    if not cv_doc:
-        return
-
-    # ---------- Coseno ----------
-    p = np.asarray(perfil["vector"], dtype=np.float32)
-    x = np.asarray(cv_vector or [], dtype=np.float32)
-    if x.size == 0 or p.size == 0:
-        cos = 0.0
-    else:
-        p_norm = float(np.linalg.norm(p)) or 1e-8
-        x_norm = float(cv_norm or (np.linalg.norm(x))) or 1e-8
-        cos = float((x @ p) / (x_norm * p_norm + 1e-8))
-
-    # ---------- Jaccards blandos: normalización + soft_jaccard ----------
-    # Perfil (sets normalizados)
-    perf_atr = tokens_norm(perfil.get("atributos", []))
-    perf_exp = tokens_norm(perfil.get("experiencia", []))
-    perf_edu = tokens_norm(perfil.get("educacion", []))
-    perf_idi = tokens_norm(perfil.get("idiomas", []))
-
-    # CV (sets normalizados)
+    if not cv_doc:  # inexistente, versión histórica o vieja de un cluster de duplicados
+        return 0
+
+    # ---------- Coseno: (k × d) @ (d,) ----------
+    x_norm = float(cv_norm or np.linalg.norm(x)) or 1e-8
+    cos_all = (vig.matriz[idx] @ x) / (vig.norms[idx] * x_norm + 1e-8)
+
+    # ---------- CV (sets normalizados, una vez) ----------
     cv_hab = tokens_norm(cv_doc.get("tokens_habilidades", []))
     cv_exp = tokens_norm(cv_doc.get("tokens_experiencia", []))
     cv_edu = tokens_norm(cv_doc.get("tokens_formacion", []))
     cv_idi = tokens_norm(cv_doc.get("tokens_idiomas", []))  # puede ser set()
 
-    thr = THR_JACCARD
-    J_hab = soft_jaccard(perf_atr, cv_hab, thr=thr)
-    J_exp = soft_jaccard(perf_exp, cv_exp, thr=thr)
-    J_edu = soft_jaccard(perf_edu, cv_edu, thr=thr)
-    J_idi = soft_jaccard(perf_idi, cv_idi, thr=thr)
-
-    j_total = W_HAB * J_hab + W_EXP * J_exp + W_EDU * J_edu + W_IDI * J_idi
-    score = ALPHA * cos + (1.0 - ALPHA) * j_total
-
     snapshot = {
         "nombre": cv_doc.get("nombre", ""),
         "apellido": cv_doc.get("apellido", ""),
@@ -79,23 +79,70 @@ async def upsert_ranking_for_active_profile(db, cv_id: str, cv_vector: list[floa
         "cv_file_id": cv_doc.get("cv_file_id", None),
     }
 
-    await db["ranking"].update_one(
-        {"perfil_id": str(perfil["_id"]), "cv_id": str(cv_id)},
-        {"$set": {
-            "score": float(score),
-            "score_cos": float(cos),
-            "score_j_total": float(j_total),
-            "score_j_hab": float(J_hab),
-            "score_j_exp": float(J_exp),
-            "score_j_edu": float(J_edu),
-            "score_j_idi": float(J_idi),
-            "weights": {
-                "alpha": float(ALPHA),
-                "j": {"hab": float(W_HAB), "exp": float(W_EXP), "edu": float(W_EDU), "idi": float(W_IDI)},
-                "thr": int(thr),
-            },
-            "updated_at": time.time(),
-            "snapshot": snapshot
-        }},
-        upsert=True
-    )
+    thr = THR_JACCARD
+    now = time.time()
+    ops = []
+    with span("ranking_upsert.scoring", perfiles=len(idx)):
+        for i, cos in zip(idx, cos_all.tolist()):
+            perfil = vig.perfiles[i]
+            # ids + tabla de pares del vocabulario (cacheados por worker); sin tabla usable, strings
+            ptoks = await preparar_tokens(db, perfil, thr)
+            if ptoks is not None:
+                J_hab = ptoks.jaccard("atributos", perfil.atributos, cv_doc)
+                J_exp = ptoks.jaccard("experiencia", perfil.experiencia, cv_doc)
+                J_edu = ptoks.jaccard("educacion", perfil.educacion, cv_doc)
+                J_idi = ptoks.jaccard("idiomas", perfil.idiomas, cv_doc)
+            else:
+                J_hab = soft_jaccard(perfil.atributos, cv_hab, thr=thr)
+                J_exp = soft_jaccard(perfil.experiencia, cv_exp, thr=thr)
+                J_edu = soft_jaccard(perfil.educacion, cv_edu, thr=thr)
+                J_idi = soft_jaccard(perfil.idiomas, cv_idi, thr=thr)
+
+            score, j_total = combinar_score(
+                perfil.pesos, cos, J_hab, J_exp, J_edu, J_idi)
+
+            ops.append(UpdateOne(
+                {"perfil_id": perfil.perfil_id, "cv_id": str(cv_id)},
+                {"$set": {
+                    "score": float(score),
+                    "score_cos": float(cos),
+                    "score_j_total": float(j_total),
+                    "score_j_hab": float(J_hab),
+                    "score_j_exp": float(J_exp),
+                    "score_j_edu": float(J_edu),
+                    "score_j_idi": float(J_idi),
+                    "weights": weights_doc(perfil.pesos, thr),
+                    "updated_at": now,
+                    "snapshot": snapshot
+                }},
+                upsert=True
+            ))
+
+    with span("ranking_upsert.bulk_write", ops=len(ops)):
+        await db["ranking"].bulk_write(ops, ordered=False)
+    return len(ops)
+
+
+async def puntuar_cv(db, cv_id: str) -> int:
+    """
+    Re-puntúa un CV ya guardado contra los perfiles vigentes: p.ej. cuando vuelve a ser
+    la versión vigente de su email o de su cluster de duplicados (sus filas se habían
+    borrado al degradarlo, y su vector y su entrada BM25 retirados). No hace nada si el
+    CV no existe o sigue sin ser vigente.
+    """
+    cv = await db["curriculum"].find_one(
+        {"_id": ObjectId(cv_id), **SOLO_VIGENTES, **SOLO_ULTIMOS},
+        projection={"cv_vector": 1, "norm": 1, "ciudad": 1, "edad": 1, "timestamp": 1})
+    if not cv or cv.get("cv_vector") is None:
+        return 0
+    await registrar_vector(str(cv_id), cv["cv_vector"], cv_atributos(cv))
+    await restaurar_texto(db, str(cv_id))
+    return await upsert_ranking_for_profiles(db, str(cv_id), cv["cv_vector"], cv.get("norm") or 0.0)
+
+
+async def upsert_ranking_for_active_profile(db, cv_id: str, cv_vector: list[float], cv_norm: float):
+    """
+    Compat: puntúa el CV solo contra el perfil ACTIVO.
+    El flujo de ingesta usa upsert_ranking_for_profiles (activo + publicados).
+    """
+    await upsert_ranking_for_profiles(db, cv_id, cv_vector, cv_norm, solo_activo=True)
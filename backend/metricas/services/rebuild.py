@@ -1,75 +1,141 @@
 # metricas/services/rebuild.py
 import time
+import anyio
 import numpy as np
 from bson import ObjectId
 
-from core.config import ALPHA, W_HAB, W_EXP, W_EDU, W_IDI
 # Podés definir THR_JACCARD en core.config (por ej. 87); si no existe, fijamos un default acá.
 try:
     from core.config import THR_JACCARD
 except Exception:
     THR_JACCARD = 87
 
+from core.config import RANK_TOPK
+from core.metrics import REBUILD_CVS, REBUILD_SEGUNDOS
+from core.tracing import registrar, span, trazado
+from core.vectors import decode_vector
+from core.embedding_store import cv_atributos, get_store, registrar_vector
+from core.ann_index import get_ann
+from cv.services.duplicados import SOLO_ULTIMOS
+from cv.services.cv_vigente import SOLO_VIGENTES
 from utils.text_normalizer import tokens_norm, soft_jaccard
-
-
+from utils.token_index import CAMPOS, TOKIDX_FIELDS
+from metricas.services.pesos import combinar_score, weights_doc
+from metricas.services.perfil_cache import get_perfil_scoring
+from metricas.services.token_index import preparar_tokens
+
+# el snapshot puede tener filas de CVs ya degradados o borrados (bajas que este worker
+# todavía no vio): se piden más candidatos al ANN que los K que se puntúan
+_SOBREMUESTREO = 2
+
+
+async def _top_k_vivos(db, ann, p, k: int) -> tuple[list[str], dict[str, float]]:
+    """
+    (ids devueltos por el ANN, {cv_id: coseno} de los k más cercanos que siguen vigentes).
+    Si los vigentes no alcanzan a k, agranda la búsqueda hasta juntarlos o agotar el índice.
+    """
+    pedir = k * _SOBREMUESTREO
+    while True:
+        ids, scores = await anyio.to_thread.run_sync(ann.search, p, pedir)
+        vivos = {str(d["_id"]) async for d in db["curriculum"].find(
+            {"_id": {"$in": [ObjectId(i) for i in ids]}, **SOLO_VIGENTES, **SOLO_ULTIMOS},
+            projection={"_id": 1})} if ids else set()
+        top = [(i, s) for i, s in zip(ids, scores.tolist()) if i in vivos][:k]
+        if len(top) >= k or len(ids) < pedir:
+            return ids, dict(top)
+        pedir *= 2
+
+
+@trazado("rebuild")
 async def rebuild_ranking_for_profile(db, perfil_id: str) -> int:
+    t0 = time.perf_counter()
 
     # 0) Limpia ranking existente de ese perfil (evita mezclas con perfiles previos)
     await db["ranking"].delete_many({"perfil_id": perfil_id})
 
-    # 1) Traer perfil (vector + listas simbólicas)
-    perf = await db["perfiles"].find_one(
-        {"_id": ObjectId(perfil_id)},
-        projection={"vector": 1, "atributos": 1,
-                    "experiencia": 1, "educacion": 1, "idiomas": 1}
-    )
-    if not perf or not perf.get("vector"):
-        return 0
-
-    p = np.asarray(perf["vector"], dtype=np.float32)
-    if p.size == 0:
+    # 1) Estado de scoring del perfil (cacheado: vector float32 + norma + sets normalizados)
+    perf = await get_perfil_scoring(db, perfil_id)
+    if perf is None:
         return 0
-    p_norm = float(np.linalg.norm(p)) or 1e-8
 
-    # Perfil normalizado para jaccard blando
-    perf_atr = tokens_norm(perf.get("atributos", []))
-    perf_exp = tokens_norm(perf.get("experiencia", []))
-    perf_edu = tokens_norm(perf.get("educacion", []))
-    perf_idi = tokens_norm(perf.get("idiomas", []))
-
-    # 2) Recorrer todos los CVs
+    p = perf.vector
+    p_norm = perf.norm
+
+    # Ids del vocabulario del perfil y sus términos compatibles (tabla vocab_sim):
+    # un CV sin ninguno de ellos tiene jaccard 0 en ese campo, sin fuzzy matching.
+    thr = THR_JACCARD
+    ptoks = await preparar_tokens(db, perf, thr)
+
+    def _jaccard(campo: str, cv: dict) -> float:
+        if ptoks is not None:
+            return ptoks.jaccard(campo, getattr(perf, campo), cv)
+        # tabla calculada con un umbral mayor: camino por strings
+        return soft_jaccard(getattr(perf, campo), tokens_norm(cv.get(CAMPOS[campo][0], [])), thr=thr)
+
+    # 2) Cosenos desde el snapshot mmap compartido (si está habilitado):
+    #    una matmul local contra todos los CVs, sin traer vectores de Mongo.
+    #    Con RANK_TOPK > 0, el índice ANN devuelve solo los K más cercanos y el
+    #    jaccard blando (lo caro) se calcula únicamente para esos candidatos.
+    store = get_store()
+    cos_snap: dict[str, float] = {}
+    query: dict = {}
+    ann = get_ann() if RANK_TOPK > 0 else None
+    if ann is not None:
+        with span("rebuild.ann", k=RANK_TOPK):
+            ids, cos_snap = await _top_k_vivos(db, ann, p, RANK_TOPK)
+        if ids:  # snapshot vacío → recorrido completo
+            query = {"_id": {"$in": [ObjectId(i) for i in cos_snap]}}
+    elif store is not None:
+        with span("rebuild.cosenos"):
+            ids, scores = await anyio.to_thread.run_sync(store.cosines, p)
+        cos_snap = dict(zip(ids, scores.tolist()))
+
+    # 3) Recorrer los CVs (todos, o los top-K del índice)
     projection = {
         "_id": 1, "nombre": 1, "apellido": 1, "email": 1, "cv_file_id": 1,
         "cv_vector": 1, "norm": 1,
         "tokens_habilidades": 1, "tokens_experiencia": 1, "tokens_formacion": 1, "tokens_idiomas": 1,
+        **{f: 1 for f in TOKIDX_FIELDS},
     }
-    cur = db["curriculum"].find({}, projection=projection)
+    if cos_snap:
+        projection.pop("cv_vector")
+    # solo la versión vigente de cada email, y una por cluster de casi duplicados
+    cur = db["curriculum"].find({**query, **SOLO_VIGENTES, **SOLO_ULTIMOS}, projection=projection)
 
     updated = 0
+    # tiempo acumulado por etapa del loop: un span por etapa (no uno por CV)
+    t_scoring = t_update = 0.0
     async for cv in cur:
         # --- Coseno ---
-        x = np.asarray(cv.get("cv_vector") or [], dtype=np.float32)
-        if x.size == 0:
-            cos = 0.0
+        cid = str(cv["_id"])
+        if cid in cos_snap:
+            cos = cos_snap[cid]
         else:
-            x_norm = float(cv.get("norm") or np.linalg.norm(x)) or 1e-8
-            cos = float((x @ p) / (x_norm * p_norm + 1e-8))
-
-        # --- Jaccards blandos ---
-        cv_hab = tokens_norm(cv.get("tokens_habilidades", []))
-        cv_exp = tokens_norm(cv.get("tokens_experiencia", []))
-        cv_edu = tokens_norm(cv.get("tokens_formacion", []))
-        cv_idi = tokens_norm(cv.get("tokens_idiomas", []))
-
-        thr = THR_JACCARD
-        J_hab = soft_jaccard(perf_atr, cv_hab, thr=thr)
-        J_exp = soft_jaccard(perf_exp, cv_exp, thr=thr)
-        J_edu = soft_jaccard(perf_edu, cv_edu, thr=thr)
-        J_idi = soft_jaccard(perf_idi, cv_idi, thr=thr)
-
-        j_total = W_HAB * J_hab + W_EXP * J_exp + W_EDU * J_edu + W_IDI * J_idi
-        score = ALPHA * cos + (1.0 - ALPHA) * j_total
+            raw = cv.get("cv_vector")
+            if "cv_vector" not in projection:
+                # CV que todavía no está en el snapshot: lo leemos y lo agregamos
+                doc = await db["curriculum"].find_one(
+                    {"_id": cv["_id"]},
+                    projection={"cv_vector": 1, "ciudad": 1, "edad": 1, "timestamp": 1}) or {}
+                raw = doc.get("cv_vector")
+                await registrar_vector(cid, raw, cv_atributos(doc))
+            x = decode_vector(raw)
+            if x.size == 0:
+                cos = 0.0
+            else:
+                x_norm = float(cv.get("norm") or np.linalg.norm(x)) or 1e-8
+                cos = float((x @ p) / (x_norm * p_norm + 1e-8))
+
+        # --- Jaccards blandos (prefiltrados por el índice invertido) ---
+        t1 = time.perf_counter()
+        J_hab = _jaccard("atributos", cv)
+        J_exp = _jaccard("experiencia", cv)
+        J_edu = _jaccard("educacion", cv)
+        J_idi = _jaccard("idiomas", cv)
+
+        score, j_total = combinar_score(
+            perf.pesos, cos, J_hab, J_exp, J_edu, J_idi)
+        t_scoring += time.perf_counter() - t1
 
         # --- Snapshot para el front (incluye cv_file_id para descarga) ---
         snapshot = {
@@ -79,6 +145,7 @@ async def rebuild_ranking_for_profile(db, perfil_id: str) -> int:
             "cv_file_id": cv.get("cv_file_id", None),
         }
 
+        t1 = time.perf_counter()
         await db["ranking"].update_one(
             {"perfil_id": perfil_id, "cv_id": str(cv["_id"])},
             {"$set": {
@@ -91,16 +158,17 @@ async def rebuild_ranking_for_profile(db, perfil_id: str) -> int:
                 "score_j_exp": float(J_exp),
                 "score_j_edu": float(J_edu),
                 "score_j_idi": float(J_idi),
-                "weights": {
-                    "alpha": float(ALPHA),
-                    "j": {"hab": float(W_HAB), "exp": float(W_EXP), "edu": float(W_EDU), "idi": float(W_IDI)},
-                    "thr": int(thr),
-                },
+                "weights": weights_doc(perf.pesos, thr),
                 "updated_at": time.time(),
                 "snapshot": snapshot,
             }},
             upsert=True
         )
+        t_update += time.perf_counter() - t1
         updated += 1
 
+    registrar("rebuild.scoring", t_scoring, cvs=updated)
+    registrar("rebuild.mongo_update", t_update, cvs=updated)
+    REBUILD_SEGUNDOS.observe(time.perf_counter() - t0)
+    REBUILD_CVS.inc(updated)
     return updated
@@ -0,0 +1,56 @@
+# metricas/services/reweight.py
+import time
+from typing import Any, Dict, List
+
+from bson import ObjectId
+
+from core.config import THR_JACCARD
+from metricas.services.pesos import pesos_efectivos, pipeline_recalculo, weights_doc
+from metricas.services.perfil_cache import bump_perfiles_version
+
+
+async def reweight_ranking(db, perfil_id: str, pesos: Dict[str, Any]) -> int:
+    """
+    Guarda los pesos en el perfil y recalcula score / score_j_total de todo su ranking
+    desde los componentes persistidos (score_cos, score_j_*), con un update por
+    pipeline en el server: sin coseno, sin fuzzy y sin loop en Python.
+    """
+    p = pesos_efectivos(pesos)
+    res = await db["perfiles"].update_one({"_id": ObjectId(perfil_id)}, {"$set": {"pesos": p}})
+    if res.matched_count == 0:
+        return 0
+    # los CVs que entren después ya se puntúan con los pesos nuevos
+    await bump_perfiles_version(db)
+
+    stages = pipeline_recalculo(p) + [{"$set": {
+        "weights": weights_doc(p, THR_JACCARD),
+        "updated_at": time.time(),
+    }}]
+    res = await db["ranking"].update_many({"perfil_id": perfil_id}, stages)
+    return res.modified_count
+
+
+async def preview_ranking(db, perfil_id: str, pesos: Dict[str, Any], limit: int = 100) -> List[Dict[str, Any]]:
+    """Top-N re-ordenado con pesos alternativos, calculado en una agregación. No persiste nada."""
+    p = pesos_efectivos(pesos)
+    pipeline = [{"$match": {"perfil_id": perfil_id}}] + pipeline_recalculo(p) + [
+        {"$sort": {"score": -1}},
+        {"$limit": int(limit)},
+        {"$project": {"_id": 0, "cv_id": 1, "score": 1, "score_cos": 1,
+                      "score_j_total": 1, "snapshot": 1}},
+    ]
+    items = []
+    async for r in db["ranking"].aggregate(pipeline):
+        snap = r.get("snapshot") or {}
+        items.append({
+            "cv_id": r.get("cv_id"),
+            "perfil_id": perfil_id,
+            "score": float(r.get("score", 0)),
+            "score_cos": float(r.get("score_cos", 0)),
+            "score_j_total": float(r.get("score_j_total", 0)),
+            "nombre": snap.get("nombre"),
+            "apellido": snap.get("apellido"),
+            "email": snap.get("email"),
+            "cv_file_id": snap.get("cv_file_id"),
+        })
+    return items
@@ -0,0 +1,81 @@
+# metricas/services/token_index.py
+# Parte Mongo del índice invertido de tokens (ver utils/token_index.py):
+# tokidx_* de cada CV, estado de jaccard por perfil y backfill de docs viejos.
+from dataclasses import dataclass
+from typing import Dict, FrozenSet, Optional
+
+from pymongo import UpdateOne
+
+from utils.text_normalizer import tokens_norm, soft_jaccard
+from utils.token_index import CAMPOS, TOKIDX_FIELDS, es_tokidx, soft_jaccard_ids, tokens_por_campo
+from metricas.services.vocab import term_ids, umbral_tabla, vecinos
+
+
+async def indexar_tokens(db, doc: dict) -> Dict[str, list]:
+    """Campos tokidx_* de un doc de curriculum: ids ordenados del vocabulario global."""
+    return {idx: await term_ids(db, toks) for idx, toks in tokens_por_campo(doc).items()}
+
+
+@dataclass(frozen=True)
+class PerfilTokens:
+    """Lo que el jaccard de un perfil necesita del vocabulario: sus ids y los compatibles."""
+    ids: Dict[str, FrozenSet[int]]          # campo del perfil → ids de sus términos
+    compat: Dict[str, FrozenSet[int]]       # campo → ids con score ≥ thr contra alguno
+    sim: Dict[int, Dict[int, int]]          # filas de vocab_sim de los ids del perfil
+    thr: int
+
+    def jaccard(self, campo: str, perfil_tokens, cv: dict) -> float:
+        src, idx = CAMPOS[campo]
+        toks = cv.get(idx)
+        if es_tokidx(toks):
+            if self.compat[campo].isdisjoint(toks):
+                return 0.0
+            return soft_jaccard_ids(self.ids[campo], toks, self.sim, self.thr)
+        # CV sin tokidx_* en ids (no migrado): camino por strings
+        return soft_jaccard(perfil_tokens, tokens_norm(cv.get(src, [])), thr=self.thr)
+
+
+async def preparar_tokens(db, perfil, thr: int) -> Optional[PerfilTokens]:
+    """
+    Ids y vecinos de los términos de un perfil. None si la tabla de pares se calculó
+    con un umbral mayor que thr (no alcanza para decidir): en ese caso, camino por strings.
+    """
+    ids = {campo: frozenset(await term_ids(db, getattr(perfil, campo))) for campo in CAMPOS}
+    tabla_thr = await umbral_tabla(db)
+    if tabla_thr is not None and tabla_thr > thr:
+        return None
+    sim = await vecinos(db, frozenset().union(*ids.values()))
+    compat = {campo: frozenset(s.union(*(sim[i].keys() for i in s))) for campo, s in ids.items()}
+    return PerfilTokens(ids=ids, compat=compat, sim=sim, thr=thr)
+
+
+async def migrar_tokidx(db, batch: int = 500) -> int:
+    """
+    Completa tokidx_* (ids) en CVs viejos o con el formato anterior (strings).
+    Reanudable: solo toma docs que todavía lo necesitan.
+    """
+    proj = {src: 1 for src, _ in CAMPOS.values()}
+    pendientes = {"$or": [{f: {"$exists": False}} for f in TOKIDX_FIELDS]
+                  + [{f: {"$type": "string"}} for f in TOKIDX_FIELDS]}
+    total = 0
+    while True:
+        docs = await db["curriculum"].find(pendientes, projection=proj) \
+            .limit(batch).to_list(length=batch)
+        if not docs:
+            return total
+        ops = [UpdateOne({"_id": d["_id"]}, {"$set": await indexar_tokens(db, d)}) for d in docs]
+        await db["curriculum"].bulk_write(ops, ordered=False)
+        total += len(ops)
+        print(f"[tokidx] {total} CVs indexados")
+
+
+if __name__ == "__main__":
+    # python -m metricas.services.token_index   (desde backend/, con Mongo configurado)
+    import asyncio
+    from core.database import get_client
+
+    async def _main():
+        n = await migrar_tokidx(get_client().get_default_database())
+        print(f"OK: {n} CVs")
+
+    asyncio.run(_main())
@@ -0,0 +1,134 @@
+# metricas/services/vocab.py
+# Vocabulario global de términos normalizados → id entero, y tabla dispersa de pares
+# de términos con partial_ratio ≥ thr (calculada una sola vez, al internar cada término).
+#
+#   vocab:      {_id: <int>, t: "python"}
+#   vocab_sim:  {a: <int>, b: <int>, s: <score>}     (a < b)
+#   meta:       {_id: "vocab", seq: <último id>, thr: <umbral de la tabla>, version: n}
+#
+# Cada worker cachea término→id (nunca cambia) y las filas de vecinos que consultó;
+# estas últimas se descartan cuando cambia meta.vocab.version (llegaron pares nuevos).
+# Para calcular los pares de un término nuevo, el worker mantiene además el vocabulario
+# completo en memoria y lo pone al día leyendo solo los ids nuevos.
+import time
+from typing import Dict, Iterable, List, Optional, Set
+
+from pymongo import ReturnDocument, UpdateOne
+from pymongo.errors import DuplicateKeyError
+
+from core.config import PERFIL_CACHE_CHECK_S, THR_JACCARD
+from utils.token_index import similares
+
+# ---------- estado del worker ----------
+_ids: Dict[str, int] = {}
+_vecinos: Dict[int, Dict[int, int]] = {}
+_version: int = -1
+_thr: Optional[int] = None
+_checked_at: float = 0.0
+# vocabulario completo (listas paralelas id / término) para los pares de términos nuevos
+_vocab_ids: List[int] = []
+_vocab_terms: List[str] = []
+_vocab_vistos: Set[int] = set()
+_vocab_max: int = 0
+
+# el id se reserva antes de insertar: un término con id algo menor al máximo ya visto
+# puede aparecer después, así que cada puesta al día re-lee los últimos _RELEER ids
+_RELEER = 256
+
+
+async def _sync(db) -> None:
+    global _version, _thr, _checked_at
+    now = time.monotonic()
+    if now - _checked_at < PERFIL_CACHE_CHECK_S and _version >= 0:
+        return
+    _checked_at = now
+    meta = await db["meta"].find_one({"_id": "vocab"}, projection={"version": 1, "thr": 1}) or {}
+    v = int(meta.get("version", 0))
+    if v != _version:
+        _vecinos.clear()
+        _version = v
+    _thr = meta.get("thr")
+
+
+async def umbral_tabla(db) -> Optional[int]:
+    """Umbral con el que se calculó vocab_sim (None si todavía no hay vocabulario)."""
+    await _sync(db)
+    return _thr
+
+
+async def _vocab_al_dia(db) -> None:
+    """Trae al vocabulario en memoria los términos con id mayor al último visto (menos _RELEER)."""
+    global _vocab_max
+    async for d in db["vocab"].find({"_id": {"$gt": _vocab_max - _RELEER}}):
+        i = int(d["_id"])
+        if i in _vocab_vistos:
+            continue
+        _vocab_vistos.add(i)
+        _vocab_ids.append(i)
+        _vocab_terms.append(d["t"])
+        _ids.setdefault(d["t"], i)
+        _vocab_max = max(_vocab_max, i)
+
+
+async def _nuevo_termino(db, t: str) -> int:
+    meta = await db["meta"].find_one_and_update(
+        {"_id": "vocab"},
+        {"$inc": {"seq": 1}, "$setOnInsert": {"thr": THR_JACCARD}},
+        upsert=True, return_document=ReturnDocument.AFTER,
+    )
+    tid = int(meta["seq"])
+    try:
+        await db["vocab"].insert_one({"_id": tid, "t": t})
+    except DuplicateKeyError:
+        # otro worker lo internó primero: usamos su id (el nuestro queda como hueco)
+        doc = await db["vocab"].find_one({"t": t}, projection={"_id": 1})
+        return int(doc["_id"])
+
+    # Pares contra TODO el vocabulario visible. Como cada término se inserta antes de
+    # listar, de dos términos nuevos concurrentes al menos el último ve al otro.
+    await _vocab_al_dia(db)
+    thr = int(meta.get("thr", THR_JACCARD))
+    ops = []
+    for j, sc in similares(t, _vocab_terms, thr):
+        o = _vocab_ids[j]
+        if o == tid:
+            continue
+        a, b = min(o, tid), max(o, tid)
+        ops.append(UpdateOne({"a": a, "b": b}, {"$set": {"s": sc}}, upsert=True))
+    if ops:
+        await db["vocab_sim"].bulk_write(ops, ordered=False)
+    await db["meta"].update_one({"_id": "vocab"}, {"$inc": {"version": 1}})
+    _vecinos.clear()  # este worker ya sabe que hay pares nuevos; los demás, vía version
+    return tid
+
+
+async def term_ids(db, terms: Iterable[str]) -> List[int]:
+    """Ids (ordenados) de los términos; interna los que no existen."""
+    terms = set(terms)
+    faltan = [t for t in terms if t not in _ids]
+    if faltan:
+        async for d in db["vocab"].find({"t": {"$in": faltan}}):
+            _ids[d["t"]] = int(d["_id"])
+        for t in faltan:
+            if t not in _ids:
+                _ids[t] = await _nuevo_termino(db, t)
+    return sorted(_ids[t] for t in terms)
+
+
+async def vecinos(db, ids: Iterable[int]) -> Dict[int, Dict[int, int]]:
+    """Fila de la tabla de similitud (id → score) para cada id pedido."""
+    await _sync(db)
+    ids = set(ids)
+    faltan = [i for i in ids if i not in _vecinos]
+    if faltan:
+        filas: Dict[int, Dict[int, int]] = {i: {} for i in faltan}
+        cur = db["vocab_sim"].find({"$or": [{"a": {"$in": faltan}}, {"b": {"$in": faltan}}]},
+                                   projection={"_id": 0})
+        async for p in cur:
+            a, b, s = int(p["a"]), int(p["b"]), int(p["s"])
+            if a in filas:
+                filas[a][b] = s
+            if b in filas:
+                filas[b][a] = s
+        _vecinos.update(filas)
+    return {i: _vecinos[i] for i in ids}
@@ -3,6 +3,7 @@ from fastapi import APIRouter, Depends, HTTPException
 from perfil.schemas.perfil_schemas import PerfilCreate, PerfilOut
 from perfil.services.perfil_service import guardar_perfil, obtener_perfil_activo
 from core.database import get_db
+from core.vectors import vector_to_list
 from bson import ObjectId
 from auth.utils.permissions import require_admin
 
@@ -21,4 +22,5 @@ async def get_perfil_activo(db=Depends(get_db)):
     if not doc:
         return {}
     doc["id"] = str(doc.pop("_id"))
+    doc["vector"] = vector_to_list(doc.get("vector")) or []
     return PerfilOut(**doc)
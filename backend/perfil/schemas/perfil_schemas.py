@@ -1,6 +1,7 @@
 # perfil/schemas/perfil_schemas.py
 from pydantic import BaseModel, Field
 from typing import List, Optional
+from metricas.schemas.ranking_schemas import PesosRanking
 
 
 class PerfilCreate(BaseModel):
@@ -14,6 +15,8 @@ class PerfilCreate(BaseModel):
     edad: int
     activo: bool = False
     publicado: bool = False
+    # pesos del score propios del perfil; si no se mandan, se usan los RANK_* del entorno
+    pesos: Optional[PesosRanking] = None
 
 
 class PerfilOut(BaseModel):
@@ -29,4 +32,5 @@ class PerfilOut(BaseModel):
     vector: List[float]
     activo: bool
     publicado: bool
+    pesos: Optional[PesosRanking] = None
     timestamp: float
@@ -4,8 +4,10 @@ import time
 from typing import Dict, Any, Optional, List
 from motor.motor_asyncio import AsyncIOMotorDatabase
 from core.ai import embed_texts
+from core.vectors import encode_vector
 # ← recalcula métricas del perfil activo
 from metricas.services.rebuild import rebuild_ranking_for_profile
+from metricas.services.perfil_cache import bump_perfiles_version
 
 
 def _construir_perfil_texto(
@@ -39,8 +41,8 @@ async def guardar_perfil(db: AsyncIOMotorDatabase, data: Dict[str, Any]) -> str:
     Crea un perfil:
       - Construye el texto a indexar (incluye idiomas).
       - Genera embedding y guarda el doc.
-      - Si 'activo' es True, desactiva otros perfiles del mismo owner y
-        dispara el rebuild del ranking para este perfil.
+      - Si 'activo' es True, desactiva otros perfiles del mismo owner.
+      - Si es activo o publicado, dispara el rebuild del ranking para este perfil.
     """
     # 1) Normalización de entradas (listas seguras)
     educacion = list(data.get("educacion", []) or [])
@@ -65,9 +67,10 @@ async def guardar_perfil(db: AsyncIOMotorDatabase, data: Dict[str, Any]) -> str:
         "idiomas": idiomas,
         "edad": int(data["edad"]),
         "perfil": perfil_texto,
-        "vector": vector,
+        "vector": encode_vector(vector),
         "activo": bool(data.get("activo", False)),
         "publicado": bool(data.get("publicado", False)),
+        "pesos": data.get("pesos"),
         "timestamp": time.time(),
     }
 
@@ -78,9 +81,12 @@ async def guardar_perfil(db: AsyncIOMotorDatabase, data: Dict[str, Any]) -> str:
     # 4) Insertar
     res = await db["perfiles"].insert_one(doc)
     perfil_id = str(res.inserted_id)
+    # cambió el set de perfiles (y quizá el activo): invalida la cache de scoring en todos los workers
+    await bump_perfiles_version(db)
 
-    # 5) Si quedó activo → recalcular métricas (ranking) para este perfil
-    if doc["activo"]:
+    # 5) Si quedó activo o publicado → calcular métricas (ranking) para este perfil.
+    #    Desde ahí la ingesta de CVs lo mantiene al día: cambiar de perfil activo no requiere rebuild.
+    if doc["activo"] or doc["publicado"]:
         # No esperamos resultado; si preferís no bloquear, podrías usar asyncio.create_task(...)
         await rebuild_ranking_for_profile(db, perfil_id)
 
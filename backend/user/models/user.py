@@ -17,4 +17,6 @@ class User(BaseModel):
     email: EmailStr
     password_hash: str
     is_active: bool = True
+    # se incrementa en logout-all: invalida todos los tokens emitidos antes
+    token_version: int = 0
     roles: List[Role] = [Role.user]
@@ -0,0 +1,49 @@
+# user/services/password_pool.py
+# bcrypt tarda ~100-300 ms y libera el GIL: corre en un pool de hilos propio
+# (PWD_HASH_WORKERS) para no frenar el event loop ni competir con el pool por defecto
+# de anyio (PDFs, embeddings). La cola está acotada: con PWD_HASH_WORKERS + PWD_HASH_QUEUE
+# trabajos pendientes, los nuevos se rechazan al instante (HashingSaturado → 503).
+import asyncio
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Callable
+
+from core.config import PWD_HASH_QUEUE, PWD_HASH_WORKERS
+
+
+class HashingSaturado(Exception):
+    """Demasiados hashes de password pendientes: reintentar más tarde."""
+
+
+_executor = ThreadPoolExecutor(max_workers=PWD_HASH_WORKERS, thread_name_prefix="pwd-hash")
+_lock = threading.Lock()
+_pendientes = 0
+
+
+def pendientes() -> int:
+    return _pendientes
+
+
+def _correr(fn: Callable[..., Any], *args: Any) -> Any:
+    global _pendientes
+    try:
+        return fn(*args)
+    finally:
+        # se descuenta cuando el hilo termina (aunque el request se haya cancelado)
+        with _lock:
+            _pendientes -= 1
+
+
+async def ejecutar(fn: Callable[..., Any], *args: Any) -> Any:
+    global _pendientes
+    with _lock:
+        if _pendientes >= PWD_HASH_WORKERS + PWD_HASH_QUEUE:
+            raise HashingSaturado()
+        _pendientes += 1
+    try:
+        fut = _executor.submit(_correr, fn, *args)
+    except BaseException:
+        with _lock:
+            _pendientes -= 1
+        raise
+    return await asyncio.wrap_future(fut)
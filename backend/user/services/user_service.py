@@ -6,9 +6,12 @@ from user.models.user import User, Role
 from passlib.context import CryptContext
 from motor.motor_asyncio import AsyncIOMotorDatabase
 from bson import ObjectId
-from typing import Optional, List
+from typing import Optional, List, Tuple
+from core.config import PWD_BCRYPT_ROUNDS
+from user.services.password_pool import ejecutar
+from auth.services.principal_cache import invalidar_principal
 
-_pwd = CryptContext(schemes=["bcrypt"], deprecated="auto")
+_pwd = CryptContext(schemes=["bcrypt"], deprecated="auto", bcrypt__rounds=PWD_BCRYPT_ROUNDS)
 
 
 def hash_password(plain: str) -> str:
@@ -18,6 +21,16 @@ def hash_password(plain: str) -> str:
 def verify_password(plain: str, hashed: str) -> bool:
     return _pwd.verify(plain, hashed)
 
+
+# Versiones async: bcrypt en el pool acotado (pueden lanzar HashingSaturado)
+async def hash_password_async(plain: str) -> str:
+    return await ejecutar(_pwd.hash, plain)
+
+
+async def verify_and_update_password(plain: str, hashed: str) -> Tuple[bool, Optional[str]]:
+    """(ok, hash_nuevo): hash_nuevo no es None si el hash guardado usa otro costo."""
+    return await ejecutar(_pwd.verify_and_update, plain, hashed)
+
 # ------------------ Helpers de mapeo ------------------
 
 
@@ -30,6 +43,7 @@ def _doc_to_user(doc: dict) -> User:
         password_hash=doc["password_hash"],
         is_active=doc.get("is_active", True),
         roles=[Role(r) for r in doc.get("roles", ["user"])],
+        token_version=int(doc.get("token_version", 0)),
     )
 
 
@@ -89,10 +103,13 @@ async def delete_user(db: AsyncIOMotorDatabase, user_id: str) -> bool:
     except Exception:
         # Si te interesa permitir borrar por email:
         res = await db["users"].delete_one({"email": user_id})
+        await invalidar_principal(db, user_id)
         return res.deleted_count == 1
 
-    res = await db["users"].delete_one({"_id": _id})
-    return res.deleted_count == 1
+    doc = await db["users"].find_one_and_delete({"_id": _id}, projection={"email": 1})
+    if doc:
+        await invalidar_principal(db, user_id, doc.get("email", ""))
+    return doc is not None
 
 
 async def create_user(db: AsyncIOMotorDatabase, payload: UserCreate) -> UserSchema:
@@ -106,7 +123,7 @@ async def create_user(db: AsyncIOMotorDatabase, payload: UserCreate) -> UserSche
     if existing_username:
         raise ValueError("El username ya está en uso")
 
-    pw_hash = hash_password(payload.password)
+    pw_hash = await hash_password_async(payload.password)
     doc = {
         "username": payload.username,
         "email": payload.email,
@@ -126,6 +143,7 @@ async def add_role(db: AsyncIOMotorDatabase, user_id: str, role: Role) -> bool:
     except Exception:
         return False
     res = await db["users"].update_one({"_id": oid}, {"$addToSet": {"roles": role.value}})
+    await _invalidar(db, oid)
     return res.modified_count == 1
 
 
@@ -135,4 +153,22 @@ async def remove_role(db: AsyncIOMotorDatabase, user_id: str, role: Role) -> boo
     except Exception:
         return False
     res = await db["users"].update_one({"_id": oid}, {"$pull": {"roles": role.value}})
+    await _invalidar(db, oid)
     return res.modified_count == 1
+
+
+async def bump_token_version(db: AsyncIOMotorDatabase, user_id: str) -> bool:
+    """Logout-all: invalida todos los tokens del usuario emitidos hasta ahora."""
+    try:
+        oid = ObjectId(user_id)
+    except Exception:
+        return False
+    res = await db["users"].update_one({"_id": oid}, {"$inc": {"token_version": 1}})
+    await _invalidar(db, oid)
+    return res.modified_count == 1
+
+
+async def _invalidar(db: AsyncIOMotorDatabase, oid: ObjectId) -> None:
+    # los tokens pueden llevar el id o (los viejos) el email como sub
+    doc = await db["users"].find_one({"_id": oid}, projection={"email": 1}) or {}
+    await invalidar_principal(db, str(oid), doc.get("email", ""))
@@ -8,6 +8,9 @@ from dotenv import load_dotenv
 from openai import OpenAI
 from pdf2image import convert_from_path, convert_from_bytes
 
+from core.metrics import llamada_openai
+from core.tracing import span
+
 load_dotenv()
 
 # ===============================
@@ -145,19 +148,22 @@ def _build_vision_payload_from_images(imgs) -> List[Dict[str, Any]]:
 def reed_cv(archivo_pdf: str, first_page: int = 1, last_page: int = 2, dpi: int = 300) -> Dict[str, str]:
 
     try:
-        imgs = convert_from_path(archivo_pdf, dpi=dpi,
-                                 first_page=first_page, last_page=last_page)
+        with span("pdf.render", dpi=dpi):
+            imgs = convert_from_path(archivo_pdf, dpi=dpi,
+                                     first_page=first_page, last_page=last_page)
         if not imgs:
             raise RuntimeError("No se pudieron generar imágenes del PDF.")
 
-        content_payload = _build_vision_payload_from_images(imgs)
+        with span("pdf.jpeg_b64", paginas=len(imgs)):
+            content_payload = _build_vision_payload_from_images(imgs)
         client = get_openai_client()
-        resp = client.chat.completions.create(
-            model="gpt-4o",
-            messages=[{"role": "system", "content": SYSTEM_PROMPT},
-                      {"role": "user", "content": content_payload}],
-            temperature=0,
-        )
+        with llamada_openai("vision"), span("openai.vision"):
+            resp = client.chat.completions.create(
+                model="gpt-4o",
+                messages=[{"role": "system", "content": SYSTEM_PROMPT},
+                          {"role": "user", "content": content_payload}],
+                temperature=0,
+            )
         content = resp.choices[0].message.content
         data = _parse_code_fenced_json(content)
         return sanitize_gpt_payload(data)
@@ -208,23 +214,26 @@ def _build_vision_payload_from_images(imgs) -> List[Dict[str, Any]]:
 def reed_cv_bytes(pdf_bytes: bytes, first_page: int = 1, last_page: int = 2, dpi: int = 300) -> Dict[str, str]:
     """Convierte las primeras páginas del PDF (en bytes) a imágenes y usa GPT-4o Visión."""
     try:
-        imgs = convert_from_bytes(
-            pdf_bytes, dpi=dpi, first_page=first_page, last_page=last_page)
+        with span("pdf.render", dpi=dpi):
+            imgs = convert_from_bytes(
+                pdf_bytes, dpi=dpi, first_page=first_page, last_page=last_page)
         if not imgs:
             raise RuntimeError(
                 "No se pudieron generar imágenes del PDF (bytes).")
 
-        content_payload = _build_vision_payload_from_images(imgs)
+        with span("pdf.jpeg_b64", paginas=len(imgs)):
+            content_payload = _build_vision_payload_from_images(imgs)
 
         client = get_openai_client()
-        resp = client.chat.completions.create(
-            model="gpt-4o",
-            messages=[
-                {"role": "system", "content": SYSTEM_PROMPT},
-                {"role": "user", "content": content_payload},
-            ],
-            temperature=0,
-        )
+        with llamada_openai("vision"), span("openai.vision"):
+            resp = client.chat.completions.create(
+                model="gpt-4o",
+                messages=[
+                    {"role": "system", "content": SYSTEM_PROMPT},
+                    {"role": "user", "content": content_payload},
+                ],
+                temperature=0,
+            )
         content = resp.choices[0].message.content
         data = _parse_code_fenced_json(content)
         return sanitize_gpt_payload(data)
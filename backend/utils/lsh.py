@@ -0,0 +1,77 @@
+# utils/lsh.py
+# Firmas LSH para detectar CVs casi duplicados sin comparar todos contra todos.
+#
+#   - Hiperplanos aleatorios (SimHash) sobre cv_vector: SIM_BANDS bandas de SIM_ROWS bits.
+#     Dos vectores con coseno c coinciden en cada bit con prob. 1 - acos(c)/π.
+#   - MinHash sobre shingles de palabras normalizadas de cv_text: MH_BANDS bandas de
+#     MH_ROWS mínimos. Coinciden en cada mínimo con prob. = jaccard de los shingles.
+#
+# Cada banda se guarda como string ("v3:1234", "m7:99...") en un campo multikey con
+# índice: dos CVs son candidatos si comparten alguna banda. Los candidatos se
+# verifican después con el coseno y el jaccard estimado.
+# Todo es determinístico (semillas fijas, crc32): las firmas valen entre procesos.
+import zlib
+from functools import lru_cache
+from typing import Iterable, List, Tuple
+
+import numpy as np
+
+from utils.text_normalizer import tokens_norm_list
+
+SIM_BANDS, SIM_ROWS = 8, 12
+MH_BANDS, MH_ROWS = 10, 6
+MH_PERMS = MH_BANDS * MH_ROWS
+_PRIME = (1 << 31) - 1
+_SEED = 20240917
+
+
+@lru_cache(maxsize=4)
+def _hiperplanos(dim: int) -> np.ndarray:
+    rng = np.random.default_rng(_SEED)
+    return rng.standard_normal((SIM_BANDS * SIM_ROWS, dim)).astype(np.float32)
+
+
+@lru_cache(maxsize=1)
+def _permutaciones() -> Tuple[np.ndarray, np.ndarray]:
+    rng = np.random.default_rng(_SEED + 1)
+    a = rng.integers(1, _PRIME, size=MH_PERMS, dtype=np.uint64)
+    b = rng.integers(0, _PRIME, size=MH_PERMS, dtype=np.uint64)
+    return a, b
+
+
+def simhash_bandas(x: np.ndarray) -> List[str]:
+    if x.size == 0 or not np.any(x):
+        return []
+    bits = (_hiperplanos(x.size) @ x) > 0
+    pesos = 1 << np.arange(SIM_ROWS, dtype=np.int64)
+    claves = bits.reshape(SIM_BANDS, SIM_ROWS).astype(np.int64) @ pesos
+    return [f"v{i}:{int(k)}" for i, k in enumerate(claves)]
+
+
+def shingles(texto: str) -> set:
+    toks = tokens_norm_list(texto or "")
+    if len(toks) < 2:
+        return set(toks)
+    return {f"{a} {b}" for a, b in zip(toks, toks[1:])}
+
+
+def minhash(items: Iterable[str]) -> np.ndarray:
+    """Firma MinHash (MH_PERMS enteros uint32); vacía si no hay items."""
+    xs = np.fromiter((zlib.crc32(s.encode("utf-8")) % _PRIME for s in items), dtype=np.uint64)
+    if not len(xs):
+        return np.zeros(0, dtype=np.uint32)
+    a, b = _permutaciones()
+    return ((a[:, None] * xs[None, :] + b[:, None]) % _PRIME).min(axis=1).astype(np.uint32)
+
+
+def minhash_bandas(sig: np.ndarray) -> List[str]:
+    if not len(sig):
+        return []
+    filas = sig.reshape(MH_BANDS, MH_ROWS)
+    return [f"m{i}:{zlib.crc32(f.tobytes())}" for i, f in enumerate(filas)]
+
+
+def jaccard_estimado(s1: np.ndarray, s2: np.ndarray) -> float:
+    if not len(s1) or len(s1) != len(s2):
+        return 0.0
+    return float(np.mean(s1 == s2))
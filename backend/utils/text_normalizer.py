@@ -173,6 +173,14 @@ def tokens_norm(x) -> set[str]:
     return toks
 
 
+def tokens_norm_list(x) -> list[str]:
+    """Como tokens_norm pero conserva orden y repeticiones (frecuencias para BM25)."""
+    if isinstance(x, (list, tuple)):
+        x = " ".join(str(it) for it in x)
+    s = normalizar_texto(str(x or ""))
+    return [SINONIMOS.get(t, t) for t in re.findall(r"\w+", s)]
+
+
 def soft_jaccard(A: set[str], B: set[str], thr: int = 87) -> float:
     """Jaccard 'suave': fuzzy matching para coincidencias aproximadas."""
     if not A or not B:
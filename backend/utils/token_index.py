@@ -0,0 +1,75 @@
+# utils/token_index.py
+# Índice invertido de tokens normalizados para descartar CVs antes del jaccard blando.
+#
+# Cada término normalizado (tokens_norm) se interna en un vocabulario global con id
+# entero (colección 'vocab'), y los pares de términos con partial_ratio ≥ thr se
+# guardan una sola vez (colección 'vocab_sim'). Cada doc de 'curriculum' guarda sus
+# tokens como arrays ordenados de ids en campos multikey "tokidx_*" con índice en Mongo.
+#
+# soft_jaccard(A, B) > 0  ⇔  existe (a, b) con partial_ratio(a, b) ≥ thr.
+# Con la tabla de pares, el jaccard blando pasa a ser búsquedas en diccionarios:
+# un CV que no comparte ningún id compatible con el perfil vale 0 sin comparar nada.
+from typing import Dict, Iterable, List, Set, Tuple
+
+from utils.text_normalizer import tokens_norm, _fuzzy_ratio
+
+try:
+    from rapidfuzz import fuzz as _fuzz, process as _process
+except Exception:
+    _process = None
+
+# campo del perfil → (campo de tokens del CV, campo indexado del CV)
+CAMPOS = {
+    "atributos": ("tokens_habilidades", "tokidx_hab"),
+    "experiencia": ("tokens_experiencia", "tokidx_exp"),
+    "educacion": ("tokens_formacion", "tokidx_edu"),
+    "idiomas": ("tokens_idiomas", "tokidx_idi"),
+}
+
+TOKIDX_FIELDS = [idx for _, idx in CAMPOS.values()]
+
+
+def tokens_por_campo(doc: Dict) -> Dict[str, Set[str]]:
+    """Tokens normalizados de un doc de curriculum, por campo tokidx_*."""
+    return {idx: tokens_norm(doc.get(src) or []) for src, idx in CAMPOS.values()}
+
+
+def similares(term: str, vocab: List[str], thr: int) -> List[Tuple[int, int]]:
+    """(posición en vocab, score) de los términos con partial_ratio ≥ thr contra term."""
+    if not vocab:
+        return []
+    if _process is not None:
+        fila = _process.cdist([term], vocab, scorer=_fuzz.partial_ratio, score_cutoff=thr)[0]
+        return [(int(j), int(fila[j])) for j in (fila >= thr).nonzero()[0]]
+    return [(j, sc) for j, b in enumerate(vocab) if (sc := _fuzzy_ratio(term, b)) >= thr]
+
+
+def es_tokidx(x) -> bool:
+    """True si el campo ya está en formato de ids enteros (docs viejos guardaban strings)."""
+    return isinstance(x, list) and all(isinstance(t, int) for t in x)
+
+
+def soft_jaccard_ids(A: Iterable[int], B: Iterable[int],
+                     sim: Dict[int, Dict[int, int]], thr: int) -> float:
+    """
+    Igual que soft_jaccard pero sobre ids del vocabulario: el score de cada par sale
+    de la tabla precalculada (100 si es el mismo término, 0 si no está en la tabla).
+    """
+    A, B = set(A), set(B)
+    if not A or not B:
+        return 0.0
+    used, inter = set(), 0
+    for a in A:
+        fila = sim.get(a, {})
+        best, best_sc = None, 0
+        for b in (fila.keys() & B) | ({a} & B):
+            if b in used:
+                continue
+            sc = 100 if b == a else fila[b]
+            if sc > best_sc:
+                best_sc, best = sc, b
+        if best_sc >= thr and best is not None:
+            inter += 1
+            used.add(best)
+    union = len(A | B)
+    return inter / union if union else 0.0
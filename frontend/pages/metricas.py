@@ -1,12 +1,14 @@
 # pages/metricas.py
 import math
+import os
 import pandas as pd
 import requests
 import streamlit as st
 from login.auth_state import init_state
 from login.auth_ui import require_auth, auth_bar, require_roles
 from utils.menubar import navegacion_path, sidebar_user_box
-from utils.api_metricas import get_ranking, rebuild_ranking
+from utils.api_metricas import get_ranking, rebuild_ranking, download_ranking_zip
+from utils.api_cv import search_cvs_api
 from utils.notificacion import render_notify_panel
 
 
@@ -225,10 +227,62 @@ if "score_j_total" in df_view.columns:
 st.dataframe(df_view, hide_index=True,
              use_container_width=True, column_config=col_cfg)
 
+# ---------- Búsqueda en todo el pool ----------
+with st.expander("🔎 Buscar en todos los CVs (palabras clave)", expanded=False):
+    kc1, kc2 = st.columns([3, 1])
+    with kc1:
+        kw_query = st.text_input(
+            "Palabras clave", placeholder="Ej: python sql recursos humanos…", key="kw_query")
+    with kc2:
+        kw_modo = st.selectbox("Modo", ["keyword", "hibrido", "semantico"], key="kw_modo")
+    if kw_query:
+        res, err = search_cvs_api(kw_query, modo=kw_modo, top_k=50,
+                                  access_token=st.session_state.get("access_token"))
+        if err:
+            st.error(f"No se pudo buscar: {err}")
+        elif not res:
+            st.info("Sin resultados.")
+        else:
+            st.dataframe(pd.DataFrame(res)[["nombre", "apellido", "email", "ciudad", "score"]],
+                         hide_index=True, use_container_width=True)
+
 # ---------- Descarga de CV ----------
 
 
+def _descartar_zip():
+    """Borra el ZIP temporal: en session_state queda solo su ruta, nunca los bytes."""
+    path = st.session_state.pop("_ranking_zip", None)
+    if path and os.path.exists(path):
+        os.remove(path)
+
+
 st.markdown("### 📄 Descarga de CVs")
+zc1, zc2 = st.columns([1, 3])
+with zc1:
+    if st.button(f"📦 Preparar ZIP (Top {topN}, score ≥ {min_score:.2f})"):
+        _descartar_zip()
+        with st.spinner("Armando ZIP…"):
+            try:
+                st.session_state["_ranking_zip"] = download_ranking_zip(
+                    perfil_id=perfil_id_opt or None,
+                    top_n=topN,
+                    min_score=min_score,
+                    access_token=st.session_state.get("access_token"))
+            except Exception as e:
+                st.error(f"No se pudo generar el ZIP: {e}")
+with zc2:
+    zip_path = st.session_state.get("_ranking_zip")
+    if zip_path and os.path.exists(zip_path):
+        with open(zip_path, "rb") as fh:
+            st.download_button(
+                label="⬇️ Descargar ZIP",
+                data=fh,
+                file_name=f"ranking_{perfil_id or 'activo'}.zip",
+                mime="application/zip",
+                key="dl-ranking-zip",
+                on_click=_descartar_zip,
+            )
+
 if "cv_file_id" not in df.columns:
     st.info("Para habilitar descargas directas, guarda `cv_file_id` en el snapshot del ranking desde el backend.")
 else:
@@ -189,3 +189,23 @@ def reupload_cv_api(email: str, cv_file, keep_history: bool = False,
         return None, f"{r.status_code}: {r.json()}"
     except Exception:
         return None, f"{r.status_code}: {r.text}"
+
+
+def search_cvs_api(texto: str, modo: str = "keyword", top_k: int = 50,
+                   filtros: Optional[Dict[str, Any]] = None,
+                   access_token: Optional[str] = None, timeout: int = 30
+                   ) -> Tuple[Optional[List[Dict[str, Any]]], Optional[str]]:
+    """POST /api/cv/search: modo 'keyword' (BM25), 'semantico' o 'hibrido'."""
+    headers = {"Content-Type": "application/json",
+               "Accept": "application/json"}
+    if access_token:
+        headers["Authorization"] = f"Bearer {access_token}"
+    payload = {"texto": texto, "modo": modo, "top_k": top_k, **(filtros or {})}
+    r = requests.post(f"{API_BASE}/cv/search", json=payload,
+                      headers=headers, timeout=timeout)
+    if r.ok:
+        return r.json(), None
+    try:
+        return None, f"{r.status_code}: {r.json()}"
+    except Exception:
+        return None, f"{r.status_code}: {r.text}"
@@ -1,8 +1,9 @@
 # utils/api_metricas.py
 from __future__ import annotations
 import os
+import tempfile
 import requests
-from typing import Any, Dict, Optional, Tuple
+from typing import Any, Dict, List, Optional, Tuple
 
 BACKEND_URL = os.getenv("BACKEND_URL", "http://backend:8000").rstrip("/")
 API_RANKING = f"{BACKEND_URL}/api/metricas/ranking"
@@ -53,3 +54,45 @@ def rebuild_ranking(
     )
     r.raise_for_status()
     return r.json() or {}
+
+
+def download_ranking_zip(
+    perfil_id: Optional[str] = None,
+    top_n: Optional[int] = None,
+    min_score: Optional[float] = None,
+    cv_ids: Optional[List[str]] = None,
+    access_token: Optional[str] = None,
+    timeout: int = API_TIMEOUT
+) -> str:
+    """
+    Descarga en UN request el ZIP con los CVs del ranking (armado en streaming por el backend)
+    a un archivo temporal, por bloques, y devuelve su ruta: el llamador lo borra al terminar.
+    """
+    params: Dict[str, Any] = {}
+    if perfil_id:
+        params["perfil_id"] = perfil_id
+    if top_n:
+        params["top_n"] = str(top_n)
+    if min_score is not None:
+        params["min_score"] = str(min_score)
+    if cv_ids:
+        params["cv_ids"] = list(cv_ids)
+    headers = _auth_header(access_token)
+    headers["Accept"] = "application/zip"
+    with requests.get(
+        f"{API_BASE}/metricas/ranking/cvs.zip",
+        params=params,
+        headers=headers,
+        timeout=timeout,
+        stream=True,
+    ) as r:
+        r.raise_for_status()
+        with tempfile.NamedTemporaryFile(prefix="ranking_", suffix=".zip", delete=False) as fh:
+            try:
+                for chunk in r.iter_content(chunk_size=1 << 16):
+                    fh.write(chunk)
+            except Exception:
+                fh.close()
+                os.remove(fh.name)
+                raise
+    return fh.name